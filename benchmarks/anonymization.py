@@ -0,0 +1,49 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from src.anonymization import anonymize_record, anonymize_batch
+
+def make_records(count):
+    return [
+        {
+            "user_id": f"user{i}",
+            "email": f"user{i}@example.com",
+            "phone": f"{5550000000 + i}",
+            "address": f"{i} Privacy Street",
+            "created_at": "2025-04-08 12:00:00"
+        }
+        for i in range(count)
+    ]
+
+def timed(label, count, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {count / elapsed:>12,.0f} records/s  ({elapsed:.2f}s)")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-record and batch anonymization throughput")
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    records = make_records(args.records)
+    df = pd.DataFrame(records)
+    print(f"records={args.records} workers={args.workers}")
+
+    expected = timed("per-record loop", args.records, lambda: [anonymize_record(r) for r in records])
+    batch = timed("batch (records)", args.records, lambda: anonymize_batch(records, max_workers=args.workers))
+    frame = timed("batch (DataFrame)", args.records, lambda: anonymize_batch(df, max_workers=args.workers))
+
+    assert batch == expected
+    assert frame.to_dict('records') == expected
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import argparse
+import os
+import sys
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.log_store import IndexedLogStore
+from src.compact_log import CompactLogStore
+
+BACKENDS = {
+    'indexed': IndexedLogStore,
+    'compact': CompactLogStore
+}
+
+ACTIVITIES = ["authentication", "transaction_processing", "data_access_request", "consent_update"]
+
+def sample_entry(i, now):
+    activity_type = ACTIVITIES[i % len(ACTIVITIES)]
+    payloads = {
+        "authentication": {"username": f"user{i % 50000}", "login_time": now.isoformat()},
+        "transaction_processing": {"amount": "$250.00", "item_count": 3, "transaction_id": str(uuid.uuid4())},
+        "data_access_request": {"request_time": now.isoformat()},
+        "consent_update": {"consent_type": "marketing", "status": True}
+    }
+    # Same shape as DataProcessingLog.log_activity
+    return {
+        'id': str(uuid.uuid4()),
+        'user_id': f"user{i % 50000}",
+        'activity_type': activity_type,
+        'timestamp': now,
+        'data_processed': payloads[activity_type],
+        'is_consent_given': i % 3 == 0,
+        'retention_period': now + timedelta(days=730)
+    }
+
+def resident_bytes():
+    # Linux only; tracemalloc is exact but several times slower at 10M entries
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+def measure(backend, entries, method):
+    if method == "tracemalloc":
+        tracemalloc.start()
+    baseline = resident_bytes() if method == "rss" else 0
+
+    store = BACKENDS[backend]()
+    now = datetime.utcnow()
+    for i in range(entries):
+        store.append(sample_entry(i, now))
+
+    if method == "rss":
+        used = resident_bytes() - baseline
+        return used, used
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, peak
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure processing log memory per entry")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="compact")
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--method", choices=["tracemalloc", "rss"], default="tracemalloc")
+    args = parser.parse_args()
+
+    current, peak = measure(args.backend, args.entries, args.method)
+    print(f"backend={args.backend} entries={args.entries} method={args.method} "
+          f"bytes_per_entry={current / args.entries:.1f} "
+          f"total_mb={current / 2**20:.1f} peak_mb={peak / 2**20:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from src.minimization import load_policies, minimize_record, minimize_batch
+
+def minimize_data_original(purpose, data):
+    # DataminimizationEngine.minimize_data before policies were precompiled
+    minimization_rules = {
+        'authentication': ['username', 'email'],
+        'transaction_processing': ['user_id', 'transaction_details'],
+        'fraud_prevention': ['user_id', 'transaction_history'],
+        'customer_support': ['user_id', 'contact_information']
+    }
+
+    allowed_fields = minimization_rules.get(purpose, [])
+    return {k: v for k, v in data.items() if k in allowed_fields}
+
+def make_records(count, extra_fields):
+    base = {"username": "jdoe", "email": "jdoe@example.com", "phone": "1234567890", "address": "123 Privacy Street"}
+    base.update({f"field_{i}": i for i in range(extra_fields)})
+    return [dict(base, user_id=f"user{i}") for i in range(count)]
+
+def timed(label, count, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {count / elapsed:>14,.0f} records/s  ({elapsed:.3f}s)")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-record and batch minimization throughput")
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--extra-fields", type=int, default=6)
+    parser.add_argument("--purpose", default="authentication")
+    args = parser.parse_args()
+
+    records = make_records(args.records, args.extra_fields)
+    df = pd.DataFrame(records)
+    allowed = load_policies()[args.purpose]
+    print(f"records={args.records} fields_per_record={len(records[0])} purpose={args.purpose}")
+
+    expected = timed("original per-record", args.records, lambda: [minimize_data_original(args.purpose, r) for r in records])
+    per_record = timed("compiled per-record", args.records, lambda: [minimize_record(allowed, r) for r in records])
+    batch = timed("batch (records)", args.records, lambda: minimize_batch(allowed, records))
+    frame = timed("batch (DataFrame)", args.records, lambda: minimize_batch(allowed, df))
+
+    assert per_record == expected
+    assert batch == expected
+    assert frame.to_dict('records') == expected
+
+if __name__ == "__main__":
+    main()
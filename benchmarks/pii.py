@@ -0,0 +1,46 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.pii import DEFAULT_SCANNER, redact_records
+
+def make_payloads(count):
+    return [
+        {
+            "user_id": f"user{i}",
+            "activity": "checkout",
+            "session": {"ip": f"10.0.{i % 256}.{i % 250}", "agent": "Mozilla/5.0 (X11; Linux x86_64)"},
+            "contact": {"email": f"user{i}@example.com", "note": f"call +1 555-{i % 1000:03d}-{i % 10000:04d}"},
+            "items": [{"sku": f"SKU-{i}", "qty": 1 + i % 3}, {"sku": "SKU-7", "qty": 1}],
+            "payment": {"card": "4111 1111 1111 1111", "amount": "19.99"},
+            "comment": "delivered to the front door, no issues reported"
+        }
+        for i in range(count)
+    ]
+
+def timed(label, count, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {count / elapsed:>12,.0f} records/s  ({elapsed:.2f}s)")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure nested PII redaction throughput")
+    parser.add_argument("--records", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    records = make_payloads(args.records)
+    print(f"records={args.records} workers={args.workers}")
+
+    expected = timed("single process", args.records, lambda: [DEFAULT_SCANNER.redact(r) for r in records])
+    streamed = timed("redact_records (pool)", args.records, lambda: list(redact_records(records, max_workers=args.workers)))
+
+    assert streamed == expected
+
+if __name__ == "__main__":
+    main()
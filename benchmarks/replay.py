@@ -0,0 +1,252 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from itertools import chain, islice
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.data_protection import EncryptoDataProtectionEngine as SQLEngine
+from src.sharding import ShardedDataProtectionEngine
+from src.workload import WorkloadGenerator
+from suite import MEMORY_BACKENDS, MemoryBackend, git_revision, load_app
+
+BACKENDS = MEMORY_BACKENDS + ('sqlalchemy', 'sharded')
+OPERATIONS = ('log', 'get_logs', 'check_consent', 'access_request', 'erase')
+DEFAULT_MIX = "log=90,get_logs=5,check_consent=4,access_request=0.8,erase=0.2"
+SETUP_BATCH_SIZE = 5000
+
+class AppTarget:
+    # The Streamlit app's engine on one of its log stores
+    def __init__(self, app, backend):
+        self.backend = MemoryBackend(app, backend)
+        self.engine = self.backend.engine
+        self.gdpr_manager = self.engine.gdpr_manager
+
+    def store_user(self, record):
+        self.gdpr_manager.data_subject_rights.store_personal_data(record['user_id'], record)
+
+    def store_consent(self, record):
+        self.gdpr_manager.consent_manager.update_consent(record['user_id'], record['type'], record['status'], record['timestamp'])
+
+    def log(self, events):
+        if len(events) == 1:
+            event = events[0]
+            return self.engine.log_data_processing_activity(event['user_id'], event['activity_type'], event['data_processed'])
+        return self.engine.log_data_processing_activities(events)
+
+    def get_logs(self, user_id):
+        return self.engine.data_processing_log.get_logs(user_id=user_id)
+
+    def check_consent(self, user_id):
+        return self.gdpr_manager.consent_manager.check_consent(user_id)
+
+    def access_request(self, user_id):
+        return self.gdpr_manager.process_data_access_request(user_id)
+
+    def erase(self, user_id):
+        return self.engine.right_to_be_forgotten(user_id)
+
+    def close(self):
+        self.backend.close()
+
+class SQLTarget:
+    # src.data_protection's engine, or the sharded engine over it
+    def __init__(self, engine):
+        self.engine = engine
+        if hasattr(engine, 'check_consent'):
+            self.check_consent = engine.check_consent
+        else:
+            self.check_consent = engine.gdpr_manager.consent_manager.check_consent
+
+    def store_user(self, record):
+        self.engine.store_personal_data(record['user_id'], record)
+
+    def store_consent(self, record):
+        self.engine.store_consent(record['user_id'], record['type'], record['status'])
+
+    def log(self, events):
+        if len(events) == 1:
+            event = events[0]
+            return self.engine.log_data_processing_activity(event['user_id'], event['activity_type'], event['data_processed'])
+        return self.engine.log_data_processing_activities(events)
+
+    def get_logs(self, user_id):
+        return self.engine.get_logs(user_id)
+
+    def access_request(self, user_id):
+        return next(iter(self.engine.process_data_access_requests([user_id])))
+
+    def erase(self, user_id):
+        return self.engine.right_to_be_forgotten(user_id)
+
+    def close(self):
+        self.engine.close()
+
+def make_target(args):
+    if args.backend in MEMORY_BACKENDS:
+        return AppTarget(load_app(), args.backend)
+    if args.backend == 'sharded':
+        return SQLTarget(ShardedDataProtectionEngine(args.database_url, shards=args.shards, buffered=True))
+    return SQLTarget(SQLEngine(args.database_url or "sqlite:///:memory:", buffered=True))
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation {name}, expected one of {', '.join(OPERATIONS)}")
+        mix[name] = float(weight)
+    return mix
+
+def setup(target, generator, preload):
+    # Profiles and consent histories for every user, then preload events
+    # so reads run against a populated log
+    start = time.perf_counter()
+    for records in generator.users(SETUP_BATCH_SIZE):
+        for record in records:
+            target.store_user(record)
+    for records in generator.consents(SETUP_BATCH_SIZE):
+        for record in records:
+            target.store_consent(record)
+
+    # Preloaded events come from a different seed than the replayed ones
+    preload_generator = WorkloadGenerator(
+        users=generator.user_count,
+        seed=generator.seed + 1,
+        skew=generator.sampler.skew,
+        consent_types=generator.consent_types
+    )
+    for events in preload_generator.events(preload, SETUP_BATCH_SIZE):
+        target.log(events)
+    return time.perf_counter() - start
+
+def operations(generator, count, mix, batch_size):
+    # (operation, argument) pairs drawn with the mix weights. Log operations
+    # carry batch_size generated events; the others a Zipf-skewed user, so
+    # reads and erasures hit the same heavy users as the writes.
+    rng = random.Random(f"{generator.seed}:operations")
+    names = list(mix)
+    weights = list(mix.values())
+    events = chain.from_iterable(generator.events(count * batch_size))
+
+    for name in rng.choices(names, weights=weights, k=count):
+        if name == 'log':
+            yield name, list(islice(events, batch_size))
+        else:
+            yield name, generator.user_sample(rng, 1)[0]
+
+def replay(target, ops, rate):
+    # Open loop: operation i is due at i / rate seconds. Latency is measured
+    # from when it was due, so falling behind shows up as latency instead
+    # of silently lowering the offered load.
+    calls = {name: getattr(target, name) for name in OPERATIONS}
+    latencies = {name: [] for name in OPERATIONS}
+    per_second = Counter()
+    events = 0
+
+    start = time.perf_counter()
+    for i, (name, argument) in enumerate(ops):
+        if rate:
+            due = start + i / rate
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        else:
+            due = time.perf_counter()
+
+        calls[name](argument)
+        done = time.perf_counter()
+        latencies[name].append(done - due)
+        per_second[int(done - start)] += 1
+        if name == 'log':
+            events += len(argument)
+    return time.perf_counter() - start, latencies, per_second, events
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def summarize(latencies):
+    rows = {}
+    for name, samples in latencies.items():
+        if not samples:
+            continue
+        ordered = sorted(samples)
+        rows[name] = {
+            'ops': len(ordered),
+            'p50_ms': round(percentile(ordered, 0.50) * 1000, 3),
+            'p99_ms': round(percentile(ordered, 0.99) * 1000, 3),
+            'p999_ms': round(percentile(ordered, 0.999) * 1000, 3),
+            'max_ms': round(ordered[-1] * 1000, 3)
+        }
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a synthetic GDPR workload against an engine and report throughput and latency")
+    parser.add_argument("--backend", choices=BACKENDS, default='indexed')
+    parser.add_argument("--users", type=lambda value: int(float(value)), default=10000)
+    parser.add_argument("--operations", type=lambda value: int(float(value)), default=100000, help="operations to replay, e.g. 1e6")
+    parser.add_argument("--preload", type=lambda value: int(float(value)), default=100000, help="events logged before the replay")
+    parser.add_argument("--rate", type=float, default=0, help="target operations per second, 0 for as fast as possible")
+    parser.add_argument("--batch-size", type=int, default=1, help="events per log operation; above 1 the batch API is used")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"operation weights (default {DEFAULT_MIX})")
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of user popularity")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database-url", help="SQL backends; sharded URLs need {shard}")
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--output", help="write the report as JSON to this path")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    generator = WorkloadGenerator(users=args.users, seed=args.seed, skew=args.skew)
+    target = make_target(args)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    try:
+        setup_seconds = setup(target, generator, args.preload)
+        print(f"setup: {args.users:,} users, {args.preload:,} events in {setup_seconds:.1f}s "
+              f"(top 1% of users get {generator.sampler.share(max(1, args.users // 100)):.0%} of events)")
+
+        elapsed, latencies, per_second, events = replay(target, operations(generator, args.operations, args.mix, args.batch_size), args.rate)
+    finally:
+        target.close()
+
+    # Whole seconds only; the last one is partial
+    full_seconds = [per_second[second] for second in range(int(elapsed))]
+    summary = summarize(latencies)
+    report = {
+        'generated_at': datetime.utcnow().isoformat(),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        'seconds': round(elapsed, 3),
+        'ops_per_sec': round(args.operations / elapsed, 1),
+        'events_per_sec': round(events / elapsed, 1),
+        'slowest_second_ops': min(full_seconds) if full_seconds else None,
+        'operations': summary
+    }
+
+    print(f"{args.operations:,} operations in {elapsed:.2f}s: {report['ops_per_sec']:,.0f} ops/s, "
+          f"{report['events_per_sec']:,.0f} events/s, slowest second {report['slowest_second_ops']} ops")
+    if args.rate and report['ops_per_sec'] < args.rate * 0.99:
+        print(f"target rate of {args.rate:,.0f} ops/s was not sustained")
+    for name, row in summary.items():
+        print(f"{name:<16} {row['ops']:>10,} ops  p50 {row['p50_ms']:>9.3f} ms  p99 {row['p99_ms']:>9.3f} ms  "
+              f"p99.9 {row['p999_ms']:>9.3f} ms  max {row['max_ms']:>9.3f} ms")
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+
+if __name__ == "__main__":
+    main()
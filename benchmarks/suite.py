@@ -0,0 +1,259 @@
+import argparse
+import functools
+import importlib.util
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.data_protection import EncryptoDataProtectionEngine as SQLEngine
+
+APP_PATH = os.path.join(ROOT, "gdpr-compliance-streamlit-app.py")
+MEMORY_BACKENDS = ('indexed', 'compact', 'segment')
+SQL_BACKENDS = ('sqlalchemy', 'sqlalchemy_encrypted')
+BACKENDS = MEMORY_BACKENDS + SQL_BACKENDS
+ACTIVITIES = ["authentication", "transaction_processing", "data_access_request", "consent_update"]
+LOGS_PER_USER = 10
+
+def load_app():
+    # The app file name is not importable as a module; main() only runs
+    # under `streamlit run`, so loading it just defines the classes
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    spec = importlib.util.spec_from_file_location("gdpr_app", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def personal_record(user_id):
+    return {
+        "user_id": user_id,
+        "username": user_id,
+        "email": f"{user_id}@example.com",
+        "phone": "1234567890",
+        "address": "123 Privacy Street",
+        "transaction_details": {"amount": "$250.00"},
+        "created_at": "2025-04-08 12:00:00"
+    }
+
+class MemoryBackend:
+    # The Streamlit app's engine over one of its own log stores; the segment
+    # store writes to a throwaway directory
+    def __init__(self, app, backend):
+        self.directory = None
+        if backend == 'segment':
+            self.directory = tempfile.mkdtemp(prefix="gdpr-bench-")
+            app.LOG_BACKENDS['segment'] = functools.partial(app.SegmentLogStore, self.directory)
+        self.engine = app.EncryptoDataProtectionEngine(log_backend=backend)
+        self.log = self.engine.data_processing_log
+        self.consents = self.engine.gdpr_manager.consent_manager
+
+    def log_activity(self, user_id, activity_type, data):
+        return self.engine.log_data_processing_activity(user_id, activity_type, data)
+
+    def finish_logging(self):
+        pass
+
+    def grant_consent(self, user_id):
+        self.consents.update_consent(user_id, 'data_processing', True)
+
+    def get_logs(self, user_id):
+        return self.log.get_logs(user_id=user_id)
+
+    def delete_logs(self, user_id):
+        return self.log.delete_logs(user_id)
+
+    def right_to_be_forgotten(self, user_id):
+        return self.engine.right_to_be_forgotten(user_id)
+
+    def anonymize_personal_data(self, record):
+        return self.engine.gdpr_manager.anonymize_personal_data(record)
+
+    def minimize_data(self, record):
+        return self.engine.data_minimization.minimize_data('transaction_processing', record)
+
+    def check_consent(self, user_id):
+        return self.consents.check_consent(user_id)
+
+    def close(self):
+        self.log.retention_sweeper.stop()
+        if self.log.compactor is not None:
+            self.log.compactor.stop()
+            self.log.store.close()
+        if self.directory is not None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+class SQLBackend:
+    # src.data_protection's engine with buffered log writes, optionally
+    # with payload field encryption under a throwaway master key
+    def __init__(self, app, database_url, field_encryption=False):
+        master_key = os.urandom(32) if field_encryption else None
+        self.engine = SQLEngine(database_url, buffered=True, field_encryption=field_encryption, master_key=master_key)
+        self.policies = app.MINIMIZATION_POLICIES
+        self.minimize_record = app.minimize_record
+
+    def log_activity(self, user_id, activity_type, data):
+        return self.engine.log_data_processing_activity(user_id, activity_type, data)
+
+    def finish_logging(self):
+        self.engine.flush()
+
+    def grant_consent(self, user_id):
+        self.engine.store_consent(user_id, 'data_processing', True)
+
+    def get_logs(self, user_id):
+        return self.engine.get_logs(user_id)
+
+    def right_to_be_forgotten(self, user_id):
+        return self.engine.right_to_be_forgotten(user_id)
+
+    def anonymize_personal_data(self, record):
+        return self.engine.gdpr_manager.anonymize_personal_data(record)
+
+    def minimize_data(self, record):
+        return self.minimize_record(self.policies['transaction_processing'], record)
+
+    def check_consent(self, user_id):
+        return self.engine.gdpr_manager.consent_manager.check_consent(user_id)
+
+    def close(self):
+        self.engine.close()
+
+def timed(func, items):
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    return time.perf_counter() - start
+
+def result(backend, operation, size, count, seconds):
+    return {
+        'backend': backend,
+        'operation': operation,
+        'size': size,
+        'ops': count,
+        'seconds': round(seconds, 6),
+        'ops_per_sec': round(count / seconds, 1) if seconds else None,
+        'us_per_op': round(seconds / count * 1e6, 3) if count else None
+    }
+
+def run_size(app, backend_name, size, samples, database_url, seed):
+    rng = random.Random(seed)
+    if backend_name in SQL_BACKENDS:
+        backend = SQLBackend(app, database_url, field_encryption=backend_name == 'sqlalchemy_encrypted')
+    else:
+        backend = MemoryBackend(app, backend_name)
+
+    user_count = max(1, size // LOGS_PER_USER)
+    users = [f"user{i}" for i in range(user_count)]
+    results = []
+
+    try:
+        # log_activity fills the store that every other operation runs against
+        start = time.perf_counter()
+        for i in range(size):
+            activity_type = ACTIVITIES[i % len(ACTIVITIES)]
+            backend.log_activity(users[i % user_count], activity_type, {"sequence": i, "activity": activity_type})
+        backend.finish_logging()
+        results.append(result(backend_name, 'log_activity', size, size, time.perf_counter() - start))
+
+        sampled = rng.sample(users, min(samples, user_count))
+        for user_id in sampled[::2]:
+            backend.grant_consent(user_id)
+
+        checks = [rng.choice(users) for _ in range(samples)]
+        results.append(result(backend_name, 'check_consent', size, samples, timed(backend.check_consent, checks)))
+        results.append(result(backend_name, 'get_logs', size, len(sampled), timed(backend.get_logs, sampled)))
+
+        records = [personal_record(user_id) for user_id in checks]
+        results.append(result(backend_name, 'anonymize_personal_data', size, len(records), timed(backend.anonymize_personal_data, records)))
+        results.append(result(backend_name, 'minimize_data', size, len(records), timed(backend.minimize_data, records)))
+
+        # Erase disjoint halves so each call removes real rows
+        half = len(sampled) // 2
+        # The SQL engine only deletes logs as part of a full erasure
+        if backend_name not in SQL_BACKENDS:
+            results.append(result(backend_name, 'delete_logs', size, half, timed(backend.delete_logs, sampled[:half])))
+        erased = sampled[half:]
+        results.append(result(backend_name, 'right_to_be_forgotten', size, len(erased), timed(backend.right_to_be_forgotten, erased)))
+    finally:
+        backend.close()
+    return results
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline_path, threshold):
+    # Flags operations whose throughput dropped by more than threshold
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)
+    previous = {(r['backend'], r['operation'], r['size']): r for r in baseline['results']}
+
+    regressions = []
+    for current in results:
+        before = previous.get((current['backend'], current['operation'], current['size']))
+        if not before or not before['ops_per_sec'] or not current['ops_per_sec']:
+            continue
+        ratio = current['ops_per_sec'] / before['ops_per_sec']
+        marker = ""
+        if ratio < 1 - threshold:
+            regressions.append(current)
+            marker = "  REGRESSION"
+        print(f"{current['backend']:<20} {current['operation']:<24} {current['size']:>10,} {ratio:>7.2f}x{marker}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compliance hot paths on each storage backend")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--sizes", nargs="+", type=lambda value: int(float(value)), default=[1000, 10000, 100000],
+                        help="log entries per run, e.g. 1e3 1e5 1e7")
+    parser.add_argument("--samples", type=int, default=1000, help="calls per lookup/erasure operation")
+    parser.add_argument("--database-url", default="sqlite:///:memory:")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.2, help="throughput drop reported as a regression")
+    args = parser.parse_args()
+
+    app = load_app()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = []
+    for size in args.sizes:
+        for backend_name in args.backends:
+            for row in run_size(app, backend_name, size, args.samples, args.database_url, args.seed):
+                print(f"{row['backend']:<20} {row['operation']:<24} {row['size']:>10,} "
+                      f"{row['ops_per_sec']:>14,.0f} ops/s  {row['us_per_op']:>10.2f} us/op")
+                results.append(row)
+
+    report = {
+        'generated_at': datetime.utcnow().isoformat(),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'samples': args.samples,
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
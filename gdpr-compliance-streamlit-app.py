@@ -1,15 +1,53 @@
 import streamlit as st
 import pandas as pd
-import hashlib
 import uuid
 from datetime import datetime, timedelta
 import logging
 import os
+import threading
+from functools import partial
 from typing import Dict, List, Any, Optional
 
+from src.log_store import IndexedLogStore
+from src.compact_log import CompactLogStore
+from src.segment_log import SegmentCompactor, SegmentLogStore
+from src.anonymization import DEFAULT_CHUNK_SIZE, anonymize_record, anonymize_batch, chunked
+from src.dsar import process_access_requests
+from src.erasure import ErasureJob
+from src.config import load_config
+from src.retention import RetentionSweeper
+from src.consent_store import ConsentStore
+from src.crypto_shredding import Keyring, SQLiteKeyStore
+from src.field_encryption import load_master_key
+from src.stats import ComplianceStats
+from src.minimization import NO_FIELDS, load_policies, minimize_record, minimize_batch
+from src.export import EXPORT_FORMATS, export_dsar_bundle, export_logs
+from src.metrics import PrometheusFileExporter, configure as configure_metrics, instrument
+from src.pii import anonymize_and_redact, anonymize_and_redact_batch, load_scanner, redact_dataframe, redact_fields
+from src.tokenization import TOKENIZED_FIELDS, load_token_vault
+from src.audit import AuditTrail, AuditTrailFile, deletion_record, entry_record, verify_inclusion
+from src.workload import ACTIVITY_TYPES, WorkloadGenerator
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 
+CONFIG = load_config()
+RETENTION_PERIOD_DAYS = int(CONFIG['gdpr']['retention_period_days'])
+MINIMIZATION_POLICIES = load_policies(CONFIG)
+PII_SCANNER = load_scanner(CONFIG)
+REDACT_ACCESS_REQUESTS = bool(CONFIG['pii']['redact_access_requests'])
+REDACT_LOGS = bool(CONFIG['pii']['redact_logs'])
+AUDIT_ENABLED = bool(CONFIG['audit']['enabled'])
+
+EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'exports')
+# Larger exports stay on the server instead of being loaded for download
+EXPORT_DOWNLOAD_LIMIT_BYTES = 50 * 1024 * 1024
+
+LOG_PAGE_SIZES = [25, 50, 100, 250]
+
+METRICS = configure_metrics(CONFIG)
+METRICS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), CONFIG['metrics']['prometheus_file'])
+
 # Core GDPR and Data Protection Classes
 class DataProtectionPolicy:
     def __init__(self):
@@ -18,70 +56,97 @@ class DataProtectionPolicy:
     def get_policy_details(self):
         return {
             "last_updated": "April 8, 2025",
-            "retention_period": "2 years",
+            "retention_period": f"{RETENTION_PERIOD_DAYS} days",
             "data_access_process": "Users can request their data through the Data Access tab",
             "erasure_process": "Users can request data deletion through the Right to be Forgotten tab"
         }
 
 class ConsentManager:
-    def check_consent(self, user_id):
+    def __init__(self, lock=None, stats=None):
         # In a real application, this would query a database
-        # Here we'll use session state to simulate persistence
-        if 'consents' not in st.session_state:
-            st.session_state.consents = {}
-        
-        return st.session_state.consents.get(user_id, False)
+        # Here the store lives in memory, shared by every session
+        self.store = ConsentStore(CONFIG['gdpr']['consent_types'])
+        self.lock = lock or threading.RLock()
+        self.stats = stats
+
+    def check_consent(self, user_id, consent_type='data_processing'):
+        with self.lock:
+            return self.store.check(user_id, consent_type)
+
+    def check_consents(self, user_ids, consent_type='data_processing'):
+        with self.lock:
+            return self.store.check_consents(user_ids, consent_type)
 
     def update_consent(self, user_id, consent_type, status, timestamp=None):
-        if timestamp is None:
-            timestamp = datetime.utcnow()
-            
-        if 'consents' not in st.session_state:
-            st.session_state.consents = {}
-            
-        if user_id not in st.session_state.consents:
-            st.session_state.consents[user_id] = {}
-            
-        st.session_state.consents[user_id] = {
-            'status': status,
-            'type': consent_type,
-            'timestamp': timestamp
-        }
-        
+        with self.lock:
+            if self.stats is not None:
+                self.stats.record_consent(consent_type, self.store.status(user_id, consent_type), bool(status))
+            self.store.update(user_id, consent_type, status, timestamp)
+        return True
+
+    def get_current_consents(self, user_id):
+        with self.lock:
+            return self.store.current(user_id)
+
+    def get_consent_history(self, user_id):
+        with self.lock:
+            return self.store.history(user_id)
+
+    def delete_consents(self, user_id):
+        with self.lock:
+            if self.stats is not None:
+                self.stats.remove_consents(self.store.current(user_id))
+            self.store.delete_user(user_id)
         return True
 
 class DataSubjectRightsHandler:
+    def __init__(self, lock=None, keyring=None):
+        # In a real app, this would be a database
+        self.user_data: Dict[str, Dict[str, Any]] = {}
+        self.lock = lock or threading.RLock()
+        self.keyring = keyring
+
     def retrieve_personal_data(self, user_id):
-        # In a real app, this would fetch from a database
-        # Here we'll simulate with session state
-        if 'user_data' not in st.session_state:
-            st.session_state.user_data = {}
-            
         # Return stored data or default data if not found
-        if user_id in st.session_state.user_data:
-            return st.session_state.user_data[user_id]
-        else:
-            return {
-                "user_id": user_id,
-                "email": f"{user_id}@example.com",
-                "phone": "1234567890",
-                "address": "123 Privacy Street",
-                "created_at": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-            }
+        with self.lock:
+            data = self.user_data.get(user_id)
+        if data is not None:
+            return self.keyring.decrypt(user_id, data) if self.keyring is not None else data
+        return {
+            "user_id": user_id,
+            "email": f"{user_id}@example.com",
+            "phone": "1234567890",
+            "address": "123 Privacy Street",
+            "created_at": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        }
+    
+    def retrieve_personal_data_batch(self, user_ids):
+        # Same defaults as retrieve_personal_data, one lock acquisition per batch
+        with self.lock:
+            return {user_id: self.retrieve_personal_data(user_id) for user_id in user_ids}
     
     def store_personal_data(self, user_id, data):
-        if 'user_data' not in st.session_state:
-            st.session_state.user_data = {}
-            
-        st.session_state.user_data[user_id] = data
+        if self.keyring is not None:
+            data = self.keyring.encrypt(user_id, data)
+        with self.lock:
+            self.user_data[user_id] = data
+        return True
+
+    def delete_personal_data(self, user_id):
+        with self.lock:
+            self.user_data.pop(user_id, None)
         return True
 
 class GDPRComplianceManager:
-    def __init__(self):
+    def __init__(self, lock=None, keyring=None, stats=None, token_vault=None):
+        # Set when tokenization is on; email, phone and address become
+        # reversible keyed tokens instead of hashes and masks
+        self.token_vault = token_vault
         self.data_protection_policy = DataProtectionPolicy()
-        self.consent_manager = ConsentManager()
-        self.data_subject_rights = DataSubjectRightsHandler()
+        self.consent_manager = ConsentManager(lock=lock, stats=stats)
+        self.data_subject_rights = DataSubjectRightsHandler(lock=lock, keyring=keyring)
 
+    @instrument('process_data_access_request')
     def process_data_access_request(self, user_id: str) -> Dict[str, Any]:
         try:
             user_data = self.data_subject_rights.retrieve_personal_data(user_id)
@@ -99,20 +164,57 @@ class GDPRComplianceManager:
                 'message': 'Unable to process data access request'
             }
 
-    def anonymize_personal_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        anonymized = data.copy()
-
-        if 'email' in anonymized:
-            anonymized['email'] = hashlib.sha256(anonymized['email'].encode()).hexdigest()
+    def process_data_access_requests(self, user_ids, batch_size: int = 1000, max_workers: Optional[int] = None):
+        # Streams one result dict (with user_id and status) per requested user
+        if self.token_vault is not None:
+            # Tokenized once per batch; workers only redact what is left
+            return process_access_requests(
+                user_ids,
+                self.data_subject_rights.retrieve_personal_data_batch,
+                batch_size=batch_size,
+                max_workers=max_workers,
+                anonymize=partial(redact_fields, scanner=PII_SCANNER, skip=TOKENIZED_FIELDS) if REDACT_ACCESS_REQUESTS else dict,
+                tokenize=self.token_vault.tokenize_records
+            )
+        return process_access_requests(
+            user_ids,
+            self.data_subject_rights.retrieve_personal_data_batch,
+            batch_size=batch_size,
+            max_workers=max_workers,
+            anonymize=partial(anonymize_and_redact, scanner=PII_SCANNER) if REDACT_ACCESS_REQUESTS else anonymize_record
+        )
 
-        if 'phone' in anonymized:
-            anonymized['phone'] = '*' * len(anonymized['phone'])
-            
-        if 'address' in anonymized:
-            anonymized['address'] = '*** REDACTED ***'
+    def anonymize_personal_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        # Nested PII outside email, phone and address is redacted as well
+        if self.token_vault is not None:
+            tokenized = self.token_vault.tokenize_records([data])[0]
+            return redact_fields(tokenized, PII_SCANNER, skip=TOKENIZED_FIELDS) if REDACT_ACCESS_REQUESTS else tokenized
+        if REDACT_ACCESS_REQUESTS:
+            return anonymize_and_redact(data, PII_SCANNER)
+        return anonymize_record(data)
 
-        return anonymized
+    def anonymize_personal_data_batch(self, records, max_workers: Optional[int] = None):
+        # Accepts a DataFrame (anonymized column-wise) or an iterable of
+        # records; email hashing is spread over a process pool. Tokens are
+        # written to the vault one transaction per chunk. Redaction matches
+        # anonymize_personal_data.
+        if self.token_vault is not None:
+            if isinstance(records, pd.DataFrame):
+                tokenized = self.token_vault.tokenize_dataframe(records)
+                return redact_dataframe(tokenized, PII_SCANNER, skip=TOKENIZED_FIELDS) if REDACT_ACCESS_REQUESTS else tokenized
+            tokenized = [
+                record
+                for chunk in chunked(records, DEFAULT_CHUNK_SIZE)
+                for record in self.token_vault.tokenize_records(chunk)
+            ]
+            if REDACT_ACCESS_REQUESTS:
+                return [redact_fields(record, PII_SCANNER, skip=TOKENIZED_FIELDS) for record in tokenized]
+            return tokenized
+        if REDACT_ACCESS_REQUESTS:
+            return anonymize_and_redact_batch(records, PII_SCANNER, max_workers=max_workers)
+        return anonymize_batch(records, max_workers=max_workers)
 
+    @instrument('manage_user_consent', failed=lambda result: result is False)
     def manage_user_consent(self, user_id: str, consent_type: str, status: bool) -> bool:
         try:
             return self.consent_manager.update_consent(
@@ -125,72 +227,313 @@ class GDPRComplianceManager:
             logging.error(f"Consent Management Error: {e}")
             return False
 
+LOG_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), CONFIG['log_store']['directory'])
+AUDIT_TRAIL_FILE = 'audit.trail'
+KEYRING_FILE = 'user_keys.db'
+
+# Available processing log backends
+LOG_BACKENDS = {
+    'indexed': IndexedLogStore,
+    'compact': CompactLogStore,
+    'segment': partial(
+        SegmentLogStore,
+        LOG_STORE_DIR,
+        segment_size=int(CONFIG['log_store']['segment_size_mb']) * 1024 * 1024,
+        fsync=bool(CONFIG['log_store']['fsync']),
+        compact_min_dead=int(CONFIG['log_store']['compaction_min_dead'])
+    )
+}
+
 class DataProcessingLog:
-    def __init__(self):
-        # Initialize an empty list if not already in session state
-        if 'data_processing_logs' not in st.session_state:
-            st.session_state.data_processing_logs = []
+    def __init__(self, backend='indexed', lock=None, keyring=None, stats=None):
+        self.store = LOG_BACKENDS[backend]()
+        # Set when crypto-shredding is on; payloads are stored encrypted
+        self.keyring = keyring
+        self.stats = stats
+        
+        # Shared with background erasure jobs and the retention sweeper
+        self.lock = lock or threading.RLock()
+        
+        # Entries recovered from disk count towards the statistics
+        if self.stats is not None:
+            for entry in self.store:
+                self.stats.record_log(entry)
+        
+        # Merkle trail of every append and deletion, kept next to the
+        # segment files when the log is on disk
+        self.audit = None
+        self.audit_checkpoint = None
+        self._audit_file = None
+        if AUDIT_ENABLED:
+            if isinstance(self.store, SegmentLogStore):
+                self._audit_file = AuditTrailFile(
+                    os.path.join(self.store.directory, AUDIT_TRAIL_FILE),
+                    fsync=bool(CONFIG['log_store']['fsync'])
+                )
+                self.audit = self._audit_file.load()
+            else:
+                self.audit = AuditTrail()
+            if len(self.store) and not len(self.audit):
+                logging.warning(f"Starting the audit trail from {len(self.store)} existing log entries")
+                for entry in self.store:
+                    self.audit.append(entry_record(entry))
+        
+        # Reclaims disk space after deletes and purges, off the request path
+        self.compactor = None
+        if isinstance(self.store, SegmentLogStore):
+            self.compactor = SegmentCompactor(
+                self.store,
+                interval=float(CONFIG['log_store']['compaction_interval_seconds']),
+                lock=self.lock
+            ).start()
+        
+        # Sweeps through purge_expired below so the statistics follow
+        self.retention_sweeper = RetentionSweeper(
+            self,
+            interval=float(CONFIG['gdpr']['retention_sweep_interval_seconds']),
+            lock=self.lock
+        ).start()
     
     def log_activity(self, user_id, activity_type, data_processed, consent_given=False):
+        if REDACT_LOGS:
+            data_processed = PII_SCANNER.redact(data_processed)
+        
         log_entry = {
             'id': str(uuid.uuid4()),
             'user_id': user_id,
             'activity_type': activity_type,
             'timestamp': datetime.utcnow(),
-            'data_processed': data_processed,
+            'data_processed': self.keyring.encrypt(user_id, data_processed) if self.keyring is not None else data_processed,
             'is_consent_given': consent_given,
-            'retention_period': datetime.utcnow() + timedelta(days=730)
+            'retention_period': datetime.utcnow() + timedelta(days=RETENTION_PERIOD_DAYS)
         }
         
-        st.session_state.data_processing_logs.append(log_entry)
+        # Hashed outside the lock; only the tree append happens under it
+        audit_record = entry_record(log_entry) if self.audit is not None else None
+        
+        with self.lock:
+            self.store.append(log_entry)
+            if audit_record is not None:
+                self.audit.append(audit_record)
+            if self.stats is not None:
+                self.stats.record_log(log_entry)
         return log_entry
     
-    def get_logs(self, user_id=None):
-        if user_id:
-            return [log for log in st.session_state.data_processing_logs if log['user_id'] == user_id]
-        return st.session_state.data_processing_logs
+    def log_activities(self, events):
+        # Batch version of log_activity: entries are built and hashed
+        # outside the lock, then written with one store call
+        now = datetime.utcnow()
+        retention_period = now + timedelta(days=RETENTION_PERIOD_DAYS)
+        
+        payloads = [event.get('data_processed') or {} for event in events]
+        if REDACT_LOGS:
+            payloads = [PII_SCANNER.redact(payload) for payload in payloads]
+        if self.keyring is not None:
+            payloads = self.keyring.encrypt_batch(zip((event['user_id'] for event in events), payloads))
+        
+        log_entries = [
+            {
+                'id': str(uuid.uuid4()),
+                'user_id': event['user_id'],
+                'activity_type': event['activity_type'],
+                'timestamp': now,
+                'data_processed': payload,
+                'is_consent_given': bool(event.get('consent_given')),
+                'retention_period': retention_period
+            }
+            for event, payload in zip(events, payloads)
+        ]
+        audit_records = [entry_record(entry) for entry in log_entries] if self.audit is not None else []
+        
+        with self.lock:
+            self.store.extend(log_entries)
+            if audit_records:
+                self.audit.extend(audit_records)
+            if self.stats is not None:
+                for entry in log_entries:
+                    self.stats.record_log(entry)
+        return log_entries
+    
+    def get_logs(self, user_id=None, activity_type=None):
+        with self.lock:
+            logs = self.store.query(user_id=user_id, activity_type=activity_type)
+        return self._readable(logs)
+    
+    def get_activity_types(self):
+        with self.lock:
+            return sorted(self.store.activity_types())
+    
+    def count_user_logs(self, user_id):
+        with self.lock:
+            return self.store.count_user_logs(user_id)
+    
+    def get_logs_page(self, cursor=None, page_size=50, user_id=None, activity_type=None, start=None, end=None, newest_first=True):
+        # One page from the store's time index plus the cursor for the next
+        # page (None on the last one); cost depends on the page size only
+        with self.lock:
+            logs, next_cursor = self.store.scan(
+                cursor=cursor,
+                limit=page_size,
+                user_id=user_id,
+                activity_type=activity_type,
+                start=start,
+                end=end,
+                reverse=newest_first
+            )
+        return self._readable(logs), next_cursor
+    
+    def iter_logs(self, user_id=None, activity_type=None, start=None, end=None, chunk_size=10000):
+        # Yields logs in time order, one chunk at a time. The lock is only
+        # held while a chunk is read, so logging continues during exports.
+        store = self.store
+        lock = self.lock
+        cursor = None
+        
+        while True:
+            with lock:
+                chunk, cursor = store.scan(
+                    cursor=cursor,
+                    limit=chunk_size,
+                    user_id=user_id,
+                    activity_type=activity_type,
+                    start=start,
+                    end=end
+                )
+            if chunk:
+                yield self._readable(chunk)
+            if cursor is None:
+                return
     
     def delete_logs(self, user_id):
-        if 'data_processing_logs' in st.session_state:
-            st.session_state.data_processing_logs = [
-                log for log in st.session_state.data_processing_logs 
-                if log['user_id'] != user_id
-            ]
+        with self.lock:
+            removed = self.store.delete_user(user_id)
+            self._audit_deletions(removed)
+            if self.stats is not None:
+                self.stats.remove_logs(removed)
         return True
+    
+    def purge_expired(self, now=None):
+        with self.lock:
+            removed = self.store.purge_expired(now)
+            self._audit_deletions(removed)
+            if self.stats is not None:
+                self.stats.remove_logs(removed, purged=True)
+        return removed
+    
+    def verify_audit_trail(self, full=False):
+        # Re-hashes the entries logged since the last good checkpoint (all
+        # of them when full) and proves the rest unchanged from it
+        if self.audit is None:
+            return {'status': 'error', 'message': 'Audit trail is disabled'}
+        
+        with self.lock:
+            size = len(self.audit)
+            stored_count = len(self.store)
+        result = self.audit.verify(
+            self._find_recent,
+            since=None if full else self.audit_checkpoint,
+            stored_count=stored_count,
+            size=size
+        )
+        if result['status'] == 'success':
+            self.audit_checkpoint = result['checkpoint']
+        return result
+    
+    def prove_log_entry(self, log_id):
+        if self.audit is None:
+            return None
+        proof = self.audit.prove(log_id)
+        if proof is not None:
+            proof['verified'] = verify_inclusion(
+                bytes.fromhex(proof['leaf']),
+                proof['index'],
+                proof['size'],
+                [bytes.fromhex(node) for node in proof['proof']],
+                bytes.fromhex(proof['root'])
+            )
+        return proof
+    
+    def _audit_deletions(self, removed):
+        if removed and self.audit is not None:
+            self.audit.append(deletion_record([entry['id'] for entry in removed]))
+    
+    def _find_recent(self, log_ids):
+        # Entries being verified are the most recent ones, so the store is
+        # walked newest first until all are found
+        wanted = set(log_ids)
+        cursor = None
+        while wanted:
+            with self.lock:
+                page, cursor = self.store.scan(cursor=cursor, limit=1000, reverse=True)
+            for entry in page:
+                if entry['id'] in wanted:
+                    wanted.discard(entry['id'])
+                    yield entry
+            if cursor is None:
+                return
+    
+    def _readable(self, logs):
+        # Decryption happens outside the lock, one batch per call
+        if self.keyring is None:
+            return logs
+        return self.keyring.decrypt_entries(logs)
 
 class DataminimizationEngine:
-    def __init__(self):
-        self.allowed_purposes = [
-            'authentication',
-            'transaction_processing',
-            'fraud_prevention',
-            'customer_support'
-        ]
+    def __init__(self, policies=None):
+        # Purpose -> frozen field set, compiled once at import
+        self.policies = policies if policies is not None else MINIMIZATION_POLICIES
+        self.allowed_purposes = list(self.policies)
 
     def validate_data_processing(self, purpose: str, data: Dict[str, Any]) -> bool:
-        if purpose not in self.allowed_purposes:
-            return False
-
-        minimized_data = self.minimize_data(purpose, data)
-        return True
+        return purpose in self.policies
 
     def minimize_data(self, purpose: str, data: Dict[str, Any]) -> Dict[str, Any]:
-        minimization_rules = {
-            'authentication': ['username', 'email'],
-            'transaction_processing': ['user_id', 'transaction_details'],
-            'fraud_prevention': ['user_id', 'transaction_history'],
-            'customer_support': ['user_id', 'contact_information']
-        }
+        return minimize_record(self.policies.get(purpose, NO_FIELDS), data)
 
-        allowed_fields = minimization_rules.get(purpose, [])
-        return {k: v for k, v in data.items() if k in allowed_fields}
+    def minimize_batch(self, purpose: str, records):
+        # Projects a DataFrame or an iterable of records to the allowed fields
+        return minimize_batch(self.policies.get(purpose, NO_FIELDS), records)
 
 class EncryptoDataProtectionEngine:
-    def __init__(self):
-        self.gdpr_manager = GDPRComplianceManager()
-        self.data_processing_log = DataProcessingLog()
+    def __init__(self, log_backend='indexed'):
+        # One lock guards logs, consents and user data, so an erasure is
+        # never observed half done by another session
+        self.lock = threading.RLock()
+        self.keyring = None
+        if CONFIG['gdpr']['crypto_shredding']:
+            if log_backend == 'segment':
+                # The segments outlive the process, so their keys must too,
+                # wrapped by a master key that is not stored beside them
+                master_key = load_master_key(CONFIG)
+                if master_key is None:
+                    raise ValueError("Crypto-shredding with the segment log needs a master key, none is configured")
+                os.makedirs(LOG_STORE_DIR, exist_ok=True)
+                self.keyring = Keyring(SQLiteKeyStore(
+                    os.path.join(LOG_STORE_DIR, KEYRING_FILE),
+                    fsync=bool(CONFIG['log_store']['fsync']),
+                    master_key=master_key
+                ))
+            else:
+                self.keyring = Keyring()
+        self.token_vault = load_token_vault(CONFIG) if CONFIG['tokenization']['enabled'] else None
+        # Aggregates for the statistics dashboard, updated on every change
+        self.compliance_stats = ComplianceStats()
+        self.gdpr_manager = GDPRComplianceManager(
+            lock=self.lock,
+            keyring=self.keyring,
+            stats=self.compliance_stats,
+            token_vault=self.token_vault
+        )
+        self.data_processing_log = DataProcessingLog(
+            backend=log_backend,
+            lock=self.lock,
+            keyring=self.keyring,
+            stats=self.compliance_stats
+        )
         self.data_minimization = DataminimizationEngine()
+        self.erasure_jobs: Dict[str, ErasureJob] = {}
 
+    @instrument('log_data_processing_activity')
     def log_data_processing_activity(self, user_id, activity_type, data_processed):
         consent_given = self.gdpr_manager.consent_manager.check_consent(user_id)
         return self.data_processing_log.log_activity(
@@ -200,18 +543,64 @@ class EncryptoDataProtectionEngine:
             consent_given=consent_given
         )
 
+    @instrument('log_data_processing_activities')
+    def log_data_processing_activities(self, events):
+        # Bulk logging for ingestion; consent is looked up in one call for
+        # events that do not carry consent_given
+        unresolved = [event['user_id'] for event in events if event.get('consent_given') is None]
+        if unresolved:
+            consents = iter(self.gdpr_manager.consent_manager.check_consents(unresolved))
+            events = [
+                dict(event, consent_given=next(consents)) if event.get('consent_given') is None else event
+                for event in events
+            ]
+        return self.data_processing_log.log_activities(events)
+
+    @instrument('export_data_subject_bundle')
+    def export_data_subject_bundle(self, user_id, path, progress=None):
+        # Article 15 bundle: profile, consent history and every log entry,
+        # streamed from the user's index into a ZIP one chunk at a time
+        try:
+            result = self.gdpr_manager.process_data_access_request(user_id)
+            counts = export_dsar_bundle(
+                path,
+                user_id,
+                result['data'] if result['status'] == 'success' else None,
+                self.gdpr_manager.consent_manager.get_consent_history(user_id),
+                self.data_processing_log.iter_logs(user_id=user_id),
+                progress
+            )
+            return {'status': 'success', 'path': path, **counts}
+        except Exception as e:
+            logging.error(f"Data Access Bundle Error: {e}")
+            return {
+                'status': 'error',
+                'message': 'Unable to export data access bundle'
+            }
+
+    @instrument('right_to_be_forgotten')
     def right_to_be_forgotten(self, user_id):
         try:
-            # Delete processing logs
-            self.data_processing_log.delete_logs(user_id)
-            
-            # Remove consent records
-            if 'consents' in st.session_state and user_id in st.session_state.consents:
-                del st.session_state.consents[user_id]
+            with self.lock:
+                if self.keyring is not None:
+                    # Destroying the key makes every logged payload unreadable,
+                    # so the logs need not be searched
+                    self.keyring.shred(user_id)
+                else:
+                    # Delete processing logs
+                    self.data_processing_log.delete_logs(user_id)
+                
+                # Remove consent records
+                self.gdpr_manager.consent_manager.delete_consents(user_id)
+                    
+                # Remove user data
+                self.gdpr_manager.data_subject_rights.delete_personal_data(user_id)
+                
+                # Their tokens can no longer be re-identified
+                if self.token_vault is not None:
+                    self.token_vault.forget_users([user_id])
                 
-            # Remove user data
-            if 'user_data' in st.session_state and user_id in st.session_state.user_data:
-                del st.session_state.user_data[user_id]
+                self.compliance_stats.record_erasure()
 
             return {
                 'status': 'success',
@@ -224,6 +613,53 @@ class EncryptoDataProtectionEngine:
                 'message': f'Unable to erase user data: {str(e)}'
             }
 
+    def erase_users(self, user_ids, chunk_size=500):
+        # Runs in a background thread, so it only uses the engine's own
+        # objects; the lock is only held per chunk
+        logs = self.data_processing_log
+        consents = self.gdpr_manager.consent_manager
+        personal_data = self.gdpr_manager.data_subject_rights
+        
+        def erase_chunk(chunk):
+            with self.lock:
+                for user_id in chunk:
+                    if self.keyring is not None:
+                        self.keyring.shred(user_id)
+                    else:
+                        logs.delete_logs(user_id)
+                    consents.delete_consents(user_id)
+                    personal_data.delete_personal_data(user_id)
+                if self.token_vault is not None:
+                    self.token_vault.forget_users(chunk)
+                self.compliance_stats.record_erasure(len(chunk))
+        
+        job = ErasureJob(user_ids, erase_chunk, chunk_size=chunk_size)
+        with self.lock:
+            self.erasure_jobs[job.job_id] = job
+        return job.start()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'logs': len(self.data_processing_log.store),
+                'consents': len(self.gdpr_manager.consent_manager.store),
+                'users': len(self.gdpr_manager.data_subject_rights.user_data)
+            }
+
+@st.cache_resource
+def get_data_protection_engine():
+    # Built once per server process and shared by every session and rerun;
+    # per-session state is limited to UI state such as paging cursors
+    return EncryptoDataProtectionEngine(log_backend=CONFIG['log_store']['backend'])
+
+@st.cache_resource
+def get_metrics_exporter():
+    return PrometheusFileExporter(
+        METRICS_FILE,
+        interval=float(CONFIG['metrics']['prometheus_interval_seconds']),
+        registry=METRICS
+    ).start()
+
 # Streamlit UI Functions
 def render_home_page():
     st.title("GDPR Compliance Management System")
@@ -283,20 +719,22 @@ def render_consent_management(data_protection_engine):
         check_button = st.form_submit_button("Check Consent Status")
         
     if check_button and check_user_id:
-        consent_status = data_protection_engine.gdpr_manager.consent_manager.check_consent(check_user_id)
+        consent_manager = data_protection_engine.gdpr_manager.consent_manager
+        current_consents = consent_manager.get_current_consents(check_user_id)
         
-        if 'consents' in st.session_state and check_user_id in st.session_state.consents:
-            consent_data = st.session_state.consents[check_user_id]
-            st.info(f"Consent Status: {consent_data['status']}")
-            st.info(f"Consent Type: {consent_data['type']}")
-            st.info(f"Last Updated: {consent_data['timestamp']}")
+        if current_consents:
+            for consent_type, consent_data in current_consents.items():
+                st.info(f"{consent_type}: {'Given' if consent_data['status'] else 'Withdrawn'} (last updated {consent_data['timestamp']})")
+            
+            with st.expander("Consent History"):
+                st.dataframe(pd.DataFrame(consent_manager.get_consent_history(check_user_id)))
         else:
             st.warning("No consent records found for this user.")
 
 def render_data_subject_rights(data_protection_engine):
     st.title("Data Subject Rights")
     
-    tabs = st.tabs(["Data Access Request", "Right to be Forgotten"])
+    tabs = st.tabs(["Data Access Request", "Right to be Forgotten", "Bulk Access Requests", "Bulk Erasure", "Re-identification", "Full Data Export"])
     
     with tabs[0]:
         st.subheader("Request Data Access")
@@ -341,6 +779,148 @@ def render_data_subject_rights(data_protection_engine):
                     st.success("Your data has been successfully deleted")
                 else:
                     st.error(f"Error processing erasure request: {result.get('message', 'Unknown error')}")
+    
+    with tabs[2]:
+        st.subheader("Bulk Data Access Requests")
+        
+        with st.form("bulk_access_form"):
+            user_ids_text = st.text_area("User IDs (one per line)", key="bulk_access_user_ids")
+            bulk_button = st.form_submit_button("Process Requests")
+            
+        if bulk_button:
+            user_ids = [line.strip() for line in user_ids_text.splitlines() if line.strip()]
+            
+            if not user_ids:
+                st.error("Please enter at least one User ID")
+            else:
+                progress = st.progress(0.0)
+                status_counts = {}
+                failures = []
+                
+                # Results stream in as batches finish, only the summary is kept
+                results = data_protection_engine.gdpr_manager.process_data_access_requests(user_ids)
+                for processed, result in enumerate(results, start=1):
+                    status_counts[result['status']] = status_counts.get(result['status'], 0) + 1
+                    
+                    if result['status'] == 'success':
+                        data_protection_engine.log_data_processing_activity(
+                            user_id=result['user_id'],
+                            activity_type="data_access_request",
+                            data_processed={"request_time": datetime.utcnow().isoformat(), "bulk": True}
+                        )
+                    else:
+                        failures.append({'user_id': result['user_id'], 'status': result['status'], 'message': result.get('message')})
+                    
+                    if processed % 100 == 0:
+                        progress.progress(min(processed / len(user_ids), 1.0))
+                
+                progress.progress(1.0)
+                
+                st.success(f"Processed {sum(status_counts.values())} access requests")
+                st.json(status_counts)
+                
+                if failures:
+                    st.subheader("Failed Requests")
+                    st.dataframe(pd.DataFrame(failures))
+    
+    with tabs[3]:
+        st.subheader("Bulk Data Erasure")
+        
+        with st.form("bulk_erasure_form"):
+            user_ids_text = st.text_area("User IDs (one per line)", key="bulk_erasure_user_ids")
+            confirmation = st.checkbox("I understand this will permanently delete all data for these users")
+            bulk_erasure_button = st.form_submit_button("Start Erasure Job")
+            
+        if bulk_erasure_button:
+            user_ids = [line.strip() for line in user_ids_text.splitlines() if line.strip()]
+            
+            if not user_ids:
+                st.error("Please enter at least one User ID")
+            elif not confirmation:
+                st.error("Please confirm that you understand the implications of this action")
+            else:
+                job = data_protection_engine.erase_users(user_ids)
+                st.success(f"Erasure job {job.job_id} started for {job.total} users")
+        
+        with data_protection_engine.lock:
+            jobs = dict(data_protection_engine.erasure_jobs)
+        if jobs:
+            st.subheader("Erasure Jobs")
+            st.button("Refresh Progress")
+            
+            for job in jobs.values():
+                progress = job.progress()
+                st.progress(progress['fraction'], text=f"{job.job_id}: {progress['status']} ({progress['erased']}/{progress['total']})")
+                
+                if progress['status'] in ('failed', 'cancelled'):
+                    if progress['error']:
+                        st.error(progress['error'])
+                    if st.button("Resume", key=f"resume_{job.job_id}"):
+                        job.start()
+                elif progress['status'] == 'running':
+                    if st.button("Cancel", key=f"cancel_{job.job_id}"):
+                        job.cancel()
+    
+    with tabs[4]:
+        st.subheader("Re-identify Tokens")
+        
+        token_vault = data_protection_engine.token_vault
+        if token_vault is None:
+            st.info("Tokenization is disabled; access request results are hashed and cannot be re-identified.")
+        else:
+            with st.form("detokenize_form"):
+                tokens_text = st.text_area("Tokens (one per line)", key="detokenize_tokens")
+                detokenize_button = st.form_submit_button("Re-identify")
+            
+            if detokenize_button:
+                tokens = [line.strip() for line in tokens_text.splitlines() if line.strip()]
+                
+                if not tokens:
+                    st.error("Please enter at least one token")
+                else:
+                    # One vault lookup for all tokens
+                    values = token_vault.detokenize_many(tokens)
+                    st.dataframe(pd.DataFrame({
+                        'token': tokens,
+                        'value': [value if value is not None else "(unknown or erased)" for value in values]
+                    }))
+    
+    with tabs[5]:
+        st.subheader("Full Data Export")
+        st.markdown("Profile, consent history and every processing log entry of one user as a compressed bundle.")
+        
+        with st.form("bundle_form"):
+            user_id = st.text_input("User ID", key="bundle_user_id")
+            bundle_button = st.form_submit_button("Export Bundle")
+        
+        if bundle_button and user_id:
+            total = data_protection_engine.data_processing_log.count_user_logs(user_id)
+            progress = st.progress(0.0, text=f"0 / {total} log entries")
+            
+            def report(written):
+                progress.progress(min(written / total, 1.0) if total else 1.0, text=f"{written} / {total} log entries")
+            
+            file_name = f"data_access_{user_id}_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.zip"
+            path = os.path.join(EXPORT_DIR, file_name)
+            result = data_protection_engine.export_data_subject_bundle(user_id, path, report)
+            
+            if result['status'] == 'success':
+                progress.progress(1.0, text=f"{result['logs']} / {result['logs']} log entries")
+                st.success(f"Exported {result['logs']} log entries and {result['consents']} consent records to {path}")
+                
+                data_protection_engine.log_data_processing_activity(
+                    user_id=user_id,
+                    activity_type="data_access_request",
+                    data_processed={"request_time": datetime.utcnow().isoformat(), "bundle": True}
+                )
+                
+                if os.path.getsize(path) <= EXPORT_DOWNLOAD_LIMIT_BYTES:
+                    with open(path, 'rb') as bundle_file:
+                        st.download_button("Download Bundle", bundle_file, file_name, key='download-bundle')
+                else:
+                    st.info("The bundle is too large to download through the browser; fetch it from the server path above.")
+            else:
+                st.error(f"Error exporting data: {result.get('message', 'Unknown error')}")
 
 def render_data_processing_logs(data_protection_engine):
     st.title("Data Processing Activities")
@@ -352,23 +932,44 @@ def render_data_processing_logs(data_protection_engine):
         filter_user = st.text_input("Filter by User ID (leave empty for all)", "")
     
     with filter_col2:
-        # Get unique activity types
-        activity_types = []
-        if 'data_processing_logs' in st.session_state:
-            activity_types = list(set(log['activity_type'] for log in st.session_state.data_processing_logs))
+        # Unique activity types are maintained by the log store's index
+        activity_types = data_protection_engine.data_processing_log.get_activity_types()
         
         filter_activity = st.selectbox("Filter by Activity Type", ["All"] + activity_types)
     
-    # Get logs with filters applied
-    logs = data_protection_engine.data_processing_log.get_logs(
-        user_id=filter_user if filter_user else None
-    )
+    range_col1, range_col2, range_col3 = st.columns(3)
+    
+    with range_col1:
+        filter_start = st.date_input("From", value=None, key='log_filter_start')
+    
+    with range_col2:
+        filter_end = st.date_input("Until", value=None, key='log_filter_end')
     
-    # Apply activity type filter
-    if filter_activity != "All":
-        logs = [log for log in logs if log['activity_type'] == filter_activity]
+    with range_col3:
+        page_size = st.selectbox("Rows per page", LOG_PAGE_SIZES)
+    
+    user_id = filter_user if filter_user else None
+    activity_type = filter_activity if filter_activity != "All" else None
+    start = datetime.combine(filter_start, datetime.min.time()) if filter_start else None
+    end = datetime.combine(filter_end, datetime.min.time()) + timedelta(days=1) if filter_end else None
+    
+    # Cursors of the pages visited so far; any filter change starts over
+    filters = (user_id, activity_type, start, end, page_size)
+    if st.session_state.get('log_page_filters') != filters:
+        st.session_state.log_page_filters = filters
+        st.session_state.log_page_cursors = [None]
+    cursors = st.session_state.log_page_cursors
+    
+    # Only the current page is read from the store, newest first
+    logs, next_cursor = data_protection_engine.data_processing_log.get_logs_page(
+        cursor=cursors[-1],
+        page_size=page_size,
+        user_id=user_id,
+        activity_type=activity_type,
+        start=start,
+        end=end
+    )
     
-    # Convert to DataFrame for display
     if logs:
         df = pd.DataFrame(logs)
         
@@ -380,28 +981,119 @@ def render_data_processing_logs(data_protection_engine):
         display_cols = ['id', 'user_id', 'activity_type', 'timestamp', 'is_consent_given', 'retention_period']
         
         st.dataframe(df[display_cols])
-        
-        # Allow log export
-        csv = df.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            "Download Logs as CSV",
-            csv,
-            "data_processing_logs.csv",
-            "text/csv",
-            key='download-csv'
-        )
     else:
         st.info("No processing logs found. Activity logs will appear here when data is processed.")
     
+    page_col1, page_col2, page_col3 = st.columns([1, 2, 1])
+    
+    with page_col1:
+        if st.button("Previous page", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    
+    with page_col2:
+        st.markdown(f"Page {len(cursors)}")
+    
+    with page_col3:
+        if st.button("Next page", disabled=next_cursor is None):
+            cursors.append(next_cursor)
+            st.rerun()
+    
+    # Streaming export of every log matching the filters above, written to
+    # disk chunk by chunk
+    st.subheader("Export Logs")
+    
+    with st.form("export_form"):
+        export_format = st.selectbox("Format", EXPORT_FORMATS)
+        
+        export_button = st.form_submit_button("Export Logs")
+    
+    if export_button:
+        file_name = f"data_processing_logs_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.{export_format}"
+        path = os.path.join(EXPORT_DIR, file_name)
+        
+        try:
+            row_count = export_logs(
+                data_protection_engine.data_processing_log.iter_logs(
+                    user_id=user_id,
+                    activity_type=activity_type,
+                    start=start,
+                    end=end
+                ),
+                path,
+                export_format
+            )
+            st.success(f"Exported {row_count} log entries to {path}")
+            
+            if os.path.getsize(path) <= EXPORT_DOWNLOAD_LIMIT_BYTES:
+                with open(path, 'rb') as export_file:
+                    st.download_button(
+                        f"Download Logs as {export_format.upper()}",
+                        export_file,
+                        file_name,
+                        key='download-export'
+                    )
+            else:
+                st.info("The export is too large to download through the browser; fetch it from the server path above.")
+        except Exception as e:
+            logging.error(f"Log Export Error: {e}")
+            st.error(f"Unable to export logs: {e}")
+    
+    # Tamper evidence for the entries above
+    audit_log = data_protection_engine.data_processing_log
+    if audit_log.audit is not None:
+        st.subheader("Audit Trail")
+        
+        checkpoint = audit_log.audit.checkpoint()
+        audit_col1, audit_col2 = st.columns(2)
+        
+        with audit_col1:
+            st.metric("Trail Records", checkpoint['size'])
+        
+        with audit_col2:
+            verified_size = audit_log.audit_checkpoint['size'] if audit_log.audit_checkpoint else 0
+            st.metric("Verified Up To", verified_size)
+        
+        st.code(f"Root: {checkpoint['root']}")
+        
+        verify_col1, verify_col2 = st.columns(2)
+        
+        with verify_col1:
+            verify_new = st.button("Verify New Entries")
+        
+        with verify_col2:
+            verify_full = st.button("Verify Entire Log")
+        
+        if verify_new or verify_full:
+            result = audit_log.verify_audit_trail(full=verify_full)
+            if result['status'] == 'success':
+                st.success(f"Verified {result['verified']} entries; trail is consistent up to {result['checkpoint']['size']} records")
+            else:
+                st.error(result.get('message', f"{len(result.get('problems', []))} problems found"))
+                if result.get('problems'):
+                    st.dataframe(pd.DataFrame(result['problems']))
+        
+        with st.form("audit_proof_form"):
+            proof_log_id = st.text_input("Log Entry ID")
+            
+            proof_button = st.form_submit_button("Prove Inclusion")
+        
+        if proof_button and proof_log_id:
+            proof = audit_log.prove_log_entry(proof_log_id.strip())
+            if proof is None:
+                st.error("This entry is not in the audit trail")
+            elif proof['verified']:
+                st.success(f"Entry {proof['index']} is included in the tree of {proof['size']} records ({len(proof['proof'])} proof hashes)")
+                st.json(proof)
+            else:
+                st.error("The inclusion proof does not match the current root")
+    
     # Demo data generation
     st.subheader("Generate Demo Data")
     
     with st.form("demo_data_form"):
         demo_user_id = st.text_input("User ID for Demo Data", "user123")
-        demo_activity = st.selectbox(
-            "Activity Type", 
-            ["authentication", "transaction_processing", "data_access_request", "consent_update"]
-        )
+        demo_activity = st.selectbox("Activity Type", ACTIVITY_TYPES)
         
         demo_button = st.form_submit_button("Generate Demo Log Entry")
     
@@ -420,7 +1112,47 @@ def render_data_processing_logs(data_protection_engine):
         )
         
         st.success(f"Demo log entry created with ID: {log_entry['id']}")
-        st.experimental_rerun()
+        st.rerun()
+    
+    # Reproducible bulk data: users with profiles and consent histories, and
+    # Zipf-skewed processing events written in batches
+    with st.form("workload_form"):
+        workload_col1, workload_col2, workload_col3 = st.columns(3)
+        
+        with workload_col1:
+            workload_users = st.number_input("Users", min_value=1, max_value=1000000, value=1000)
+        
+        with workload_col2:
+            workload_events = st.number_input("Events", min_value=1, max_value=1000000, value=10000)
+        
+        with workload_col3:
+            workload_seed = st.number_input("Seed", min_value=0, value=0)
+        
+        workload_button = st.form_submit_button("Generate Synthetic Workload")
+    
+    if workload_button:
+        generator = WorkloadGenerator(
+            users=int(workload_users),
+            seed=int(workload_seed),
+            consent_types=CONFIG['gdpr']['consent_types']
+        )
+        rights_handler = data_protection_engine.gdpr_manager.data_subject_rights
+        consent_manager = data_protection_engine.gdpr_manager.consent_manager
+        
+        for records in generator.users():
+            for record in records:
+                rights_handler.store_personal_data(record['user_id'], record)
+        for records in generator.consents():
+            for record in records:
+                consent_manager.update_consent(record['user_id'], record['type'], record['status'], record['timestamp'])
+        
+        progress = st.progress(0.0, text="Logging events")
+        written = 0
+        for events in generator.events(int(workload_events), batch_size=5000):
+            written += len(data_protection_engine.log_data_processing_activities(events))
+            progress.progress(written / workload_events, text=f"{written} / {workload_events} events")
+        
+        st.success(f"Generated {workload_users} users and {written} events (seed {workload_seed})")
 
 def render_data_minimization(data_protection_engine):
     st.title("Data Minimization")
@@ -491,6 +1223,50 @@ def render_data_minimization(data_protection_engine):
         else:
             st.warning("Please enter data in at least one field")
 
+def render_compliance_statistics(data_protection_engine):
+    st.title("Compliance Statistics")
+    
+    # Maintained incrementally by the engine; nothing here scans the logs
+    stats = data_protection_engine.compliance_stats.snapshot()
+    
+    metric_col1, metric_col2, metric_col3, metric_col4 = st.columns(4)
+    metric_col1.metric("Processing Logs", f"{stats['total_logs']:,}")
+    metric_col2.metric("Logged With Consent", f"{stats['consented_log_rate']:.1%}")
+    metric_col3.metric("Users Erased", f"{stats['erased_users']:,}")
+    metric_col4.metric("Logs Purged by Retention", f"{stats['purged_logs']:,}")
+    
+    st.subheader("Activity Types")
+    if stats['activity_counts']:
+        st.bar_chart(pd.Series(stats['activity_counts'], name="logs"))
+    else:
+        st.info("No processing activities logged yet.")
+    
+    st.subheader("Events per Day")
+    if stats['daily_events']:
+        st.line_chart(pd.Series(stats['daily_events'], name="events"))
+    else:
+        st.info("No processing activities logged yet.")
+    
+    st.subheader("Consent Rates")
+    if stats['consent_decisions']:
+        consent_df = pd.DataFrame({
+            'users_with_decision': stats['consent_decisions'],
+            'granted': stats['consent_granted']
+        })
+        consent_df['consent_rate'] = (consent_df['granted'] / consent_df['users_with_decision']).map(lambda rate: f"{rate:.1%}")
+        st.dataframe(consent_df)
+    else:
+        st.info("No consent decisions recorded yet.")
+    
+    st.subheader("Pending Retention Expiries")
+    if stats['pending_expiries']:
+        today = datetime.utcnow().date()
+        next_30_days = sum(count for day, count in stats['pending_expiries'].items() if day < today + timedelta(days=30))
+        st.markdown(f"**{next_30_days:,}** log entries reach the end of their retention period in the next 30 days.")
+        st.bar_chart(pd.Series(stats['pending_expiries'], name="expiring logs"))
+    else:
+        st.info("No log entries are awaiting retention expiry.")
+
 def render_policy_details(data_protection_engine):
     st.title("Data Protection Policy")
     
@@ -525,6 +1301,48 @@ def render_policy_details(data_protection_engine):
     These rights can be exercised using the tools provided in the Data Subject Rights section of this application.
     """)
 
+def render_diagnostics(data_protection_engine):
+    st.title("Diagnostics")
+    
+    if not METRICS.enabled:
+        st.info("Operation metrics are disabled. Set metrics.enabled in the configuration to collect them.")
+        return
+    
+    st.markdown("Latency and error rates of engine operations since the server started (or since the last reset).")
+    
+    snapshot = METRICS.snapshot()
+    if snapshot:
+        df = pd.DataFrame.from_dict(snapshot, orient='index')
+        
+        # Seconds are hard to read at this scale
+        for column in ['mean_seconds', 'p50_seconds', 'p95_seconds', 'p99_seconds', 'max_seconds']:
+            df[column.replace('_seconds', '_ms')] = df[column] * 1000
+        df['error_rate'] = df['error_rate'].map(lambda rate: f"{rate:.2%}")
+        
+        st.dataframe(df[['calls', 'errors', 'error_rate', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms']])
+    else:
+        st.info("No operations recorded yet.")
+    
+    st.caption(f"Prometheus metrics are written to {METRICS_FILE} every {CONFIG['metrics']['prometheus_interval_seconds']} seconds.")
+    
+    diag_col1, diag_col2 = st.columns(2)
+    
+    with diag_col1:
+        if st.button("Write Metrics File Now"):
+            exporter = get_metrics_exporter()
+            if exporter.export():
+                st.success(f"Metrics written to {exporter.path}")
+            else:
+                st.error("Unable to write metrics file")
+    
+    with diag_col2:
+        if st.button("Reset Metrics"):
+            METRICS.reset()
+            st.rerun()
+    
+    with st.expander("Prometheus Text Format"):
+        st.code(METRICS.to_prometheus(), language="text")
+
 # Main Streamlit Application
 def main():
     st.set_page_config(
@@ -534,8 +1352,10 @@ def main():
         initial_sidebar_state="expanded"
     )
     
-    # Initialize the data protection engine
-    data_protection_engine = EncryptoDataProtectionEngine()
+    # Shared data protection engine, created on first use
+    data_protection_engine = get_data_protection_engine()
+    if METRICS.enabled:
+        get_metrics_exporter()
     
     # Sidebar navigation
     st.sidebar.title("GDPR Compliance Suite")
@@ -546,8 +1366,11 @@ def main():
         "Data Subject Rights": render_data_subject_rights,
         "Data Processing Logs": render_data_processing_logs,
         "Data Minimization": render_data_minimization,
+        "Compliance Statistics": render_compliance_statistics,
         "Policy Details": render_policy_details
     }
+    if CONFIG['metrics']['diagnostics_page']:
+        pages["Diagnostics"] = render_diagnostics
     
     selected_page = st.sidebar.radio("Navigation", list(pages.keys()))
     
@@ -555,13 +1378,11 @@ def main():
     st.sidebar.markdown("---")
     
     with st.sidebar.expander("Quick Stats"):
-        log_count = len(st.session_state.get('data_processing_logs', []))
-        consent_count = len(st.session_state.get('consents', {}))
-        user_count = len(st.session_state.get('user_data', {}))
+        stats = data_protection_engine.stats()
         
-        st.markdown(f"**Activity Logs**: {log_count}")
-        st.markdown(f"**Consent Records**: {consent_count}")
-        st.markdown(f"**Registered Users**: {user_count}")
+        st.markdown(f"**Activity Logs**: {stats['logs']}")
+        st.markdown(f"**Consent Records**: {stats['consents']}")
+        st.markdown(f"**Registered Users**: {stats['users']}")
     
     # Render the selected page
     if selected_page == "Home":
@@ -0,0 +1,121 @@
+import hashlib
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, List, Any, Iterable, Iterator, Optional
+
+import pandas as pd
+
+REDACTED_ADDRESS = '*** REDACTED ***'
+DEFAULT_CHUNK_SIZE = 20000
+
+def hash_email(email: str) -> str:
+    return hashlib.sha256(email.encode()).hexdigest()
+
+def mask_phone(phone: str) -> str:
+    return '*' * len(phone)
+
+def anonymize_record(data: Dict[str, Any]) -> Dict[str, Any]:
+    anonymized = data.copy()
+
+    if 'email' in anonymized:
+        anonymized['email'] = hash_email(anonymized['email'])
+
+    if 'phone' in anonymized:
+        anonymized['phone'] = mask_phone(anonymized['phone'])
+
+    if 'address' in anonymized:
+        anonymized['address'] = REDACTED_ADDRESS
+
+    return anonymized
+
+def _hash_email_chunk(emails: List[str]) -> List[str]:
+    return [hash_email(email) for email in emails]
+
+def _anonymize_chunk(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [anonymize_record(record) for record in records]
+
+def chunked(items: Iterable, chunk_size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def _resolve_workers(max_workers: Optional[int]) -> int:
+    return max_workers if max_workers is not None else (os.cpu_count() or 1)
+
+def _map_chunks(func, chunks: Iterable[list], max_workers: int) -> Iterator[list]:
+    # Like executor.map, but keeps only a few chunks in flight so an
+    # unbounded input stream is never pulled into memory up front
+    if max_workers <= 1:
+        for chunk in chunks:
+            yield func(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(func, chunk))
+            if len(pending) >= max_workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def hash_emails(emails: List[str], max_workers: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[str]:
+    workers = _resolve_workers(max_workers)
+    if len(emails) <= chunk_size:
+        workers = 1
+
+    hashed = []
+    for chunk in _map_chunks(_hash_email_chunk, chunked(emails, chunk_size), workers):
+        hashed.extend(chunk)
+    return hashed
+
+def anonymize_dataframe(df: pd.DataFrame, max_workers: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> pd.DataFrame:
+    # Column-wise version of anonymize_record. Missing values are treated
+    # like records that do not carry the field at all.
+    anonymized = df.copy()
+
+    if 'email' in anonymized:
+        emails = anonymized['email']
+        present = emails.notna()
+        if present.all():
+            anonymized['email'] = hash_emails(emails.tolist(), max_workers, chunk_size)
+        else:
+            anonymized['email'] = emails.astype(object)
+            anonymized.loc[present, 'email'] = hash_emails(emails[present].tolist(), max_workers, chunk_size)
+
+    # An all-missing column is float-typed and has nothing to mask
+    if 'phone' in anonymized and anonymized['phone'].notna().any():
+        phones = anonymized['phone']
+        present = phones.notna()
+        lengths = phones[present].str.len()
+        # Only a handful of distinct lengths, so build each mask once
+        masks = {length: '*' * length for length in lengths.unique()}
+        anonymized['phone'] = phones.astype(object)
+        anonymized.loc[present, 'phone'] = lengths.map(masks)
+
+    if 'address' in anonymized:
+        addresses = anonymized['address']
+        anonymized['address'] = addresses.astype(object)
+        anonymized.loc[addresses.notna(), 'address'] = REDACTED_ADDRESS
+
+    return anonymized
+
+def anonymize_records(
+    records: Iterable[Dict[str, Any]],
+    max_workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[Dict[str, Any]]:
+    # Streams anonymized records back in input order
+    workers = _resolve_workers(max_workers)
+    for chunk in _map_chunks(_anonymize_chunk, chunked(records, chunk_size), workers):
+        yield from chunk
+
+def anonymize_batch(records, max_workers: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    if isinstance(records, pd.DataFrame):
+        return anonymize_dataframe(records, max_workers, chunk_size)
+    return list(anonymize_records(records, max_workers, chunk_size))
@@ -0,0 +1,443 @@
+import hashlib
+import json
+import logging
+import os
+import struct
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, List, Any, Callable, Iterable, Optional, Tuple
+
+# RFC 9162 domain separation between leaves and interior nodes
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+HASH_SIZE = 32
+EMPTY_ROOT = hashlib.sha256(b'').digest()
+
+# Audit record kinds: a logged entry, or a set of entries deleted together
+APPEND = 1
+DELETE = 2
+ID_SIZE = 16
+
+# (kind, packed 16-byte log ids, leaf hash)
+AuditRecord = Tuple[int, bytes, bytes]
+
+def leaf_hash(data: bytes) -> bytes:
+    return hashlib.sha256(LEAF_PREFIX + data).digest()
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+def _split(size: int) -> int:
+    # Largest power of two smaller than size (size > 1)
+    return 1 << ((size - 1).bit_length() - 1)
+
+# Built once; json.dumps with options builds an encoder per call
+_ENCODER = json.JSONEncoder(sort_keys=True, separators=(',', ':'), default=str)
+
+def _timestamp(value) -> Optional[str]:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def id_bytes(log_id: str) -> bytes:
+    raw = bytes.fromhex(log_id.replace('-', '')) if len(log_id) == 36 else b''
+    return raw if len(raw) == ID_SIZE else uuid.UUID(log_id).bytes
+
+def canonical_entry(entry: Dict[str, Any]) -> bytes:
+    # Stable bytes for a log entry as stored; every backend must read the
+    # same entry back to the same bytes. Fields are positional, payload
+    # keys sorted.
+    fields = [
+        entry['id'],
+        entry['user_id'],
+        entry['activity_type'],
+        _timestamp(entry['timestamp']),
+        entry['data_processed'],
+        bool(entry['is_consent_given']),
+        _timestamp(entry.get('retention_period'))
+    ]
+    try:
+        return _ENCODER.encode(fields).encode('utf-8')
+    except TypeError:
+        # Mixed key types cannot be sorted; stores read them back as strings
+        return _ENCODER.encode(json.loads(json.dumps(fields, default=str))).encode('utf-8')
+
+def entry_record(entry: Dict[str, Any]) -> AuditRecord:
+    return APPEND, id_bytes(entry['id']), leaf_hash(bytes([APPEND]) + canonical_entry(entry))
+
+def deletion_record(log_ids: Iterable[str]) -> AuditRecord:
+    ids = b''.join(sorted(id_bytes(log_id) for log_id in log_ids))
+    return DELETE, ids, leaf_hash(bytes([DELETE]) + ids)
+
+class MerkleTree:
+    # Append-only Merkle tree (RFC 9162 hashing). Every complete aligned
+    # subtree is stored, level by level, so appends cost O(1) amortized
+    # hashes and roots and proofs combine O(log n) stored nodes.
+    def __init__(self):
+        self._levels: List[bytearray] = [bytearray()]
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, leaf: bytes) -> int:
+        index = self._size
+        self._levels[0] += leaf
+        self._size += 1
+
+        # Each completed pair adds its parent one level up
+        level = 0
+        count = self._size
+        while count % 2 == 0:
+            # The last two nodes of the level, hashed as one slice
+            parent = hashlib.sha256(NODE_PREFIX + self._levels[level][-2 * HASH_SIZE:]).digest()
+            level += 1
+            count //= 2
+            if level == len(self._levels):
+                self._levels.append(bytearray())
+            self._levels[level] += parent
+        return index
+
+    def truncate(self, size: int):
+        # Drops leaves from size on, with the subtrees that covered them
+        for level, nodes in enumerate(self._levels):
+            del nodes[(size >> level) * HASH_SIZE:]
+        self._size = size
+
+    def leaf(self, index: int) -> bytes:
+        return self._node(0, index)
+
+    def root(self, size: Optional[int] = None) -> bytes:
+        return self._hash(0, self._size if size is None else size)
+
+    def inclusion_proof(self, index: int, size: Optional[int] = None) -> List[bytes]:
+        # Audit path from the leaf up to the root of the first size leaves
+        size = self._size if size is None else size
+        if not 0 <= index < size <= self._size:
+            raise ValueError("Leaf index out of range")
+
+        proof = []
+        start, end = 0, size
+        while end - start > 1:
+            k = _split(end - start)
+            if index < start + k:
+                proof.append(self._hash(start + k, end))
+                end = start + k
+            else:
+                proof.append(self._hash(start, start + k))
+                start += k
+        proof.reverse()
+        return proof
+
+    def consistency_proof(self, old_size: int, size: Optional[int] = None) -> List[bytes]:
+        # Proves the first old_size leaves are unchanged in the larger tree
+        size = self._size if size is None else size
+        if not 0 <= old_size <= size <= self._size:
+            raise ValueError("Tree sizes out of range")
+        if old_size == 0:
+            return []
+
+        proof = []
+        start, end, complete = 0, size, True
+        m = old_size
+        while m != end - start:
+            k = _split(end - start)
+            if m <= k:
+                proof.append(self._hash(start + k, end))
+                end = start + k
+            else:
+                proof.append(self._hash(start, start + k))
+                m -= k
+                start += k
+                complete = False
+        if not complete:
+            proof.append(self._hash(start, end))
+        proof.reverse()
+        return proof
+
+    def _node(self, level: int, index: int) -> bytes:
+        return bytes(self._levels[level][index * HASH_SIZE:(index + 1) * HASH_SIZE])
+
+    def _hash(self, start: int, end: int) -> bytes:
+        # Hash of leaves [start, end). Aligned power-of-two ranges are
+        # stored; only the right edge of a tree has to be combined.
+        count = end - start
+        if count == 0:
+            return EMPTY_ROOT
+        if count & (count - 1) == 0 and start % count == 0:
+            level = count.bit_length() - 1
+            return self._node(level, start >> level)
+        k = _split(count)
+        return node_hash(self._hash(start, start + k), self._hash(start + k, end))
+
+def verify_inclusion(leaf: bytes, index: int, size: int, proof: List[bytes], root: bytes) -> bool:
+    # RFC 9162 section 2.1.3.2
+    if index >= size:
+        return False
+    fn, sn = index, size - 1
+    result = leaf
+    for sibling in proof:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            result = node_hash(sibling, result)
+            while not fn & 1 and fn != 0:
+                fn >>= 1
+                sn >>= 1
+        else:
+            result = node_hash(result, sibling)
+        fn >>= 1
+        sn >>= 1
+    return sn == 0 and result == root
+
+def verify_consistency(old_size: int, size: int, old_root: bytes, root: bytes, proof: List[bytes]) -> bool:
+    # RFC 9162 section 2.1.4.2
+    if old_size > size:
+        return False
+    if old_size == size:
+        return not proof and old_root == root
+    if old_size == 0:
+        return not proof
+    if not proof:
+        return False
+
+    if old_size & (old_size - 1) == 0:
+        proof = [old_root] + list(proof)
+    fn, sn = old_size - 1, size - 1
+    while fn & 1:
+        fn >>= 1
+        sn >>= 1
+
+    old_result = new_result = proof[0]
+    for node in proof[1:]:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            old_result = node_hash(node, old_result)
+            new_result = node_hash(node, new_result)
+            while not fn & 1 and fn != 0:
+                fn >>= 1
+                sn >>= 1
+        else:
+            new_result = node_hash(new_result, node)
+        fn >>= 1
+        sn >>= 1
+    return sn == 0 and old_result == old_root and new_result == root
+
+class AuditTrail:
+    # Tamper-evident record of a processing log: one Merkle leaf per logged
+    # entry and one per deletion. Checkpoints (size and root) can be kept or
+    # published; verify() then only re-hashes entries logged since the last
+    # checkpoint and checks everything before it with a consistency proof.
+    #
+    # save, when given, is called with (position, record) for every new
+    # record so the caller can persist it.
+    def __init__(self, records: Iterable[AuditRecord] = (), save: Optional[Callable[[int, AuditRecord], None]] = None):
+        self.tree = MerkleTree()
+        self._kinds = bytearray()
+        # 16 bytes per leaf: the entry id for appends, zeros for deletions
+        self._ids = bytearray()
+        self._deletions: Dict[int, bytes] = {}
+        self.appended = 0
+        self.deleted = 0
+        self._lock = threading.RLock()
+
+        self.save = None
+        for record in records:
+            self.append(record)
+        self.save = save
+
+    def __len__(self):
+        return len(self.tree)
+
+    def append(self, record: AuditRecord) -> int:
+        kind, ids, leaf = record
+        with self._lock:
+            position = self.tree.append(leaf)
+            self._kinds.append(kind)
+            if kind == APPEND:
+                self._ids += ids
+                self.appended += 1
+            else:
+                self._ids += bytes(ID_SIZE)
+                self._deletions[position] = ids
+                self.deleted += len(ids) // ID_SIZE
+            if self.save is not None:
+                self.save(position, record)
+        return position
+
+    def extend(self, records: Iterable[AuditRecord]) -> int:
+        with self._lock:
+            first = len(self.tree)
+            for record in records:
+                self.append(record)
+        return first
+
+    def live_count(self, size: Optional[int] = None) -> int:
+        # Entries the log should hold according to the first size records
+        with self._lock:
+            live = self.appended - self.deleted
+            if size is not None:
+                for position in range(size, len(self.tree)):
+                    if self._kinds[position] == APPEND:
+                        live -= 1
+                    else:
+                        live += len(self._deletions[position]) // ID_SIZE
+            return live
+
+    def checkpoint(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self.tree)
+            return {'size': size, 'root': self.tree.root(size).hex()}
+
+    def prove(self, log_id: str) -> Optional[Dict[str, Any]]:
+        # Inclusion proof of an entry's leaf against the current root
+        try:
+            raw = id_bytes(log_id)
+        except ValueError:
+            return None
+
+        with self._lock:
+            position = self._find(raw)
+            if position is None:
+                return None
+            size = len(self.tree)
+            return {
+                'log_id': log_id,
+                'index': position,
+                'size': size,
+                'leaf': self.tree.leaf(position).hex(),
+                'root': self.tree.root(size).hex(),
+                'proof': [node.hex() for node in self.tree.inclusion_proof(position, size)]
+            }
+
+    def verify(
+        self,
+        lookup: Callable[[List[str]], Iterable[Dict[str, Any]]],
+        since: Optional[Dict[str, Any]] = None,
+        stored_count: Optional[int] = None,
+        size: Optional[int] = None
+    ) -> Dict[str, Any]:
+        # lookup(log_ids) yields the stored entries for those ids that
+        # still exist, in any order. Entries logged since the checkpoint are re-hashed
+        # and must match their leaves or have been deleted on the record.
+        # size and stored_count should be read together under the log's
+        # write lock; the trail is checked up to that size.
+        with self._lock:
+            size = len(self.tree) if size is None else size
+            root = self.tree.root(size)
+            old_size = since['size'] if since else 0
+            kinds = bytes(self._kinds[old_size:size])
+            ids = bytes(self._ids[old_size * ID_SIZE:size * ID_SIZE])
+            deletions = {position: self._deletions[position] for position in range(old_size, size) if position in self._deletions}
+            live = self.live_count(size)
+            if since and old_size <= size:
+                consistency = self.tree.consistency_proof(old_size, size)
+
+        problems = []
+        if since and (old_size > size or not verify_consistency(old_size, size, bytes.fromhex(since['root']), root, consistency)):
+            problems.append({'log_id': None, 'problem': 'history_rewritten'})
+            kinds = b''
+
+        deleted = set()
+        for position, packed in deletions.items():
+            if leaf_hash(bytes([DELETE]) + packed) != self.tree.leaf(position):
+                problems.append({'log_id': None, 'problem': 'deletion_record_altered'})
+            deleted.update(packed[start:start + ID_SIZE] for start in range(0, len(packed), ID_SIZE))
+
+        pending = {}
+        for offset, kind in enumerate(kinds):
+            if kind != APPEND:
+                continue
+            raw = ids[offset * ID_SIZE:(offset + 1) * ID_SIZE]
+            if raw not in deleted:
+                pending[str(uuid.UUID(bytes=raw))] = old_size + offset
+
+        # Entries are streamed, only the pending ids are held
+        verified = 0
+        for entry in lookup(list(pending)):
+            position = pending.pop(entry['id'], None)
+            if position is None:
+                continue
+            if entry_record(entry)[2] != self.tree.leaf(position):
+                problems.append({'log_id': entry['id'], 'problem': 'modified'})
+            else:
+                verified += 1
+
+        missing = list(pending)
+        if missing:
+            # Entries deleted on the record while the lookup ran are fine
+            with self._lock:
+                later = [self._deletions[position] for position in range(size, len(self.tree)) if position in self._deletions]
+            deleted_later = {packed[start:start + ID_SIZE] for packed in later for start in range(0, len(packed), ID_SIZE)}
+            for log_id in missing:
+                if id_bytes(log_id) not in deleted_later:
+                    problems.append({'log_id': log_id, 'problem': 'missing'})
+
+        if stored_count is not None and stored_count != live:
+            problems.append({'log_id': None, 'problem': f'count_mismatch: {stored_count} stored, {live} recorded'})
+
+        checkpoint = {'size': size, 'root': root.hex()}
+        if problems:
+            logging.error(f"Audit Trail Verification Error: {len(problems)} problems since size {old_size}")
+        return {
+            'status': 'error' if problems else 'success',
+            'verified': verified,
+            'problems': problems,
+            'checkpoint': checkpoint
+        }
+
+    def _find(self, raw: bytes) -> Optional[int]:
+        # Newest first; no per-id index, like CompactLogStore
+        position = self._ids.rfind(raw)
+        while position >= 0:
+            if position % ID_SIZE == 0:
+                return position // ID_SIZE
+            position = self._ids.rfind(raw, 0, position + ID_SIZE - 1)
+        return None
+
+# Trail files hold (kind, ids length) + ids + leaf per record
+FILE_RECORD = struct.Struct('<BI')
+
+class AuditTrailFile:
+    # Append-only file backing for an AuditTrail, used next to the segment
+    # log store. A torn record at the end is dropped on load.
+    def __init__(self, path: str, fsync: bool = False):
+        self.path = path
+        self.fsync = fsync
+        self._file = None
+
+    def load(self) -> AuditTrail:
+        records = []
+        valid = 0
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as trail_file:
+                data = trail_file.read()
+            offset = 0
+            while offset + FILE_RECORD.size <= len(data):
+                kind, length = FILE_RECORD.unpack_from(data, offset)
+                end = offset + FILE_RECORD.size + length + HASH_SIZE
+                if kind not in (APPEND, DELETE) or end > len(data):
+                    break
+                ids = data[offset + FILE_RECORD.size:end - HASH_SIZE]
+                records.append((kind, ids, data[end - HASH_SIZE:end]))
+                offset = end
+            valid = offset
+            if valid < len(data):
+                logging.warning(f"Truncating torn audit record at {valid} in {self.path}")
+                os.truncate(self.path, valid)
+
+        trail = AuditTrail(records)
+        self._file = open(self.path, 'ab', buffering=0)
+        trail.save = self.save
+        return trail
+
+    def save(self, position: int, record: AuditRecord):
+        kind, ids, leaf = record
+        self._file.write(FILE_RECORD.pack(kind, len(ids)) + ids + leaf)
+        if self.fsync or kind == DELETE:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,407 @@
+import heapq
+from bisect import bisect_left, bisect_right
+import json
+import sys
+import uuid
+from array import array
+from datetime import datetime, date, timedelta
+from typing import Dict, List, Any, Iterable, Optional
+
+EPOCH = datetime(1970, 1, 1)
+ONE_MICROSECOND = timedelta(microseconds=1)
+EPOCH_ORDINAL = EPOCH.toordinal()
+DAY_US = 86400 * 1000000
+
+# Per-row flag bits
+CONSENT_GIVEN = 1
+LIVE = 2
+
+ID_SIZE = 16
+COMPACT_MIN_DEAD_ROWS = 65536
+
+def to_epoch_us(value: datetime) -> int:
+    return (value - EPOCH) // ONE_MICROSECOND
+
+def from_epoch_us(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=value)
+
+class CompactLogStore:
+    # Columnar processing log: one typed array per field, interned user ids
+    # and activity types, 16-byte binary log ids and microsecond epoch
+    # timestamps. Payloads are stored as compact JSON in a single blob.
+    # Entries are materialized as the usual log dicts only when read.
+    def __init__(self):
+        self._ids = bytearray()
+        self._user_codes = array('I')
+        self._activity_codes = array('H')
+        self._timestamps = array('q')
+        self._retention = array('q')
+        self._flags = bytearray()
+        self._payloads = bytearray()
+        self._payload_offsets = array('Q', [0])
+        # Append sequence numbers; unlike row numbers they survive compaction
+        self._seqs = array('Q')
+        self._next_seq = 0
+        self._time_ordered = True
+
+        self._users: List[Optional[str]] = []
+        self._user_lookup: Dict[str, int] = {}
+        self._activities: List[str] = []
+        self._activity_lookup: Dict[str, int] = {}
+
+        self._rows_by_user: Dict[int, array] = {}
+        self._rows_by_activity: Dict[int, array] = {}
+        self._activity_counts: Dict[int, int] = {}
+        # Rows bucketed by the day their retention period ends
+        self._rows_by_expiry_day: Dict[int, array] = {}
+        self._expiry_days: List[int] = []
+        self._live = 0
+
+    def __len__(self):
+        return self._live
+
+    def __iter__(self):
+        for row in range(len(self._flags)):
+            if self._flags[row] & LIVE:
+                yield self._entry(row)
+
+    def append(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        payload = json.dumps(entry['data_processed'], separators=(',', ':'), default=str).encode('utf-8')
+        self._add_row(
+            uuid.UUID(entry['id']).bytes,
+            entry['user_id'],
+            entry['activity_type'],
+            to_epoch_us(entry['timestamp']),
+            to_epoch_us(entry['retention_period']),
+            CONSENT_GIVEN if entry['is_consent_given'] else 0,
+            payload
+        )
+        return entry
+
+    def extend(self, entries: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [self.append(entry) for entry in entries]
+
+    def _add_row(self, raw_id: bytes, user_id: str, activity_type: str, timestamp: int, retention: int, flags: int, payload):
+        # Adds a live row from encoded fields (16-byte id, epoch microseconds,
+        # flag bits); payload goes to _add_payload
+        user_code = self._user_lookup.get(user_id)
+        if user_code is None:
+            user_code = len(self._users)
+            self._users.append(user_id)
+            self._user_lookup[user_id] = user_code
+
+        activity_code = self._activity_lookup.get(activity_type)
+        if activity_code is None:
+            activity_code = len(self._activities)
+            if activity_code > 0xFFFF:
+                raise ValueError("Too many distinct activity types for compact log store")
+            self._activities.append(activity_type)
+            self._activity_lookup[activity_type] = activity_code
+
+        row = len(self._flags)
+        if self._timestamps and timestamp < self._timestamps[-1]:
+            self._time_ordered = False
+        self._ids += raw_id
+        self._seqs.append(self._next_seq)
+        self._next_seq += 1
+        self._user_codes.append(user_code)
+        self._activity_codes.append(activity_code)
+        self._timestamps.append(timestamp)
+        self._retention.append(retention)
+        self._flags.append(LIVE | flags)
+        self._add_payload(payload)
+
+        if user_code not in self._rows_by_user:
+            self._rows_by_user[user_code] = array('I')
+        self._rows_by_user[user_code].append(row)
+        if activity_code not in self._rows_by_activity:
+            self._rows_by_activity[activity_code] = array('I')
+        self._rows_by_activity[activity_code].append(row)
+        self._activity_counts[activity_code] = self._activity_counts.get(activity_code, 0) + 1
+        expiry_day = EPOCH_ORDINAL + retention // DAY_US
+        if expiry_day not in self._rows_by_expiry_day:
+            self._rows_by_expiry_day[expiry_day] = array('I')
+            heapq.heappush(self._expiry_days, expiry_day)
+        self._rows_by_expiry_day[expiry_day].append(row)
+        self._live += 1
+
+    def get(self, log_id: str) -> Optional[Dict[str, Any]]:
+        row = self._find_row(log_id)
+        return None if row is None else self._entry(row)
+
+    def query(self, user_id: Optional[str] = None, activity_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        if user_id is None and activity_type is None:
+            return list(self)
+
+        if user_id is None:
+            code = self._activity_lookup.get(activity_type)
+            rows = self._rows_by_activity.get(code, ())
+            return [self._entry(row) for row in rows if self._flags[row] & LIVE]
+
+        rows = self._rows_by_user.get(self._user_lookup.get(user_id), ())
+        if activity_type is None:
+            return [self._entry(row) for row in rows]
+
+        code = self._activity_lookup.get(activity_type)
+        return [self._entry(row) for row in rows if self._activity_codes[row] == code]
+
+    def activity_types(self) -> List[str]:
+        return [self._activities[code] for code, count in self._activity_counts.items() if count]
+
+    def user_ids(self) -> List[str]:
+        return [self._users[code] for code in self._rows_by_user]
+
+    def count_user_logs(self, user_id: str) -> int:
+        return len(self._rows_by_user.get(self._user_lookup.get(user_id), ()))
+
+    def delete(self, log_id: str) -> Optional[Dict[str, Any]]:
+        row = self._find_row(log_id)
+        if row is None:
+            return None
+
+        entry = self._entry(row)
+        user_code = self._user_codes[row]
+        rows = self._rows_by_user[user_code]
+        rows.remove(row)
+        if not rows:
+            self._release_user(user_code)
+        self._kill(row)
+        self._maybe_compact()
+        return entry
+
+    def delete_user(self, user_id: str) -> List[Dict[str, Any]]:
+        user_code = self._user_lookup.get(user_id)
+        if user_code is None:
+            return []
+
+        rows = self._rows_by_user[user_code]
+        removed = [self._entry(row) for row in rows]
+        for row in rows:
+            self._kill(row)
+        self._release_user(user_code)
+        self._maybe_compact()
+        return removed
+
+    def purge_expired(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        # Only buckets for today and earlier are visited; rows erased in the
+        # meantime are already dead and skipped
+        now = now or datetime.utcnow()
+        today = now.toordinal()
+        now_us = to_epoch_us(now)
+
+        expired_rows = []
+        while self._expiry_days and self._expiry_days[0] <= today:
+            day = self._expiry_days[0]
+            rows = self._rows_by_expiry_day[day]
+            if day < today:
+                expired_rows.extend(row for row in rows if self._flags[row] & LIVE)
+                heapq.heappop(self._expiry_days)
+                del self._rows_by_expiry_day[day]
+                continue
+
+            remaining = array('I')
+            for row in rows:
+                if not self._flags[row] & LIVE:
+                    continue
+                if self._retention[row] <= now_us:
+                    expired_rows.append(row)
+                else:
+                    remaining.append(row)
+            if remaining:
+                self._rows_by_expiry_day[day] = remaining
+            else:
+                heapq.heappop(self._expiry_days)
+                del self._rows_by_expiry_day[day]
+            break
+
+        if not expired_rows:
+            return []
+
+        removed = [self._entry(row) for row in expired_rows]
+        expired = set(expired_rows)
+        for user_code in {self._user_codes[row] for row in expired_rows}:
+            rows = array('I', (row for row in self._rows_by_user[user_code] if row not in expired))
+            if rows:
+                self._rows_by_user[user_code] = rows
+            else:
+                self._release_user(user_code)
+        for row in expired_rows:
+            self._kill(row)
+        self._maybe_compact()
+        return removed
+
+    def pending_expiries(self):
+        pending = {}
+        for day, rows in sorted(self._rows_by_expiry_day.items()):
+            count = sum(1 for row in rows if self._flags[row] & LIVE)
+            if count:
+                pending[date.fromordinal(day)] = count
+        return pending
+
+    def scan(
+        self,
+        cursor: Optional[int] = None,
+        limit: int = 1000,
+        user_id: Optional[str] = None,
+        activity_type: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        reverse: bool = False
+    ):
+        # Same contract as IndexedLogStore.scan, walking rows in append
+        # order (time order for entries written by log_activity). The cursor
+        # is the append sequence number of the last returned row.
+        start_us = to_epoch_us(start) if start is not None else None
+        end_us = to_epoch_us(end) if end is not None else None
+
+        activity_code = None
+        if activity_type is not None:
+            activity_code = self._activity_lookup.get(activity_type)
+            if activity_code is None:
+                return [], None
+        user_code = None
+        if user_id is not None:
+            user_code = self._user_lookup.get(user_id)
+            if user_code is None:
+                return [], None
+
+        # Sequence numbers and row numbers grow together, so the starting
+        # row is found by bisection on either the seq or timestamp column
+        if reverse:
+            if cursor is not None:
+                bound = bisect_left(self._seqs, cursor)
+            elif end_us is not None and self._time_ordered:
+                bound = bisect_left(self._timestamps, end_us)
+            else:
+                bound = len(self._flags)
+        else:
+            if cursor is not None:
+                bound = bisect_right(self._seqs, cursor)
+            elif start_us is not None and self._time_ordered:
+                bound = bisect_left(self._timestamps, start_us)
+            else:
+                bound = 0
+
+        # Row buckets hold ascending row numbers; walk the smallest one
+        rows = None
+        if user_code is not None:
+            rows = self._rows_by_user[user_code]
+        if activity_code is not None:
+            activity_rows = self._rows_by_activity[activity_code]
+            if rows is None or len(activity_rows) < len(rows):
+                rows = activity_rows
+
+        if rows is None:
+            total = len(self._flags)
+            position = bound - 1 if reverse else bound
+        else:
+            total = len(rows)
+            position = bisect_left(rows, bound) - 1 if reverse else bisect_left(rows, bound)
+        step = -1 if reverse else 1
+
+        results = []
+        last_row = None
+        while 0 <= position < total and len(results) < limit:
+            row = rows[position] if rows is not None else position
+            position += step
+
+            if not self._flags[row] & LIVE:
+                continue
+            timestamp = self._timestamps[row]
+            if end_us is not None and timestamp >= end_us:
+                if self._time_ordered and not reverse:
+                    return results, None
+                continue
+            if start_us is not None and timestamp < start_us:
+                if self._time_ordered and reverse:
+                    return results, None
+                continue
+            if activity_code is not None and self._activity_codes[row] != activity_code:
+                continue
+            if user_code is not None and self._user_codes[row] != user_code:
+                continue
+            results.append(self._entry(row))
+            last_row = row
+
+        if not 0 <= position < total or last_row is None:
+            return results, None
+        return results, self._seqs[last_row]
+
+    def memory_usage(self) -> int:
+        columns = (
+            self._ids, self._seqs, self._user_codes, self._activity_codes, self._timestamps,
+            self._retention, self._flags, self._payloads, self._payload_offsets
+        )
+        total = sum(sys.getsizeof(column) for column in columns)
+        total += sys.getsizeof(self._users) + sys.getsizeof(self._user_lookup)
+        total += sum(sys.getsizeof(user) for user in self._users if user is not None)
+        total += sys.getsizeof(self._rows_by_user) + sys.getsizeof(self._rows_by_activity)
+        total += sum(sys.getsizeof(rows) for rows in self._rows_by_user.values())
+        total += sum(sys.getsizeof(rows) for rows in self._rows_by_activity.values())
+        total += sys.getsizeof(self._rows_by_expiry_day)
+        total += sum(sys.getsizeof(rows) for rows in self._rows_by_expiry_day.values())
+        return total
+
+    def compact(self):
+        # Rebuild the columns without dead rows and forget erased user ids.
+        # Sequence numbers are carried over so open scan cursors stay valid.
+        fresh = CompactLogStore()
+        for row in range(len(self._flags)):
+            if self._flags[row] & LIVE:
+                fresh.append(self._entry(row))
+                fresh._seqs[-1] = self._seqs[row]
+        fresh._next_seq = self._next_seq
+        self.__dict__.update(fresh.__dict__)
+
+    # Payload storage hooks; subclasses keep payloads elsewhere
+    def _add_payload(self, payload: bytes):
+        self._payloads += payload
+        self._payload_offsets.append(len(self._payloads))
+
+    def _payload(self, row: int) -> bytes:
+        return self._payloads[self._payload_offsets[row]:self._payload_offsets[row + 1]]
+
+    def _entry(self, row: int) -> Dict[str, Any]:
+        start = row * ID_SIZE
+        flags = self._flags[row]
+        payload = self._payload(row)
+        return {
+            'id': str(uuid.UUID(bytes=bytes(self._ids[start:start + ID_SIZE]))),
+            'user_id': self._users[self._user_codes[row]],
+            'activity_type': self._activities[self._activity_codes[row]],
+            'timestamp': from_epoch_us(self._timestamps[row]),
+            'data_processed': json.loads(payload),
+            'is_consent_given': bool(flags & CONSENT_GIVEN),
+            'retention_period': from_epoch_us(self._retention[row])
+        }
+
+    def _find_row(self, log_id: str) -> Optional[int]:
+        # There is no per-id hash index (it would cost more than the row
+        # itself), so id lookups scan the packed id column
+        try:
+            raw = uuid.UUID(log_id).bytes
+        except ValueError:
+            return None
+
+        position = self._ids.find(raw)
+        while position >= 0:
+            if position % ID_SIZE == 0 and self._flags[position // ID_SIZE] & LIVE:
+                return position // ID_SIZE
+            position = self._ids.find(raw, position + 1)
+        return None
+
+    def _kill(self, row: int):
+        self._flags[row] &= ~LIVE & 0xFF
+        activity_code = self._activity_codes[row]
+        self._activity_counts[activity_code] -= 1
+        self._live -= 1
+
+    def _release_user(self, user_code: int):
+        del self._rows_by_user[user_code]
+        del self._user_lookup[self._users[user_code]]
+        self._users[user_code] = None
+
+    def _maybe_compact(self):
+        dead = len(self._flags) - self._live
+        if dead >= COMPACT_MIN_DEAD_ROWS and dead > self._live:
+            self.compact()
@@ -0,0 +1,95 @@
+import logging
+import os
+from typing import Dict, Any, Optional
+
+import yaml
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config-yaml.txt')
+
+DEFAULT_CONFIG = {
+    'database': {
+        'url': 'sqlite:///gdpr_compliance.db'
+    },
+    'logging': {
+        'level': 'INFO',
+        'file': 'logs/app.log'
+    },
+    'gdpr': {
+        'retention_period_days': 730,
+        'retention_sweep_interval_seconds': 3600,
+        'crypto_shredding': False,
+        'consent_types': ['data_processing', 'marketing', 'analytics']
+    },
+    'log_store': {
+        'backend': 'segment',
+        'directory': 'data/processing_log',
+        'segment_size_mb': 64,
+        'fsync': False,
+        'compaction_interval_seconds': 300,
+        'compaction_min_dead': 1024
+    },
+    'encryption': {
+        'field_encryption': False,
+        'master_key_env': 'GDPR_MASTER_KEY',
+        'master_key_file': None,
+        'max_workers': None,
+        'parallel_threshold': 4096
+    },
+    'pii': {
+        'redact_access_requests': True,
+        'redact_logs': False,
+        'sensitive_keys': None
+    },
+    'tokenization': {
+        'enabled': True,
+        'vault_path': 'data/token_vault.db',
+        'key_env': 'GDPR_TOKEN_KEY',
+        'key_file': 'data/token_vault.key',
+        'cache_size': 100000
+    },
+    'audit': {
+        'enabled': True
+    },
+    'sharding': {
+        'shards': 4,
+        'database_url': 'sqlite:///gdpr_compliance-{shard}.db',
+        'token_vault_path': 'data/token_vault-{shard}.db',
+        'start_method': 'spawn'
+    },
+    'ingestion': {
+        'host': '127.0.0.1',
+        'port': 8765,
+        'queue_size': 10000,
+        'batch_size': 500,
+        'flush_interval_ms': 50
+    },
+    'metrics': {
+        'enabled': True,
+        'prometheus_file': 'metrics/gdpr.prom',
+        'prometheus_interval_seconds': 15,
+        'diagnostics_page': True
+    }
+}
+
+def load_config(path: Optional[str] = None) -> Dict[str, Any]:
+    # Settings from the YAML file override the defaults section by section
+    path = path or os.environ.get('GDPR_CONFIG', DEFAULT_CONFIG_PATH)
+    config = {section: dict(values) for section, values in DEFAULT_CONFIG.items()}
+
+    try:
+        with open(path) as config_file:
+            loaded = yaml.safe_load(config_file) or {}
+    except FileNotFoundError:
+        logging.warning(f"Config file {path} not found, using defaults")
+        return config
+
+    for section, values in loaded.items():
+        if isinstance(values, dict):
+            config.setdefault(section, {}).update(values)
+        else:
+            config[section] = values
+    return config
+
+def retention_period_days(config: Optional[Dict[str, Any]] = None) -> int:
+    config = config or load_config()
+    return int(config['gdpr']['retention_period_days'])
@@ -0,0 +1,86 @@
+from datetime import datetime
+from typing import Dict, List, Any, Iterable, Optional
+
+class ConsentStore:
+    # Consent records keyed by user and consent type. Every change is
+    # appended to the user's history; the current state is kept as one
+    # integer bitmask per user (one bit per consent type) so checks are O(1).
+    def __init__(self, consent_types: Optional[Iterable[str]] = None):
+        self._bits: Dict[str, int] = {}
+        self._granted: Dict[str, int] = {}
+        # Types the user has made any decision on, granted or withdrawn
+        self._decided: Dict[str, int] = {}
+        self._history: Dict[str, List[Dict[str, Any]]] = {}
+
+        for consent_type in consent_types or []:
+            self._bit(consent_type)
+
+    def __len__(self):
+        return len(self._history)
+
+    def __contains__(self, user_id):
+        return user_id in self._history
+
+    @property
+    def consent_types(self) -> List[str]:
+        return list(self._bits)
+
+    def update(self, user_id: str, consent_type: str, status: bool, timestamp: Optional[datetime] = None) -> Dict[str, Any]:
+        record = {
+            'user_id': user_id,
+            'type': consent_type,
+            'status': bool(status),
+            'timestamp': timestamp or datetime.utcnow()
+        }
+        self._history.setdefault(user_id, []).append(record)
+
+        bit = self._bit(consent_type)
+        self._decided[user_id] = self._decided.get(user_id, 0) | bit
+        if status:
+            self._granted[user_id] = self._granted.get(user_id, 0) | bit
+        else:
+            self._granted[user_id] = self._granted.get(user_id, 0) & ~bit
+        return record
+
+    def check(self, user_id: str, consent_type: str) -> bool:
+        bit = self._bits.get(consent_type)
+        return bit is not None and bool(self._granted.get(user_id, 0) & bit)
+
+    def check_consents(self, user_ids: Iterable[str], consent_type: str) -> List[bool]:
+        bit = self._bits.get(consent_type)
+        if bit is None:
+            return [False for _ in user_ids]
+        granted = self._granted
+        return [bool(granted.get(user_id, 0) & bit) for user_id in user_ids]
+
+    def status(self, user_id: str, consent_type: str) -> Optional[bool]:
+        # Current decision for the type, or None if the user never made one
+        bit = self._bits.get(consent_type)
+        if bit is None or not self._decided.get(user_id, 0) & bit:
+            return None
+        return bool(self._granted.get(user_id, 0) & bit)
+
+    def granted_types(self, user_id: str) -> List[str]:
+        mask = self._granted.get(user_id, 0)
+        return [consent_type for consent_type, bit in self._bits.items() if mask & bit]
+
+    def current(self, user_id: str) -> Dict[str, Dict[str, Any]]:
+        # Latest record per consent type
+        latest = {}
+        for record in self._history.get(user_id, []):
+            latest[record['type']] = record
+        return latest
+
+    def history(self, user_id: str) -> List[Dict[str, Any]]:
+        return list(self._history.get(user_id, []))
+
+    def delete_user(self, user_id: str) -> List[Dict[str, Any]]:
+        self._granted.pop(user_id, None)
+        self._decided.pop(user_id, None)
+        return self._history.pop(user_id, [])
+
+    def _bit(self, consent_type: str) -> int:
+        bit = self._bits.get(consent_type)
+        if bit is None:
+            bit = self._bits[consent_type] = 1 << len(self._bits)
+        return bit
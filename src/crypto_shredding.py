@@ -0,0 +1,188 @@
+import base64
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Iterable, MutableMapping, Optional, Tuple
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.keywrap import aes_key_wrap, aes_key_unwrap
+
+# Encrypted values are stored as {ENCRYPTED_FIELD: base64(version | nonce | ciphertext)}
+ENCRYPTED_FIELD = '__encrypted__'
+FORMAT_VERSION = b'\x01'
+NONCE_SIZE = 12
+KEY_BITS = 256
+KEY_BYTES = KEY_BITS // 8
+DEFAULT_CACHE_SIZE = 4096
+
+def shredded_payload() -> Dict[str, Any]:
+    # What an encrypted value reads as once its user's key is destroyed
+    return {'erased': True}
+
+def is_encrypted(value) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and ENCRYPTED_FIELD in value
+
+def wrap_user_key(master_key: Optional[bytes], key: bytes) -> bytes:
+    # Per-user keys are stored wrapped (RFC 3394) by a master key kept
+    # outside the key store, so a copy of the store alone opens nothing
+    return aes_key_wrap(master_key, key) if master_key is not None else key
+
+def unwrap_user_key(master_key: Optional[bytes], stored: bytes) -> bytes:
+    # Keys stored before wrapping was enabled are the bare 32 bytes
+    if master_key is None or len(stored) == KEY_BYTES:
+        return stored
+    return aes_key_unwrap(master_key, stored)
+
+class Keyring:
+    # One AES-256-GCM data key per user. Values are JSON-encoded and
+    # encrypted under their user's key with the user id as associated
+    # data, so erasing a user is a single key deletion: every copy of the
+    # ciphertext, including backups and exports, becomes unreadable.
+    #
+    # keys is any mapping with get / __setitem__ / pop (a dict by default,
+    # or a database-backed store). Ciphers for recently used users are kept
+    # in an LRU cache so logging does not rebuild one per event.
+    def __init__(self, keys: Optional[MutableMapping[str, bytes]] = None, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.keys = keys if keys is not None else {}
+        self.cache_size = cache_size
+        self._ciphers: 'OrderedDict[str, AESGCM]' = OrderedDict()
+        self._lock = threading.RLock()
+
+    def has_key(self, user_id: str) -> bool:
+        with self._lock:
+            return user_id in self._ciphers or self.keys.get(user_id) is not None
+
+    def encrypt(self, user_id: str, value: Any) -> Dict[str, str]:
+        return self._seal(self._cipher(user_id, create=True), user_id, value)
+
+    def decrypt(self, user_id: str, value: Any) -> Any:
+        if not is_encrypted(value):
+            return value
+        return self._open(self._cipher(user_id), user_id, value)
+
+    def encrypt_batch(self, items: Iterable[Tuple[str, Any]]) -> List[Dict[str, str]]:
+        # One key lookup per distinct user in the batch
+        ciphers = {}
+        sealed = []
+        for user_id, value in items:
+            cipher = ciphers.get(user_id)
+            if cipher is None:
+                cipher = ciphers[user_id] = self._cipher(user_id, create=True)
+            sealed.append(self._seal(cipher, user_id, value))
+        return sealed
+
+    def decrypt_batch(self, items: Iterable[Tuple[str, Any]]) -> List[Any]:
+        ciphers = {}
+        opened = []
+        for user_id, value in items:
+            if not is_encrypted(value):
+                opened.append(value)
+                continue
+            if user_id not in ciphers:
+                ciphers[user_id] = self._cipher(user_id)
+            opened.append(self._open(ciphers[user_id], user_id, value))
+        return opened
+
+    def decrypt_entries(self, entries: Iterable[Dict[str, Any]], field: str = 'data_processed') -> List[Dict[str, Any]]:
+        # Copies of log entries with field decrypted; stored entries are untouched
+        entries = list(entries)
+        values = self.decrypt_batch((entry['user_id'], entry[field]) for entry in entries)
+        return [dict(entry, **{field: value}) for entry, value in zip(entries, values)]
+
+    def shred(self, user_id: str) -> bool:
+        # Constant time regardless of how much data the user has
+        with self._lock:
+            self._ciphers.pop(user_id, None)
+            return self.keys.pop(user_id, None) is not None
+
+    def evict(self, user_ids: Iterable[str]):
+        # Drops cached ciphers for keys deleted from the key store directly
+        with self._lock:
+            for user_id in user_ids:
+                self._ciphers.pop(user_id, None)
+
+    def _cipher(self, user_id: str, create: bool = False) -> Optional[AESGCM]:
+        with self._lock:
+            cipher = self._ciphers.get(user_id)
+            if cipher is not None:
+                self._ciphers.move_to_end(user_id)
+                return cipher
+
+            key = self.keys.get(user_id)
+            if key is None:
+                if not create:
+                    return None
+                key = AESGCM.generate_key(bit_length=KEY_BITS)
+                self.keys[user_id] = key
+
+            cipher = self._ciphers[user_id] = AESGCM(key)
+            if len(self._ciphers) > self.cache_size:
+                self._ciphers.popitem(last=False)
+            return cipher
+
+    @staticmethod
+    def _seal(cipher: AESGCM, user_id: str, value: Any) -> Dict[str, str]:
+        nonce = os.urandom(NONCE_SIZE)
+        plaintext = json.dumps(value, separators=(',', ':'), default=str).encode('utf-8')
+        ciphertext = cipher.encrypt(nonce, plaintext, user_id.encode('utf-8'))
+        return {ENCRYPTED_FIELD: base64.b64encode(FORMAT_VERSION + nonce + ciphertext).decode('ascii')}
+
+    @staticmethod
+    def _open(cipher: Optional[AESGCM], user_id: str, value: Dict[str, str]) -> Any:
+        if cipher is None:
+            return shredded_payload()
+
+        raw = base64.b64decode(value[ENCRYPTED_FIELD])
+        if raw[:1] != FORMAT_VERSION:
+            raise ValueError("Unsupported encrypted payload version")
+        nonce, ciphertext = raw[1:1 + NONCE_SIZE], raw[1 + NONCE_SIZE:]
+        try:
+            plaintext = cipher.decrypt(nonce, ciphertext, user_id.encode('utf-8'))
+        except InvalidTag:
+            # Written under a key that has since been shredded and replaced
+            return shredded_payload()
+        return json.loads(plaintext)
+
+class SQLiteKeyStore:
+    # Mapping-style access to per-user keys in a SQLite file, for Keyring
+    # when the data it protects outlives the process (the segment log).
+    # secure_delete overwrites a popped key on disk instead of leaving it
+    # in a free page, so shredding really destroys it. With a master key
+    # the keys are stored wrapped by it.
+    def __init__(self, path: str, fsync: bool = False, master_key: Optional[bytes] = None):
+        self.path = path
+        self._master_key = master_key
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA secure_delete=ON")
+        self._conn.execute(f"PRAGMA synchronous={'FULL' if fsync else 'NORMAL'}")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS user_keys (user_id TEXT PRIMARY KEY, key BLOB NOT NULL)")
+        self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM user_keys").fetchone()[0]
+
+    def get(self, user_id: str, default=None) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute("SELECT key FROM user_keys WHERE user_id = ?", (user_id,)).fetchone()
+        return unwrap_user_key(self._master_key, row[0]) if row is not None else default
+
+    def __setitem__(self, user_id: str, key: bytes):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO user_keys (user_id, key) VALUES (?, ?)", (user_id, wrap_user_key(self._master_key, key)))
+
+    def pop(self, user_id: str, default=None) -> Optional[bytes]:
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT key FROM user_keys WHERE user_id = ?", (user_id,)).fetchone()
+            if row is None:
+                return default
+            self._conn.execute("DELETE FROM user_keys WHERE user_id = ?", (user_id,))
+        return unwrap_user_key(self._master_key, row[0])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
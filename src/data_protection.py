@@ -0,0 +1,1135 @@
+import logging
+import threading
+import uuid
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Dict, List, Any, Optional, Tuple
+
+from sqlalchemy import create_engine, delete, event, func, insert, update, or_, and_, Column, Index, String, DateTime, Boolean, Integer, JSON, LargeBinary
+from sqlalchemy.exc import DisconnectionError, OperationalError
+from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.anonymization import anonymize_record
+from src.audit import AuditTrail, deletion_record, entry_record
+from src.config import load_config
+from src.crypto_shredding import KEY_BYTES as USER_KEY_BYTES, Keyring, unwrap_user_key, wrap_user_key
+from src.field_encryption import EnvelopeCipher, envelope_key_id, load_master_key
+from src.gdpr_manager import GDPRComplianceManager
+from src.dsar import process_access_requests
+from src.export import export_dsar_bundle
+from src.metrics import instrument
+from src.pii import anonymize_and_redact, load_scanner, redact_fields
+from src.tokenization import TOKENIZED_FIELDS, load_token_vault
+from src.erasure import ErasureJob, DEFAULT_CHUNK_SIZE as ERASURE_CHUNK_SIZE
+from src.retention import RetentionSweeper
+
+# SQLite allows at most 999 bound parameters per statement on older builds
+MAX_IN_CLAUSE = 500
+# Flush batches a buffered writer holds on to while the database is down
+DEFAULT_BUFFERED_BATCHES = 20
+
+# SQLAlchemy Base
+Base = declarative_base()
+
+class DataProtectionModel(Base):
+    __tablename__ = 'data_protection_log'
+
+    id = Column(String, primary_key=True)
+    user_id = Column(String, nullable=False, index=True)
+    activity_type = Column(String, nullable=False)
+    timestamp = Column(DateTime, nullable=False, index=True)
+    data_processed = Column(JSON)
+    is_consent_given = Column(Boolean, default=False)
+    retention_period = Column(DateTime, index=True)
+
+    # A user's logs in iter_logs order, so exporting a heavy user walks the
+    # index instead of sorting every matching row for each chunk
+    __table_args__ = (Index('ix_data_protection_log_user_timeline', 'user_id', 'timestamp', 'id'),)
+
+class UserDataModel(Base):
+    __tablename__ = 'user_data'
+
+    user_id = Column(String, primary_key=True)
+    data = Column(JSON, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+
+class ConsentModel(Base):
+    __tablename__ = 'consents'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String, nullable=False, index=True)
+    consent_type = Column(String, nullable=False)
+    status = Column(Boolean, nullable=False)
+    timestamp = Column(DateTime, nullable=False)
+
+class ErasureJobModel(Base):
+    __tablename__ = 'erasure_jobs'
+
+    job_id = Column(String, primary_key=True)
+    user_ids = Column(JSON, nullable=False)
+    chunk_size = Column(Integer, nullable=False)
+    next_index = Column(Integer, nullable=False, default=0)
+    status = Column(String, nullable=False)
+    error = Column(String)
+    updated_at = Column(DateTime, nullable=False)
+
+class UserKeyModel(Base):
+    __tablename__ = 'user_keys'
+
+    user_id = Column(String, primary_key=True)
+    key = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+
+class DataKeyModel(Base):
+    __tablename__ = 'data_keys'
+
+    # Envelope data keys, wrapped by the master key; the newest one encrypts
+    key_id = Column(String, primary_key=True)
+    wrapped_key = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+
+class AuditRecordModel(Base):
+    __tablename__ = 'audit_trail'
+
+    # Merkle leaves for every log append and deletion, in tree order
+    position = Column(Integer, primary_key=True, autoincrement=False)
+    kind = Column(Integer, nullable=False)
+    log_ids = Column(LargeBinary, nullable=False)
+    leaf = Column(LargeBinary, nullable=False)
+
+LOG_COLUMNS = ('id', 'user_id', 'activity_type', 'timestamp', 'data_processed', 'is_consent_given', 'retention_period')
+
+# Tables holding per-user rows, cleared together on erasure
+USER_TABLES = (DataProtectionModel, ConsentModel, UserDataModel, UserKeyModel)
+
+# With crypto-shredding the log rows stay behind as unreadable ciphertext
+# until retention purges them; only these small per-user tables are cleared
+SHREDDED_USER_TABLES = (UserKeyModel, ConsentModel, UserDataModel)
+
+def audit_rows(records, first: int) -> List[Dict[str, Any]]:
+    # Rows for AuditRecordModel, numbered from the trail position first
+    return [
+        {'position': first + offset, 'kind': kind, 'log_ids': log_ids, 'leaf': leaf}
+        for offset, (kind, log_ids, leaf) in enumerate(records)
+    ]
+
+class SQLKeyStore:
+    # Mapping-style access to the user_keys table for Keyring. Keys are
+    # stored wrapped (RFC 3394) by the master key, which is kept outside
+    # the database, so a backup of the database alone cannot bring a
+    # shredded user's data back.
+    def __init__(self, session_factory, master_key: bytes):
+        self.session_factory = session_factory
+        self._master_key = master_key
+        self._lock = threading.Lock()
+
+    # Every access holds the lock, so no key is read or written under one
+    # master key while rewrap moves the table to another
+    def get(self, user_id: str, default=None) -> Optional[bytes]:
+        session = self.session_factory()
+
+        try:
+            with self._lock:
+                row = session.get(UserKeyModel, user_id)
+                return unwrap_user_key(self._master_key, row.key) if row is not None else default
+        finally:
+            session.close()
+
+    def __setitem__(self, user_id: str, key: bytes):
+        session = self.session_factory()
+
+        try:
+            with self._lock:
+                session.merge(UserKeyModel(user_id=user_id, key=wrap_user_key(self._master_key, key), created_at=datetime.utcnow()))
+                session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def pop(self, user_id: str, default=None) -> Optional[bytes]:
+        session = self.session_factory()
+
+        try:
+            with self._lock:
+                row = session.get(UserKeyModel, user_id)
+                if row is None:
+                    return default
+                key = unwrap_user_key(self._master_key, row.key)
+                session.delete(row)
+                session.commit()
+                return key
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def rewrap(self, new_master_key: Optional[bytes] = None, chunk_size: int = 1000) -> int:
+        # Re-wraps every key under new_master_key, one transaction per
+        # chunk; without one, only keys stored unwrapped by older versions
+        # are wrapped. Keys are read with the lock held, so none can be
+        # written under the old master key and missed.
+        with self._lock:
+            new_master_key = new_master_key or self._master_key
+            query_filter = None if new_master_key != self._master_key else func.length(UserKeyModel.key) == USER_KEY_BYTES
+            count = 0
+            last_user_id = ''
+            while True:
+                session = self.session_factory()
+                try:
+                    query = session.query(UserKeyModel).filter(UserKeyModel.user_id > last_user_id)
+                    if query_filter is not None:
+                        query = query.filter(query_filter)
+                    rows = query.order_by(UserKeyModel.user_id).limit(chunk_size).all()
+                    for row in rows:
+                        row.key = wrap_user_key(new_master_key, unwrap_user_key(self._master_key, row.key))
+                        last_user_id = row.user_id
+                    session.commit()
+                except Exception:
+                    session.rollback()
+                    raise
+                finally:
+                    session.close()
+                if not rows:
+                    break
+                count += len(rows)
+            self._master_key = new_master_key
+            return count
+
+def _enable_secure_delete(dbapi_connection, connection_record):
+    dbapi_connection.execute("PRAGMA secure_delete=ON")
+
+def _is_unavailable(error: Exception) -> bool:
+    # The database could not be reached, as opposed to a row it refused
+    return isinstance(error, (OperationalError, DisconnectionError, ConnectionError, TimeoutError))
+
+class BufferedLogWriter:
+    # Write-behind buffer for processing log rows. Rows are collected in
+    # memory and written with one bulk INSERT and one commit per flush.
+    # A flush happens when the buffer reaches max_batch_size, when
+    # flush_interval seconds pass, or on an explicit flush()/close().
+    # With a payload cipher the payloads of a whole batch are encrypted at
+    # flush time, off the logging path. With an audit trail the batch's
+    # Merkle leaves are hashed at flush time too and committed with it.
+    # While the database is unreachable, rows of a failed flush stay
+    # buffered for the next one, up to max_buffer_size rows; past that new
+    # rows are refused with an error until it takes writes again. A batch
+    # the database refuses is retried row by row, and rows it refuses on
+    # their own are logged and dropped, as the unbuffered path would.
+    def __init__(
+        self,
+        session_factory,
+        max_batch_size: int = 500,
+        flush_interval: Optional[float] = 1.0,
+        payload_cipher: Optional[EnvelopeCipher] = None,
+        audit: Optional[AuditTrail] = None,
+        audit_lock=None,
+        max_buffer_size: Optional[int] = None
+    ):
+        self.SessionLocal = session_factory
+        self.max_batch_size = max_batch_size
+        self.max_buffer_size = max_buffer_size or max_batch_size * DEFAULT_BUFFERED_BATCHES
+        self.flush_interval = flush_interval
+        self.payload_cipher = payload_cipher
+        self.audit = audit
+        # Held from insert to commit so trail positions follow commit order
+        self.audit_lock = audit_lock or threading.Lock()
+
+        self._buffer: List[Dict[str, Any]] = []
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._stop = threading.Event()
+
+        self._thread = None
+        if flush_interval:
+            self._thread = threading.Thread(target=self._run, name="gdpr-log-writer", daemon=True)
+            self._thread.start()
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def add(self, row: Dict[str, Any]):
+        self.add_many([row])
+
+    def add_many(self, rows: List[Dict[str, Any]]):
+        with self._buffer_lock:
+            if self._closed:
+                raise RuntimeError("Log writer is closed")
+            if len(self._buffer) + len(rows) > self.max_buffer_size:
+                raise RuntimeError(f"Log writer buffer is full ({len(self._buffer)} rows are waiting for a flush)")
+            self._buffer.extend(rows)
+            is_full = len(self._buffer) >= self.max_batch_size
+
+        if is_full:
+            self.flush()
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._buffer_lock:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+
+            try:
+                self._insert(rows)
+                return len(rows)
+            except Exception as e:
+                if len(rows) == 1 or _is_unavailable(e):
+                    return self._requeue(rows, e)
+
+            # One bad row must not hold back the rest: write the batch row
+            # by row and drop the rows that fail on their own
+            written = 0
+            for position, row in enumerate(rows):
+                try:
+                    self._insert([row])
+                    written += 1
+                except Exception as e:
+                    if _is_unavailable(e):
+                        self._requeue(rows[position:], e)
+                        break
+                    logging.error(f"Data Processing Log Flush Error: dropped log entry {row['id']}. Error: {e}")
+            return written
+
+    def _insert(self, rows: List[Dict[str, Any]]):
+        session = self.SessionLocal()
+        try:
+            batch = rows
+            if self.payload_cipher is not None:
+                payloads = self.payload_cipher.encrypt_many([row['data_processed'] for row in rows])
+                batch = [dict(row, data_processed=payload) for row, payload in zip(rows, payloads)]
+            records = [entry_record(row) for row in rows] if self.audit is not None else []
+
+            with self.audit_lock:
+                session.execute(insert(DataProtectionModel), batch)
+                if records:
+                    session.execute(insert(AuditRecordModel), audit_rows(records, len(self.audit)))
+                session.commit()
+                if records:
+                    self.audit.extend(records)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _requeue(self, rows: List[Dict[str, Any]], error: Exception) -> int:
+        # Put the rows back in front so the next flush retries them
+        with self._buffer_lock:
+            self._buffer[:0] = rows
+        logging.error(f"Data Processing Log Flush Error: {error}")
+        return 0
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+        with self._buffer_lock:
+            self._closed = True
+            if self._buffer:
+                logging.error(f"Data Processing Log Close Error: {len(self._buffer)} rows were not written")
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+class EncryptoDataProtectionEngine:
+    def __init__(
+        self,
+        database_url: str,
+        buffered: bool = False,
+        flush_size: int = 500,
+        flush_interval: Optional[float] = 1.0,
+        retention_days: Optional[int] = None,
+        crypto_shredding: Optional[bool] = None,
+        field_encryption: Optional[bool] = None,
+        master_key: Optional[bytes] = None,
+        redact_logs: Optional[bool] = None,
+        audit: Optional[bool] = None,
+        tokenization: Optional[bool] = None,
+        token_vault_path: Optional[str] = None,
+        max_buffer_size: Optional[int] = None
+    ):
+        self.config = load_config()
+        self.retention_days = retention_days if retention_days is not None else int(self.config['gdpr']['retention_period_days'])
+        if crypto_shredding is None:
+            crypto_shredding = bool(self.config['gdpr'].get('crypto_shredding', False))
+        if field_encryption is None:
+            field_encryption = bool(self.config['encryption']['field_encryption'])
+        if redact_logs is None:
+            redact_logs = bool(self.config['pii']['redact_logs'])
+        if audit is None:
+            audit = bool(self.config['audit']['enabled'])
+        if tokenization is None:
+            tokenization = bool(self.config['tokenization']['enabled'])
+
+        in_memory = database_url.startswith("sqlite") and ":memory:" in database_url
+        self.in_memory = in_memory
+        if in_memory and token_vault_path is None:
+            # A throwaway database gets a throwaway vault, not the shared one
+            token_vault_path = ':memory:'
+
+        if in_memory:
+            # One shared connection, otherwise every pooled connection
+            # (and the writer thread) would see its own empty database
+            self.engine = create_engine(
+                database_url,
+                connect_args={'check_same_thread': False},
+                poolclass=StaticPool
+            )
+        else:
+            self.engine = create_engine(database_url)
+        if database_url.startswith("sqlite"):
+            # Deleted rows (shredded keys above all) are overwritten, not
+            # left behind in free pages
+            event.listen(self.engine, 'connect', _enable_secure_delete)
+        self.SessionLocal = sessionmaker(bind=self.engine)
+
+        Base.metadata.create_all(self.engine)
+        # create_all skips indexes on tables that already existed
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(self.engine, checkfirst=True)
+
+        # Nested PII scanning of access request results and (optionally) logged payloads
+        self.pii_scanner = load_scanner(self.config)
+        self.redact_access_requests = bool(self.config['pii']['redact_access_requests'])
+        self.redact_logs = redact_logs
+
+        # Reversible keyed tokens for email, phone and address in access
+        # request results, instead of one-way hashes
+        self.token_vault = load_token_vault(self.config, token_vault_path) if tokenization else None
+
+        self.gdpr_manager = GDPRComplianceManager(
+            self.pii_scanner if self.redact_access_requests else None,
+            token_vault=self.token_vault
+        )
+        self._load_consents()
+        self.gdpr_manager.consent_manager.persist = self._persist_consent
+
+        if crypto_shredding or field_encryption:
+            master_key = master_key or load_master_key(self.config)
+            if master_key is None:
+                raise ValueError("Crypto-shredding and field encryption need a master key, none is configured")
+
+        # Per-user data keys, wrapped by the master key; payloads and
+        # personal data are stored encrypted
+        self.user_keys = None
+        self.keyring = None
+        if crypto_shredding:
+            self.user_keys = SQLKeyStore(self.SessionLocal, master_key)
+            self.user_keys.rewrap()
+            self.keyring = Keyring(self.user_keys)
+
+        # Envelope encryption of stored log payloads
+        self.payload_cipher = None
+        if field_encryption:
+            self.payload_cipher = EnvelopeCipher(
+                master_key,
+                self._load_data_keys(),
+                save_keys=self._save_data_keys,
+                max_workers=self.config['encryption'].get('max_workers'),
+                parallel_threshold=int(self.config['encryption']['parallel_threshold'])
+            )
+
+        # Merkle trail of log appends and deletions, rebuilt from its table.
+        # The lock serializes log writes so trail positions match commits.
+        self.audit = AuditTrail(self._load_audit_records()) if audit else None
+        self.audit_checkpoint = None
+        self._audit_lock = threading.Lock()
+
+        self.log_writer = None
+        if buffered:
+            self.log_writer = BufferedLogWriter(
+                self.SessionLocal,
+                flush_size,
+                flush_interval,
+                self.payload_cipher,
+                audit=self.audit,
+                audit_lock=self._audit_lock,
+                max_buffer_size=max_buffer_size
+            )
+
+        self.retention_sweeper = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @instrument('log_data_processing_activity', failed=lambda result: result is None)
+    def log_data_processing_activity(
+        self,
+        user_id: str,
+        activity_type: str,
+        data_processed: Dict[str, Any]
+    ):
+        retention_period = datetime.utcnow() + timedelta(days=self.retention_days)
+
+        if self.redact_logs:
+            data_processed = self.pii_scanner.redact(data_processed)
+        if self.keyring is not None:
+            data_processed = self.keyring.encrypt(user_id, data_processed)
+
+        log_entry = {
+            'id': str(uuid.uuid4()),
+            'user_id': user_id,
+            'activity_type': activity_type,
+            'timestamp': datetime.utcnow(),
+            'data_processed': data_processed,
+            'is_consent_given': self.gdpr_manager.consent_manager.check_consent(user_id),
+            'retention_period': retention_period
+        }
+
+        try:
+            if self.log_writer is not None:
+                self.log_writer.add(log_entry)
+                return log_entry
+
+            self._write_logs([log_entry])
+            logging.info("Data processing activity logged successfully!")
+            return log_entry
+        except Exception as e:
+            logging.error(f"Data Processing Log Error: {e}")
+
+    @instrument('log_data_processing_activities', failed=lambda result: result is None)
+    def log_data_processing_activities(self, events: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        # Bulk logging for ingestion. Events carry user_id, activity_type,
+        # data_processed and optionally consent_given (looked up in one
+        # call when missing). One INSERT and commit per call, or one
+        # hand-off to the buffered writer.
+        now = datetime.utcnow()
+        retention_period = now + timedelta(days=self.retention_days)
+
+        unresolved = [event['user_id'] for event in events if event.get('consent_given') is None]
+        consents = iter(self.gdpr_manager.consent_manager.check_consents(unresolved))
+        payloads = [event.get('data_processed') or {} for event in events]
+        if self.redact_logs:
+            payloads = [self.pii_scanner.redact(payload) for payload in payloads]
+        if self.keyring is not None:
+            payloads = self.keyring.encrypt_batch(zip((event['user_id'] for event in events), payloads))
+
+        log_entries = []
+        for event, payload in zip(events, payloads):
+            consent_given = event.get('consent_given')
+            log_entries.append({
+                'id': str(uuid.uuid4()),
+                'user_id': event['user_id'],
+                'activity_type': event['activity_type'],
+                'timestamp': now,
+                'data_processed': payload,
+                'is_consent_given': bool(next(consents) if consent_given is None else consent_given),
+                'retention_period': retention_period
+            })
+
+        try:
+            if self.log_writer is not None:
+                self.log_writer.add_many(log_entries)
+                return log_entries
+
+            self._write_logs(log_entries)
+            return log_entries
+        except Exception as e:
+            logging.error(f"Data Processing Log Error: {e}")
+
+    def flush(self) -> int:
+        if self.log_writer is None:
+            return 0
+        return self.log_writer.flush()
+
+    def close(self):
+        if self.retention_sweeper is not None:
+            self.retention_sweeper.stop()
+        if self.log_writer is not None:
+            self.log_writer.close()
+        if self.payload_cipher is not None:
+            self.payload_cipher.close()
+        if self.token_vault is not None:
+            self.token_vault.close()
+
+    def get_logs(self, user_id: Optional[str] = None) -> List[DataProtectionModel]:
+        self.flush()
+        session = self.SessionLocal()
+
+        try:
+            query = session.query(DataProtectionModel)
+            if user_id:
+                query = query.filter_by(user_id=user_id)
+            logs = query.all()
+        finally:
+            session.close()
+
+        # The rows are detached, so this never writes plaintext back
+        payloads = self._decode_payloads([(log.user_id, log.data_processed) for log in logs])
+        for log, payload in zip(logs, payloads):
+            log.data_processed = payload
+        return logs
+
+    def iter_logs(
+        self,
+        user_id: Optional[str] = None,
+        activity_type: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        chunk_size: int = 10000,
+        after: Optional[Tuple[datetime, str]] = None
+    ):
+        # Keyset pagination on (timestamp, id): each chunk is its own short
+        # query, filters run in SQL and only one chunk is held in memory.
+        # after resumes behind a (timestamp, id) seen in an earlier chunk.
+        self.flush()
+        columns = [getattr(DataProtectionModel, column) for column in LOG_COLUMNS]
+        cursor = after
+
+        while True:
+            session = self.SessionLocal()
+            try:
+                query = session.query(*columns)
+                if user_id:
+                    query = query.filter(DataProtectionModel.user_id == user_id)
+                if activity_type:
+                    query = query.filter(DataProtectionModel.activity_type == activity_type)
+                if start is not None:
+                    query = query.filter(DataProtectionModel.timestamp >= start)
+                if end is not None:
+                    query = query.filter(DataProtectionModel.timestamp < end)
+                if cursor is not None:
+                    query = query.filter(or_(
+                        DataProtectionModel.timestamp > cursor[0],
+                        and_(DataProtectionModel.timestamp == cursor[0], DataProtectionModel.id > cursor[1])
+                    ))
+                rows = query.order_by(DataProtectionModel.timestamp, DataProtectionModel.id).limit(chunk_size).all()
+            finally:
+                session.close()
+
+            if not rows:
+                return
+            chunk = [dict(zip(LOG_COLUMNS, row)) for row in rows]
+            payloads = self._decode_payloads([(log['user_id'], log['data_processed']) for log in chunk])
+            for log, payload in zip(chunk, payloads):
+                log['data_processed'] = payload
+            yield chunk
+            if len(rows) < chunk_size:
+                return
+            cursor = (rows[-1].timestamp, rows[-1].id)
+
+    def count_user_logs(self, user_id: str) -> int:
+        self.flush()
+        session = self.SessionLocal()
+
+        try:
+            return session.query(func.count(DataProtectionModel.id)).filter(DataProtectionModel.user_id == user_id).scalar()
+        finally:
+            session.close()
+
+    def purge_expired(self, now: Optional[datetime] = None) -> int:
+        # Range delete on the retention_period index, only expired rows are visited
+        self.flush()
+        session = self.SessionLocal()
+
+        try:
+            with self._audit_lock:
+                purged, records = self._delete_logs(
+                    session,
+                    DataProtectionModel.retention_period <= (now or datetime.utcnow())
+                )
+                self._add_audit_records(session, records)
+                session.commit()
+                self._extend_audit(records)
+            return purged
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def start_retention_sweeper(self, interval: Optional[float] = None) -> RetentionSweeper:
+        if interval is None:
+            interval = float(self.config['gdpr']['retention_sweep_interval_seconds'])
+        self.retention_sweeper = RetentionSweeper(self, interval=interval).start()
+        return self.retention_sweeper
+
+    def store_personal_data(self, user_id: str, data: Dict[str, Any]) -> bool:
+        session = self.SessionLocal()
+
+        try:
+            if self.keyring is not None:
+                data = self.keyring.encrypt(user_id, data)
+            session.merge(UserDataModel(user_id=user_id, data=data, updated_at=datetime.utcnow()))
+            session.commit()
+            return True
+        except Exception as e:
+            session.rollback()
+            logging.error(f"Personal Data Store Error: {e}")
+            return False
+        finally:
+            session.close()
+
+    def retrieve_personal_data_batch(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        session = self.SessionLocal()
+
+        try:
+            found = {}
+            for start in range(0, len(user_ids), MAX_IN_CLAUSE):
+                rows = session.query(UserDataModel.user_id, UserDataModel.data).filter(
+                    UserDataModel.user_id.in_(user_ids[start:start + MAX_IN_CLAUSE])
+                )
+                found.update((user_id, data) for user_id, data in rows)
+        finally:
+            session.close()
+
+        if self.keyring is not None:
+            found = dict(zip(found, self.keyring.decrypt_batch(found.items())))
+        return found
+
+    def process_data_access_requests(self, user_ids, batch_size: int = 1000, max_workers: Optional[int] = None):
+        # Users without a user_data row are reported as 'not_found'
+        if self.token_vault is not None:
+            # Tokenized once per batch; workers only redact what is left
+            return process_access_requests(
+                user_ids,
+                self.retrieve_personal_data_batch,
+                batch_size=batch_size,
+                max_workers=max_workers,
+                anonymize=partial(redact_fields, scanner=self.pii_scanner, skip=TOKENIZED_FIELDS) if self.redact_access_requests else dict,
+                tokenize=self.token_vault.tokenize_records
+            )
+        return process_access_requests(
+            user_ids,
+            self.retrieve_personal_data_batch,
+            batch_size=batch_size,
+            max_workers=max_workers,
+            anonymize=partial(anonymize_and_redact, scanner=self.pii_scanner) if self.redact_access_requests else anonymize_record
+        )
+
+    def detokenize(self, tokens: List[str]) -> List[Optional[str]]:
+        # Re-identification for legitimate requests; None for unknown or
+        # erased tokens
+        if self.token_vault is None:
+            raise RuntimeError("Tokenization is not enabled")
+        return self.token_vault.detokenize_many(tokens)
+
+    def export_data_subject_bundle(self, user_id: str, path: str, progress=None, chunk_size: int = 10000) -> Dict[str, Any]:
+        # Profile, consent history and every log entry of one user, streamed
+        # into a ZIP bundle one chunk at a time
+        try:
+            result = next(iter(self.process_data_access_requests([user_id])))
+            counts = export_dsar_bundle(
+                path,
+                user_id,
+                result['data'] if result['status'] == 'success' else None,
+                self._consent_history(user_id),
+                self.iter_logs(user_id=user_id, chunk_size=chunk_size),
+                progress
+            )
+            return {'status': 'success', 'path': path, **counts}
+        except Exception as e:
+            logging.error(f"Data Access Bundle Error: {e}")
+            return {
+                'status': 'error',
+                'message': 'Unable to export data access bundle'
+            }
+
+    def store_consent(self, user_id: str, consent_type: str, status: bool) -> bool:
+        # The consents table is the append-only history; the in-memory
+        # consent store answers checks
+        try:
+            return self.gdpr_manager.consent_manager.update_consent(user_id, consent_type, datetime.utcnow(), status)
+        except Exception as e:
+            logging.error(f"Consent Store Error: {e}")
+            return False
+
+    def _persist_consent(self, user_id: str, consent_type: str, status: bool, timestamp: datetime):
+        # Consent manager hook, so consents given through the manager API
+        # survive a restart too
+        session = self.SessionLocal()
+
+        try:
+            session.add(ConsentModel(
+                user_id=user_id,
+                consent_type=consent_type,
+                status=status,
+                timestamp=timestamp
+            ))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    @instrument('right_to_be_forgotten')
+    def right_to_be_forgotten(self, user_id: str):
+        try:
+            self._erase_users([user_id])
+
+            return {
+                'status': 'success',
+                'message': 'User data successfully erased'
+            }
+        except Exception as e:
+            logging.error(f"Right to be Forgotten Error: {e}")
+            return {
+                'status': 'error',
+                'message': 'Unable to erase user data'
+            }
+
+    def erase_users(self, user_ids, chunk_size: int = ERASURE_CHUNK_SIZE, background: bool = True) -> ErasureJob:
+        job = ErasureJob(
+            user_ids,
+            self._erase_users,
+            chunk_size=chunk_size,
+            on_checkpoint=self._save_erasure_job
+        )
+        self._save_erasure_job(job)
+        return job.start() if background else self._run_job(job)
+
+    def resume_erasure_job(self, job_id: str, background: bool = True) -> Optional[ErasureJob]:
+        session = self.SessionLocal()
+
+        try:
+            row = session.get(ErasureJobModel, job_id)
+            if row is None:
+                return None
+            job = ErasureJob(
+                row.user_ids,
+                self._erase_users,
+                chunk_size=row.chunk_size,
+                job_id=row.job_id,
+                next_index=row.next_index,
+                status=row.status,
+                on_checkpoint=self._save_erasure_job
+            )
+        finally:
+            session.close()
+
+        return job.start() if background else self._run_job(job)
+
+    def get_erasure_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        session = self.SessionLocal()
+
+        try:
+            row = session.get(ErasureJobModel, job_id)
+            if row is None:
+                return None
+            total = len(row.user_ids)
+            return {
+                'job_id': row.job_id,
+                'status': row.status,
+                'erased': row.next_index,
+                'total': total,
+                'fraction': row.next_index / total if total else 1.0,
+                'error': row.error,
+                'updated_at': row.updated_at
+            }
+        finally:
+            session.close()
+
+    def unfinished_erasure_jobs(self) -> List[str]:
+        # Jobs a restarted process should resume
+        session = self.SessionLocal()
+
+        try:
+            rows = session.query(ErasureJobModel.job_id).filter(ErasureJobModel.status != 'completed')
+            return [job_id for job_id, in rows]
+        finally:
+            session.close()
+
+    def rotate_data_key(self, reencrypt: bool = False) -> str:
+        # New envelope data key for future writes; old rows stay readable
+        if self.payload_cipher is None:
+            raise RuntimeError("Field encryption is not enabled")
+        key_id = self.payload_cipher.rotate()
+        if reencrypt:
+            self.reencrypt_logs()
+        return key_id
+
+    def rotate_master_key(self, new_master_key: bytes) -> int:
+        # Re-wraps every data key and per-user key; no payload is touched
+        if self.payload_cipher is None and self.user_keys is None:
+            raise RuntimeError("Neither field encryption nor crypto-shredding is enabled")
+        count = 0
+        if self.payload_cipher is not None:
+            count += self.payload_cipher.rewrap(new_master_key)
+        if self.user_keys is not None:
+            count += self.user_keys.rewrap(new_master_key)
+        return count
+
+    def reencrypt_logs(self, chunk_size: int = 1000) -> int:
+        # Moves payloads written under older data keys (or in plaintext) to
+        # the active key, one short transaction per chunk
+        if self.payload_cipher is None:
+            raise RuntimeError("Field encryption is not enabled")
+        self.flush()
+        active_key_id = self.payload_cipher.active_key_id
+        cursor = None
+        updated = 0
+
+        while True:
+            session = self.SessionLocal()
+            try:
+                query = session.query(DataProtectionModel.id, DataProtectionModel.data_processed)
+                if cursor is not None:
+                    query = query.filter(DataProtectionModel.id > cursor)
+                rows = query.order_by(DataProtectionModel.id).limit(chunk_size).all()
+                if not rows:
+                    return updated
+
+                stale = [(log_id, payload) for log_id, payload in rows if envelope_key_id(payload) != active_key_id]
+                if stale:
+                    payloads = self.payload_cipher.encrypt_many(
+                        self.payload_cipher.decrypt_many([payload for _, payload in stale])
+                    )
+                    session.execute(
+                        update(DataProtectionModel),
+                        [{'id': log_id, 'data_processed': payload} for (log_id, _), payload in zip(stale, payloads)]
+                    )
+                    session.commit()
+                    updated += len(stale)
+                cursor = rows[-1].id
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+
+    def verify_audit_trail(self, full: bool = False) -> Dict[str, Any]:
+        # Re-hashes the rows logged since the last good checkpoint (all of
+        # them when full) and proves the rest unchanged from it
+        if self.audit is None:
+            raise RuntimeError("Audit trail is not enabled")
+        self.flush()
+        session = self.SessionLocal()
+
+        try:
+            with self._audit_lock:
+                size = len(self.audit)
+                stored_count = session.query(func.count(DataProtectionModel.id)).scalar()
+        finally:
+            session.close()
+
+        result = self.audit.verify(
+            self._stored_logs,
+            since=None if full else self.audit_checkpoint,
+            stored_count=stored_count,
+            size=size
+        )
+        if result['status'] == 'success':
+            self.audit_checkpoint = result['checkpoint']
+        return result
+
+    def prove_log_entry(self, log_id: str) -> Optional[Dict[str, Any]]:
+        # Inclusion proof of a log row against the current trail root
+        if self.audit is None:
+            raise RuntimeError("Audit trail is not enabled")
+        self.flush()
+        return self.audit.prove(log_id)
+
+    def _consent_history(self, user_id: str):
+        session = self.SessionLocal()
+
+        try:
+            rows = session.query(ConsentModel.consent_type, ConsentModel.status, ConsentModel.timestamp).filter(
+                ConsentModel.user_id == user_id
+            ).order_by(ConsentModel.timestamp, ConsentModel.id).yield_per(1000)
+            for consent_type, status, timestamp in rows:
+                yield {'user_id': user_id, 'type': consent_type, 'status': status, 'timestamp': timestamp}
+        finally:
+            session.close()
+
+    def _stored_logs(self, log_ids: List[str]):
+        # Rows as they were hashed: field encryption undone, per-user
+        # encryption kept
+        columns = [getattr(DataProtectionModel, column) for column in LOG_COLUMNS]
+        for start in range(0, len(log_ids), MAX_IN_CLAUSE):
+            session = self.SessionLocal()
+            try:
+                rows = session.query(*columns).filter(DataProtectionModel.id.in_(log_ids[start:start + MAX_IN_CLAUSE])).all()
+            finally:
+                session.close()
+
+            chunk = [dict(zip(LOG_COLUMNS, row)) for row in rows]
+            if self.payload_cipher is not None:
+                payloads = self.payload_cipher.decrypt_many([log['data_processed'] for log in chunk])
+                for log, payload in zip(chunk, payloads):
+                    log['data_processed'] = payload
+            yield from chunk
+
+    def _write_logs(self, log_entries: List[Dict[str, Any]]):
+        # One INSERT and one commit, with the entries' audit records
+        rows = log_entries
+        if self.payload_cipher is not None:
+            payloads = self.payload_cipher.encrypt_many([entry['data_processed'] for entry in log_entries])
+            rows = [dict(entry, data_processed=payload) for entry, payload in zip(log_entries, payloads)]
+        records = [entry_record(entry) for entry in log_entries] if self.audit is not None else []
+        session = self.SessionLocal()
+
+        try:
+            with self._audit_lock:
+                session.execute(insert(DataProtectionModel), rows)
+                self._add_audit_records(session, records)
+                session.commit()
+                self._extend_audit(records)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _delete_logs(self, session, condition):
+        # Deletes the matching log rows. With the audit trail on, their ids
+        # are selected first and deletion records are returned for the
+        # caller to add and commit under the audit lock.
+        if self.audit is None:
+            return session.execute(delete(DataProtectionModel).where(condition)).rowcount, []
+
+        log_ids = [log_id for log_id, in session.query(DataProtectionModel.id).filter(condition)]
+        records = []
+        for start in range(0, len(log_ids), MAX_IN_CLAUSE):
+            chunk = log_ids[start:start + MAX_IN_CLAUSE]
+            session.execute(delete(DataProtectionModel).where(DataProtectionModel.id.in_(chunk)))
+            records.append(deletion_record(chunk))
+        return len(log_ids), records
+
+    def _add_audit_records(self, session, records):
+        if records:
+            session.execute(insert(AuditRecordModel), audit_rows(records, len(self.audit)))
+
+    def _extend_audit(self, records):
+        # Only after the commit, so the trail never holds unwritten records
+        if records:
+            self.audit.extend(records)
+
+    def _load_audit_records(self):
+        session = self.SessionLocal()
+
+        try:
+            rows = session.query(AuditRecordModel.kind, AuditRecordModel.log_ids, AuditRecordModel.leaf)
+            return [(kind, log_ids, leaf) for kind, log_ids, leaf in rows.order_by(AuditRecordModel.position).yield_per(10000)]
+        finally:
+            session.close()
+
+    def _decode_payloads(self, items: List[Any]) -> List[Any]:
+        # Undoes field encryption, then per-user encryption; items are
+        # (user_id, stored payload) pairs
+        payloads = [payload for _, payload in items]
+        if self.payload_cipher is not None:
+            payloads = self.payload_cipher.decrypt_many(payloads)
+        if self.keyring is not None:
+            payloads = self.keyring.decrypt_batch(zip((user_id for user_id, _ in items), payloads))
+        return payloads
+
+    def _load_data_keys(self) -> Dict[str, bytes]:
+        session = self.SessionLocal()
+
+        try:
+            rows = session.query(DataKeyModel.key_id, DataKeyModel.wrapped_key).order_by(DataKeyModel.created_at)
+            return {key_id: wrapped_key for key_id, wrapped_key in rows}
+        finally:
+            session.close()
+
+    def _save_data_keys(self, wrapped_keys: Dict[str, bytes]):
+        session = self.SessionLocal()
+
+        try:
+            for key_id, wrapped_key in wrapped_keys.items():
+                row = session.get(DataKeyModel, key_id)
+                if row is None:
+                    session.add(DataKeyModel(key_id=key_id, wrapped_key=wrapped_key, created_at=datetime.utcnow()))
+                else:
+                    row.wrapped_key = wrapped_key
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _load_consents(self):
+        session = self.SessionLocal()
+
+        try:
+            store = self.gdpr_manager.consent_manager.store
+            rows = session.query(ConsentModel).order_by(ConsentModel.timestamp, ConsentModel.id)
+            for row in rows.yield_per(10000):
+                store.update(row.user_id, row.consent_type, row.status, row.timestamp)
+        finally:
+            session.close()
+
+    @staticmethod
+    def _run_job(job: ErasureJob) -> ErasureJob:
+        job.run()
+        return job
+
+    def _erase_users(self, user_ids: List[str]):
+        if self.keyring is not None:
+            # Destroying the keys makes the logged payloads unreadable, so
+            # the (large) log table is not scanned. Buffered rows are
+            # already encrypted and need no flush.
+            tables = SHREDDED_USER_TABLES
+        else:
+            # Pending buffered rows must land before the delete, or they
+            # would be written after the user was erased
+            self.flush()
+            tables = USER_TABLES
+        session = self.SessionLocal()
+
+        try:
+            with self._audit_lock:
+                records = []
+                for start in range(0, len(user_ids), MAX_IN_CLAUSE):
+                    chunk = user_ids[start:start + MAX_IN_CLAUSE]
+                    for model in tables:
+                        if model is DataProtectionModel:
+                            records += self._delete_logs(session, model.user_id.in_(chunk))[1]
+                        else:
+                            session.execute(delete(model).where(model.user_id.in_(chunk)))
+                self._add_audit_records(session, records)
+                session.commit()
+                self._extend_audit(records)
+
+            if self.keyring is not None:
+                self.keyring.evict(user_ids)
+            if self.token_vault is not None:
+                self.token_vault.forget_users(user_ids)
+
+            consents = self.gdpr_manager.consent_manager.store
+            for user_id in user_ids:
+                consents.delete_user(user_id)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _save_erasure_job(self, job: ErasureJob):
+        session = self.SessionLocal()
+
+        try:
+            # The user id list is written once; checkpoints only move the cursor
+            updated = session.query(ErasureJobModel).filter_by(job_id=job.job_id).update({
+                'next_index': job.next_index,
+                'status': job.status,
+                'error': job.error,
+                'updated_at': job.updated_at
+            })
+            if not updated:
+                session.add(ErasureJobModel(
+                    job_id=job.job_id,
+                    user_ids=job.user_ids,
+                    chunk_size=job.chunk_size,
+                    next_index=job.next_index,
+                    status=job.status,
+                    error=job.error,
+                    updated_at=job.updated_at
+                ))
+            session.commit()
+        finally:
+            session.close()
@@ -0,0 +1,112 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from functools import partial
+from typing import Callable, Dict, List, Any, Iterable, Iterator, Optional, Tuple
+
+from src.anonymization import anonymize_record, chunked
+
+DEFAULT_BATCH_SIZE = 1000
+
+def _anonymize_users(
+    items: List[Tuple[str, Optional[Dict[str, Any]]]],
+    anonymize: Callable[[Dict[str, Any]], Dict[str, Any]] = anonymize_record
+) -> List[Dict[str, Any]]:
+    results = []
+    for user_id, user_data in items:
+        if user_data is None:
+            results.append({
+                'user_id': user_id,
+                'status': 'not_found',
+                'message': 'No personal data found for user'
+            })
+            continue
+
+        try:
+            results.append({
+                'user_id': user_id,
+                'status': 'success',
+                'data': anonymize(user_data),
+                'timestamp': datetime.utcnow()
+            })
+        except Exception as e:
+            logging.error(f"Data Access Request Error: {e}")
+            results.append({
+                'user_id': user_id,
+                'status': 'error',
+                'message': 'Unable to process data access request'
+            })
+    return results
+
+def _fetch(fetch_batch, user_ids: List[str], tokenize=None) -> List[Tuple[str, Optional[Dict[str, Any]]]]:
+    found = fetch_batch(user_ids)
+    if tokenize is not None and found:
+        # One call for the whole batch, in this process
+        found = dict(zip(found, tokenize(list(found.values()), list(found))))
+    return [(user_id, found.get(user_id)) for user_id in user_ids]
+
+def process_access_requests(
+    user_ids: Iterable[str],
+    fetch_batch: Callable[[List[str]], Dict[str, Dict[str, Any]]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_workers: Optional[int] = None,
+    anonymize: Callable[[Dict[str, Any]], Dict[str, Any]] = anonymize_record,
+    tokenize: Optional[Callable[[List[Dict[str, Any]], List[str]], List[Dict[str, Any]]]] = None
+) -> Iterator[Dict[str, Any]]:
+    # Bulk data subject access requests. User data is fetched one batch
+    # at a time through fetch_batch (one query per batch), anonymized in
+    # a process pool, and yielded per user as soon as its batch finishes.
+    # Only a few batches are in flight, so memory stays bounded.
+    # anonymize must be picklable (a module-level function or a partial).
+    # tokenize(records, user_ids), e.g. TokenVault.tokenize_records, runs
+    # in this process on each fetched batch before anonymize.
+    batches = chunked(dict.fromkeys(user_ids), batch_size)
+
+    if not max_workers or max_workers <= 1:
+        for batch in batches:
+            try:
+                items = _fetch(fetch_batch, batch, tokenize)
+            except Exception as e:
+                logging.error(f"Data Access Request Fetch Error: {e}")
+                yield from _failed(batch)
+                continue
+            yield from _anonymize_users(items, anonymize)
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+        for batch in batches:
+            try:
+                items = _fetch(fetch_batch, batch, tokenize)
+            except Exception as e:
+                logging.error(f"Data Access Request Fetch Error: {e}")
+                yield from _failed(batch)
+                continue
+
+            pending[executor.submit(partial(_anonymize_users, anonymize=anonymize), items)] = batch
+            if len(pending) >= max_workers * 2:
+                yield from _drain(pending)
+
+        while pending:
+            yield from _drain(pending)
+
+def _drain(pending) -> Iterator[Dict[str, Any]]:
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        batch = pending.pop(future)
+        try:
+            results = future.result()
+        except Exception as e:
+            logging.error(f"Data Access Request Worker Error: {e}")
+            results = _failed(batch)
+        yield from results
+
+def _failed(user_ids: List[str]) -> List[Dict[str, Any]]:
+    return [
+        {
+            'user_id': user_id,
+            'status': 'error',
+            'message': 'Unable to process data access request'
+        }
+        for user_id in user_ids
+    ]
@@ -0,0 +1,104 @@
+import logging
+import threading
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Any, Iterable, Optional
+
+DEFAULT_CHUNK_SIZE = 500
+
+class ErasureJob:
+    # Background right-to-be-forgotten job for many users. Users are erased
+    # chunk by chunk through erase_chunk, each chunk in its own transaction,
+    # so the store is only held for one chunk at a time. next_index is
+    # checkpointed after every chunk; a cancelled, failed or interrupted job
+    # picks up from there. erase_chunk must be idempotent.
+    def __init__(
+        self,
+        user_ids: Iterable[str],
+        erase_chunk: Callable[[List[str]], None],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        job_id: Optional[str] = None,
+        next_index: int = 0,
+        status: str = 'pending',
+        on_checkpoint: Optional[Callable[['ErasureJob'], None]] = None
+    ):
+        self.job_id = job_id or str(uuid.uuid4())
+        self.user_ids = list(dict.fromkeys(user_ids))
+        self.erase_chunk = erase_chunk
+        self.chunk_size = chunk_size
+        self.next_index = next_index
+        self.status = status
+        self.error = None
+        self.updated_at = datetime.utcnow()
+        self.on_checkpoint = on_checkpoint
+
+        self._cancel = threading.Event()
+        self._thread = None
+
+    @property
+    def total(self) -> int:
+        return len(self.user_ids)
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status == 'completed'
+
+    def start(self) -> 'ErasureJob':
+        if self._thread is not None and self._thread.is_alive():
+            return self
+
+        self._cancel.clear()
+        self._thread = threading.Thread(target=self.run, name=f"erasure-{self.job_id}", daemon=True)
+        self._thread.start()
+        return self
+
+    def run(self):
+        if self.is_finished:
+            return
+
+        self.status = 'running'
+        self.error = None
+        self._checkpoint()
+
+        try:
+            while self.next_index < self.total:
+                if self._cancel.is_set():
+                    self.status = 'cancelled'
+                    break
+
+                chunk = self.user_ids[self.next_index:self.next_index + self.chunk_size]
+                self.erase_chunk(chunk)
+                self.next_index += len(chunk)
+                self._checkpoint()
+            else:
+                self.status = 'completed'
+        except Exception as e:
+            logging.error(f"Bulk Erasure Error: {e}")
+            self.status = 'failed'
+            self.error = str(e)
+
+        self._checkpoint()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return not (self._thread is not None and self._thread.is_alive())
+
+    def progress(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'erased': self.next_index,
+            'total': self.total,
+            'fraction': self.next_index / self.total if self.total else 1.0,
+            'error': self.error,
+            'updated_at': self.updated_at
+        }
+
+    def _checkpoint(self):
+        self.updated_at = datetime.utcnow()
+        if self.on_checkpoint is not None:
+            self.on_checkpoint(self)
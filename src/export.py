@@ -0,0 +1,162 @@
+import csv
+import json
+import os
+import zipfile
+from datetime import datetime
+from typing import Dict, List, Any, Callable, Iterable, Optional
+
+EXPORT_COLUMNS = ['id', 'user_id', 'activity_type', 'timestamp', 'data_processed', 'is_consent_given', 'retention_period']
+EXPORT_FORMATS = ('csv', 'jsonl', 'parquet')
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def _format_timestamp(value):
+    return value.strftime(TIMESTAMP_FORMAT) if value is not None else None
+
+def _write_csv(chunks: Iterable[List[Dict[str, Any]]], path: str) -> int:
+    rows = 0
+    with open(path, 'w', newline='', encoding='utf-8') as export_file:
+        writer = csv.writer(export_file)
+        writer.writerow(EXPORT_COLUMNS)
+        for chunk in chunks:
+            writer.writerows(
+                [
+                    log['id'],
+                    log['user_id'],
+                    log['activity_type'],
+                    _format_timestamp(log['timestamp']),
+                    json.dumps(log['data_processed'], default=_json_default),
+                    log['is_consent_given'],
+                    _format_timestamp(log['retention_period'])
+                ]
+                for log in chunk
+            )
+            rows += len(chunk)
+    return rows
+
+def _write_jsonl(chunks: Iterable[List[Dict[str, Any]]], path: str) -> int:
+    rows = 0
+    with open(path, 'w', encoding='utf-8') as export_file:
+        for chunk in chunks:
+            export_file.writelines(
+                json.dumps({column: log[column] for column in EXPORT_COLUMNS}, default=_json_default) + "\n"
+                for log in chunk
+            )
+            rows += len(chunk)
+    return rows
+
+def _write_parquet(chunks: Iterable[List[Dict[str, Any]]], path: str) -> int:
+    # pyarrow is optional and only needed for Parquet exports
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+
+    schema = pa.schema([
+        ('id', pa.string()),
+        ('user_id', pa.string()),
+        ('activity_type', pa.string()),
+        ('timestamp', pa.timestamp('us')),
+        ('data_processed', pa.string()),
+        ('is_consent_given', pa.bool_()),
+        ('retention_period', pa.timestamp('us'))
+    ])
+
+    rows = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            columns = {column: [log[column] for log in chunk] for column in EXPORT_COLUMNS}
+            columns['data_processed'] = [json.dumps(value, default=_json_default) for value in columns['data_processed']]
+            # One row group per chunk keeps memory bounded by the chunk size
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+            rows += len(chunk)
+    return rows
+
+WRITERS = {
+    'csv': _write_csv,
+    'jsonl': _write_jsonl,
+    'parquet': _write_parquet
+}
+
+def export_logs(chunks: Iterable[List[Dict[str, Any]]], path: str, fmt: Optional[str] = None) -> int:
+    # Writes log entries chunk by chunk and returns the number of rows.
+    # Nothing beyond the current chunk is held in memory.
+    fmt = fmt or os.path.splitext(path)[1].lstrip('.').lower()
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # Write next to the target and rename, so a failed export never
+    # leaves a truncated file behind under the final name
+    partial_path = path + ".part"
+    try:
+        rows = WRITERS[fmt](chunks, partial_path)
+    except Exception:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    os.replace(partial_path, path)
+    return rows
+
+def _write_jsonl_member(bundle: zipfile.ZipFile, name: str, chunks: Iterable[List[Dict[str, Any]]], progress=None) -> int:
+    # Streams into the archive; zip64 because the size is not known up front
+    rows = 0
+    with bundle.open(name, 'w', force_zip64=True) as member:
+        for chunk in chunks:
+            member.write("".join(json.dumps(record, default=_json_default) + "\n" for record in chunk).encode('utf-8'))
+            rows += len(chunk)
+            if progress is not None:
+                progress(rows)
+    return rows
+
+def export_dsar_bundle(
+    path: str,
+    user_id: str,
+    profile: Optional[Dict[str, Any]],
+    consents: Iterable[Dict[str, Any]],
+    log_chunks: Iterable[List[Dict[str, Any]]],
+    progress: Optional[Callable[[int], None]] = None
+) -> Dict[str, int]:
+    # Complete access request response as one compressed ZIP: profile.json,
+    # consents.jsonl, logs.jsonl and manifest.json with the row counts.
+    # Logs are compressed chunk by chunk, so memory stays bounded by one
+    # chunk however many entries the user has. progress(logs_written) is
+    # called after each chunk.
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    partial_path = path + ".part"
+    try:
+        with zipfile.ZipFile(partial_path, 'w', compression=zipfile.ZIP_DEFLATED) as bundle:
+            bundle.writestr('profile.json', json.dumps(profile, default=_json_default, indent=2))
+            consent_count = _write_jsonl_member(bundle, 'consents.jsonl', ([consent] for consent in consents))
+            log_count = _write_jsonl_member(
+                bundle,
+                'logs.jsonl',
+                ([{column: log[column] for column in EXPORT_COLUMNS} for log in chunk] for chunk in log_chunks),
+                progress
+            )
+            counts = {'consents': consent_count, 'logs': log_count}
+            bundle.writestr('manifest.json', json.dumps({
+                'user_id': user_id,
+                'generated_at': datetime.utcnow(),
+                'profile': profile is not None,
+                **counts
+            }, default=_json_default, indent=2))
+    except Exception:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    os.replace(partial_path, path)
+    return counts
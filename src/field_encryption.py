@@ -0,0 +1,149 @@
+import base64
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Callable, Optional
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.keywrap import aes_key_wrap, aes_key_unwrap
+
+# Encrypted fields are stored as {ENVELOPE_FIELD: "<data key id>:<base64(nonce | ciphertext)>"}
+ENVELOPE_FIELD = '__envelope__'
+NONCE_SIZE = 12
+KEY_BYTES = 32
+PARALLEL_THRESHOLD = 4096
+PARALLEL_CHUNK_SIZE = 1024
+
+def is_envelope(value) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and ENVELOPE_FIELD in value
+
+def envelope_key_id(value) -> Optional[str]:
+    return value[ENVELOPE_FIELD].split(':', 1)[0] if is_envelope(value) else None
+
+def load_master_key(config: Dict[str, Any]) -> Optional[bytes]:
+    # Master key as urlsafe base64, from the environment or a key file
+    settings = config.get('encryption', {})
+    encoded = os.environ.get(settings.get('master_key_env') or 'GDPR_MASTER_KEY')
+    if not encoded and settings.get('master_key_file'):
+        with open(settings['master_key_file']) as key_file:
+            encoded = key_file.read().strip()
+    if not encoded:
+        return None
+
+    master_key = base64.urlsafe_b64decode(encoded)
+    if len(master_key) != KEY_BYTES:
+        raise ValueError("Master key must be 32 bytes")
+    return master_key
+
+def generate_master_key() -> str:
+    return base64.urlsafe_b64encode(os.urandom(KEY_BYTES)).decode('ascii')
+
+class EnvelopeCipher:
+    # Field-level encryption with envelope keys. Values are encrypted with
+    # AES-256-GCM under a data key; data keys are only ever stored wrapped
+    # (RFC 3394) by the master key. The newest data key encrypts, older ones
+    # stay available for reading until their rows are re-encrypted.
+    #
+    # wrapped_keys maps data key id -> wrapped key, oldest first. save_keys
+    # is called with every key that is created or re-wrapped so the caller
+    # can persist it.
+    def __init__(
+        self,
+        master_key: bytes,
+        wrapped_keys: Optional[Dict[str, bytes]] = None,
+        save_keys: Optional[Callable[[Dict[str, bytes]], None]] = None,
+        max_workers: Optional[int] = None,
+        parallel_threshold: int = PARALLEL_THRESHOLD
+    ):
+        self._master_key = master_key
+        self._wrapped: Dict[str, bytes] = dict(wrapped_keys or {})
+        self._ciphers: Dict[str, AESGCM] = {}
+        self.save_keys = save_keys
+        self.max_workers = max_workers if max_workers is not None else min(4, os.cpu_count() or 1)
+        self.parallel_threshold = parallel_threshold
+        self._executor = None
+        self._lock = threading.Lock()
+
+        for key_id, wrapped in self._wrapped.items():
+            self._ciphers[key_id] = AESGCM(aes_key_unwrap(master_key, wrapped))
+        self.active_key_id = next(reversed(self._wrapped), None)
+        if self.active_key_id is None:
+            self.rotate()
+
+    @property
+    def key_ids(self) -> List[str]:
+        return list(self._wrapped)
+
+    def rotate(self) -> str:
+        # New data key for all future writes. Wrapping, saving and the state
+        # update happen under one lock so a concurrent rewrap cannot leave a
+        # key wrapped by the old master key
+        key_id = uuid.uuid4().hex
+        data_key = AESGCM.generate_key(bit_length=KEY_BYTES * 8)
+
+        with self._lock:
+            wrapped = aes_key_wrap(self._master_key, data_key)
+            if self.save_keys is not None:
+                self.save_keys({key_id: wrapped})
+            self._wrapped[key_id] = wrapped
+            self._ciphers[key_id] = AESGCM(data_key)
+            self.active_key_id = key_id
+        return key_id
+
+    def rewrap(self, new_master_key: bytes) -> int:
+        # Master key rotation: data keys are re-wrapped, payloads untouched
+        with self._lock:
+            rewrapped = {
+                key_id: aes_key_wrap(new_master_key, aes_key_unwrap(self._master_key, wrapped))
+                for key_id, wrapped in self._wrapped.items()
+            }
+            if self.save_keys is not None:
+                self.save_keys(rewrapped)
+            self._wrapped.update(rewrapped)
+            self._master_key = new_master_key
+        return len(rewrapped)
+
+    def encrypt(self, value: Any) -> Dict[str, str]:
+        key_id = self.active_key_id
+        nonce = os.urandom(NONCE_SIZE)
+        plaintext = json.dumps(value, separators=(',', ':'), default=str).encode('utf-8')
+        ciphertext = self._ciphers[key_id].encrypt(nonce, plaintext, key_id.encode('ascii'))
+        return {ENVELOPE_FIELD: f"{key_id}:{base64.b64encode(nonce + ciphertext).decode('ascii')}"}
+
+    def decrypt(self, value: Any) -> Any:
+        # Values written before encryption was enabled pass through
+        if not is_envelope(value):
+            return value
+        key_id, encoded = value[ENVELOPE_FIELD].split(':', 1)
+        raw = base64.b64decode(encoded)
+        plaintext = self._ciphers[key_id].decrypt(raw[:NONCE_SIZE], raw[NONCE_SIZE:], key_id.encode('ascii'))
+        return json.loads(plaintext)
+
+    def encrypt_many(self, values: List[Any]) -> List[Dict[str, str]]:
+        return self._map(self.encrypt, values)
+
+    def decrypt_many(self, values: List[Any]) -> List[Any]:
+        return self._map(self.decrypt, values)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _map(self, func, values):
+        # Large batches are split over a thread pool; small ones are not
+        # worth the hand-off
+        values = list(values)
+        if len(values) < self.parallel_threshold or self.max_workers <= 1:
+            return [func(value) for value in values]
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="gdpr-field-crypto")
+        chunks = [values[start:start + PARALLEL_CHUNK_SIZE] for start in range(0, len(values), PARALLEL_CHUNK_SIZE)]
+        results = []
+        for chunk in self._executor.map(lambda chunk: [func(value) for value in chunk], chunks):
+            results.extend(chunk)
+        return results
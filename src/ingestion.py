@@ -0,0 +1,274 @@
+import argparse
+import asyncio
+import json
+import logging
+import signal
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Callable, Mapping, FrozenSet, Optional
+
+from src.config import load_config
+from src.minimization import NO_FIELDS, load_policies, minimize_record
+
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 0.05
+
+# Put on the queue by stop(); everything queued before it is still written
+_STOP = object()
+
+class IngestionPipeline:
+    # Bounded asyncio queue in front of a processing log backend. Producers
+    # await submit(), which waits while the queue is full, so a fast
+    # producer is slowed to the write rate instead of growing memory. One
+    # consumer drains the queue in batches (batch_size events, or whatever
+    # arrived within flush_interval seconds), applies minimization and
+    # consent lookup per event, and hands the batch to the sink's
+    # log_data_processing_activities in a worker thread. The event loop
+    # keeps accepting events while a batch is written; batches are
+    # written one at a time, in arrival order.
+    #
+    # Events are dicts with user_id, activity_type and data (or
+    # data_processed); purpose selects the minimization policy and
+    # defaults to the activity type. Data for a purpose without a policy
+    # is dropped, never logged whole.
+    def __init__(
+        self,
+        sink,
+        policies: Optional[Mapping[str, FrozenSet[str]]] = None,
+        check_consents: Optional[Callable[[List[str]], List[bool]]] = None,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL
+    ):
+        self.sink = sink
+        self.policies = policies if policies is not None else load_policies()
+        if check_consents is None and hasattr(sink, 'gdpr_manager'):
+            check_consents = sink.gdpr_manager.consent_manager.check_consents
+        self.check_consents = check_consents
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stats = {'received': 0, 'written': 0, 'rejected': 0, 'failed': 0, 'batches': 0}
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._consumer = None
+        self._executor = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.stop()
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gdpr-ingestion")
+        self._consumer = asyncio.create_task(self._run())
+        return self
+
+    async def submit(self, event: Dict[str, Any]):
+        # Waits while the queue is full
+        self.stats['received'] += 1
+        await self._queue.put(event)
+
+    def submit_nowait(self, event: Dict[str, Any]) -> bool:
+        # For producers that would rather shed load than wait
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            return False
+        self.stats['received'] += 1
+        return True
+
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def join(self):
+        # Until every submitted event has been written (or rejected)
+        await self._queue.join()
+
+    async def stop(self):
+        if self._consumer is None:
+            return
+        await self._queue.put(_STOP)
+        await self._consumer
+        self._consumer = None
+        self._executor.shutdown()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        stopping = False
+
+        while not stopping:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not _STOP:
+                try:
+                    batch.append(queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+            if batch[-1] is _STOP:
+                stopping = True
+                events = batch[:-1]
+            else:
+                events = batch
+            try:
+                if events:
+                    await loop.run_in_executor(self._executor, self._write, events)
+            except Exception as e:
+                # A batch that cannot be written must not stop the consumer,
+                # or producers would wait on a full queue forever
+                logging.error(f"Ingestion Batch Error: {e}")
+                self.stats['failed'] += len(events)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    def _write(self, events: List[Dict[str, Any]]):
+        # Runs in the worker thread
+        prepared = []
+        for event in events:
+            entry = self._prepare(event)
+            if entry is None:
+                self.stats['rejected'] += 1
+            else:
+                prepared.append(entry)
+        if not prepared:
+            return
+
+        try:
+            if self.check_consents is not None:
+                consents = self.check_consents([entry['user_id'] for entry in prepared])
+                for entry, consent_given in zip(prepared, consents):
+                    entry['consent_given'] = consent_given
+            written = self.sink.log_data_processing_activities(prepared)
+        except Exception as e:
+            logging.error(f"Ingestion Write Error: {e}")
+            written = None
+
+        # A sharded sink may write only part of a batch
+        written = len(written) if written is not None else 0
+        self.stats['batches'] += 1
+        self.stats['written'] += written
+        self.stats['failed'] += len(prepared) - written
+
+    def _prepare(self, event) -> Optional[Dict[str, Any]]:
+        # The event as logged, or None when it cannot be accepted
+        if not isinstance(event, dict) or not event.get('user_id') or not event.get('activity_type'):
+            logging.warning(f"Ingestion rejected an event without user_id or activity_type")
+            return None
+
+        data = event.get('data', event.get('data_processed')) or {}
+        if not isinstance(data, dict):
+            logging.warning(f"Ingestion rejected an event whose data is not an object")
+            return None
+        purpose = event.get('purpose') or event['activity_type']
+        if 'purpose' in event and purpose not in self.policies:
+            logging.warning(f"Ingestion rejected an event for unknown purpose {purpose}")
+            return None
+        # An activity type without a policy keeps no fields, as in the app
+        data = minimize_record(self.policies.get(purpose, NO_FIELDS), data)
+
+        return {
+            'user_id': str(event['user_id']),
+            'activity_type': str(event['activity_type']),
+            'data_processed': data
+        }
+
+async def ingest_lines(pipeline: IngestionPipeline, reader: asyncio.StreamReader) -> int:
+    # One JSON event per line; reading pauses while the pipeline is full,
+    # which pushes back on the sender
+    count = 0
+    while True:
+        line = await reader.readline()
+        if not line:
+            return count
+        if not line.strip():
+            continue
+        try:
+            event = json.loads(line)
+        except ValueError:
+            pipeline.stats['rejected'] += 1
+            logging.warning("Ingestion rejected a line that is not valid JSON")
+            continue
+        await pipeline.submit(event)
+        count += 1
+
+async def serve(pipeline: IngestionPipeline, host: str, port: int, stop: asyncio.Event):
+    # Newline-delimited JSON over TCP until stop is set
+    async def handle(reader, writer):
+        try:
+            await ingest_lines(pipeline, reader)
+        except Exception as e:
+            logging.error(f"Ingestion Connection Error: {e}")
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logging.info(f"Ingesting processing events on {host}:{port}")
+    async with server:
+        await stop.wait()
+
+async def _run_worker(args, config):
+    # Imported here so the pipeline itself does not pull in SQLAlchemy
+    from src.data_protection import EncryptoDataProtectionEngine
+    from src.sharding import ShardedDataProtectionEngine
+
+    settings = config['ingestion']
+    if args.shards:
+        engine = ShardedDataProtectionEngine(args.database_url, shards=args.shards)
+    else:
+        engine = EncryptoDataProtectionEngine(args.database_url or config['database']['url'])
+    pipeline = IngestionPipeline(
+        engine,
+        policies=load_policies(config),
+        queue_size=int(settings['queue_size']),
+        batch_size=int(settings['batch_size']),
+        flush_interval=float(settings['flush_interval_ms']) / 1000
+    )
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    try:
+        async with pipeline:
+            if args.stdin:
+                reader = asyncio.StreamReader()
+                await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+                await ingest_lines(pipeline, reader)
+            else:
+                await serve(pipeline, args.host or settings['host'], args.port or int(settings['port']), stop)
+    finally:
+        engine.close()
+    logging.info(f"Ingestion stopped: {pipeline.stats}")
+    return pipeline.stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write processing activity events (one JSON object per line) to the processing log")
+    parser.add_argument("--database-url", help="defaults to database.url from the config (sharding.database_url with --shards)")
+    parser.add_argument("--shards", type=int, help="write through a sharded engine with this many worker processes")
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--stdin", action="store_true", help="read events from standard input instead of a TCP socket")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_run_worker(args, load_config()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+from src.retention import ExpiryIndex
+
+class IndexedLogStore:
+    # In-memory processing log with secondary indexes, so per-user lookups,
+    # erasure and activity filtering only touch the matching entries.
+    def __init__(self):
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_user: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._by_activity: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._expiry = ExpiryIndex()
+        # (timestamp, log id) pairs in time order. Deleted entries are left
+        # in place and skipped until enough pile up to rebuild the list.
+        self._timeline: List[Tuple[datetime, str]] = []
+        self._activity_timelines: Dict[str, List[Tuple[datetime, str]]] = {}
+        self._user_timelines: Dict[str, List[Tuple[datetime, str]]] = {}
+        self._timeline_dead = 0
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __iter__(self):
+        return iter(self._by_id.values())
+
+    def append(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        log_id = entry['id']
+        if log_id in self._by_id:
+            self.delete(log_id)
+
+        self._by_id[log_id] = entry
+        self._by_user.setdefault(entry['user_id'], {})[log_id] = entry
+        self._by_activity.setdefault(entry['activity_type'], {})[log_id] = entry
+        if entry.get('retention_period') is not None:
+            self._expiry.add(log_id, entry['retention_period'])
+
+        key = (entry['timestamp'], log_id)
+        self._insert_key(self._timeline, key)
+        self._insert_key(self._activity_timelines.setdefault(entry['activity_type'], []), key)
+        self._insert_key(self._user_timelines.setdefault(entry['user_id'], []), key)
+        return entry
+
+    def extend(self, entries: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [self.append(entry) for entry in entries]
+
+    def get(self, log_id: str) -> Optional[Dict[str, Any]]:
+        return self._by_id.get(log_id)
+
+    def query(self, user_id: Optional[str] = None, activity_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        if user_id is None and activity_type is None:
+            return list(self._by_id.values())
+
+        if user_id is None:
+            return list(self._by_activity.get(activity_type, {}).values())
+
+        user_entries = self._by_user.get(user_id, {})
+        if activity_type is None:
+            return list(user_entries.values())
+
+        # Walk whichever bucket is smaller
+        activity_entries = self._by_activity.get(activity_type, {})
+        if len(user_entries) <= len(activity_entries):
+            return [log for log in user_entries.values() if log['activity_type'] == activity_type]
+        return [log for log in activity_entries.values() if log['user_id'] == user_id]
+
+    def activity_types(self) -> List[str]:
+        # Buckets are dropped as soon as they empty, so the keys are exactly
+        # the distinct activity types currently in the log
+        return list(self._by_activity)
+
+    def user_ids(self) -> List[str]:
+        return list(self._by_user)
+
+    def count_user_logs(self, user_id: str) -> int:
+        return len(self._by_user.get(user_id, ()))
+
+    def delete(self, log_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._by_id.pop(log_id, None)
+        if entry is None:
+            return None
+
+        self._discard(self._by_user, entry['user_id'], log_id)
+        if entry['user_id'] not in self._by_user:
+            self._user_timelines.pop(entry['user_id'], None)
+        self._discard(self._by_activity, entry['activity_type'], log_id)
+        if entry.get('retention_period') is not None:
+            self._expiry.discard(log_id, entry['retention_period'])
+        self._timeline_dead += 1
+        self._maybe_rebuild_timeline()
+        return entry
+
+    def delete_user(self, user_id: str) -> List[Dict[str, Any]]:
+        entries = self._by_user.pop(user_id, None)
+        self._user_timelines.pop(user_id, None)
+        if not entries:
+            return []
+
+        for log_id, entry in entries.items():
+            del self._by_id[log_id]
+            self._discard(self._by_activity, entry['activity_type'], log_id)
+            if entry.get('retention_period') is not None:
+                self._expiry.discard(log_id, entry['retention_period'])
+        self._timeline_dead += len(entries)
+        self._maybe_rebuild_timeline()
+        return list(entries.values())
+
+    def purge_expired(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        now = now or datetime.utcnow()
+        return [self.delete(log_id) for log_id in self._expiry.pop_expired(now)]
+
+    def pending_expiries(self):
+        return self._expiry.pending_by_day()
+
+    def scan(
+        self,
+        cursor: Optional[Tuple[datetime, str]] = None,
+        limit: int = 1000,
+        user_id: Optional[str] = None,
+        activity_type: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        reverse: bool = False
+    ) -> Tuple[List[Dict[str, Any]], Optional[Tuple[datetime, str]]]:
+        # Up to limit entries in time order (newest first when reverse) with
+        # start <= timestamp < end, resuming after cursor. Returns the entries
+        # and the cursor for the next call, or None once the scan is
+        # exhausted. Cursors are (timestamp, log id) values, so they stay
+        # valid across writes.
+        if user_id is not None:
+            timeline = self._user_timelines.get(user_id, [])
+        elif activity_type is not None:
+            timeline = self._activity_timelines.get(activity_type, [])
+        else:
+            timeline = self._timeline
+
+        if reverse:
+            if cursor is not None:
+                position = bisect_left(timeline, cursor) - 1
+            elif end is not None:
+                position = bisect_left(timeline, (end,)) - 1
+            else:
+                position = len(timeline) - 1
+            step = -1
+        else:
+            if cursor is not None:
+                position = bisect_right(timeline, cursor)
+            elif start is not None:
+                position = bisect_left(timeline, (start,))
+            else:
+                position = 0
+            step = 1
+
+        results = []
+        previous = None
+        while 0 <= position < len(timeline) and len(results) < limit:
+            key = timeline[position]
+            position += step
+
+            timestamp, log_id = key
+            if end is not None and timestamp >= end:
+                if reverse:
+                    continue
+                return results, None
+            if start is not None and timestamp < start:
+                if reverse:
+                    return results, None
+                continue
+
+            # Re-appending an id with an unchanged timestamp leaves a
+            # duplicate key next to the live one
+            if key == previous:
+                continue
+            previous = key
+
+            entry = self._by_id.get(log_id)
+            if entry is None or entry['timestamp'] != timestamp:
+                continue
+            if activity_type is not None and entry['activity_type'] != activity_type:
+                continue
+            if user_id is not None and entry['user_id'] != user_id:
+                continue
+            results.append(entry)
+
+        if not 0 <= position < len(timeline):
+            return results, None
+        return results, (results[-1]['timestamp'], results[-1]['id'])
+
+    def _maybe_rebuild_timeline(self):
+        if self._timeline_dead > 1024 and self._timeline_dead > len(self._by_id):
+            self._timeline = sorted((log['timestamp'], log['id']) for log in self._by_id.values())
+            self._activity_timelines = {}
+            self._user_timelines = {}
+            for key in self._timeline:
+                entry = self._by_id[key[1]]
+                self._activity_timelines.setdefault(entry['activity_type'], []).append(key)
+                self._user_timelines.setdefault(entry['user_id'], []).append(key)
+            self._timeline_dead = 0
+
+    @staticmethod
+    def _insert_key(timeline, key):
+        # Entries almost always arrive in time order, so this is an append
+        if not timeline or timeline[-1] <= key:
+            timeline.append(key)
+        else:
+            insort(timeline, key)
+
+    @staticmethod
+    def _discard(index, key, log_id):
+        bucket = index.get(key)
+        if bucket is None:
+            return
+        bucket.pop(log_id, None)
+        if not bucket:
+            del index[key]
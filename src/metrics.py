@@ -0,0 +1,208 @@
+import functools
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+# Latency bucket upper bounds in seconds, Prometheus style
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+METRIC_PREFIX = "gdpr_operation"
+
+class OperationStats:
+    # Call and error counters plus a fixed-bucket latency histogram
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def observe(self, seconds: float, error: bool):
+        self.bucket_counts[bisect_left(self.buckets, seconds)] += 1
+        self.calls += 1
+        self.total_seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+        if error:
+            self.errors += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        # Upper bound of the bucket holding the q-th observation
+        if not self.calls:
+            return None
+        rank = q * self.calls
+        seen = 0
+        for bound, count in zip(self.buckets, self.bucket_counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max_seconds
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'error_rate': self.errors / self.calls if self.calls else 0.0,
+            'mean_seconds': self.total_seconds / self.calls if self.calls else 0.0,
+            'p50_seconds': self.quantile(0.5),
+            'p95_seconds': self.quantile(0.95),
+            'p99_seconds': self.quantile(0.99),
+            'max_seconds': self.max_seconds
+        }
+
+class MetricsRegistry:
+    # Per-operation stats shared by every engine in the process. Hooks are
+    # called with (operation, seconds, error) after each observation.
+    def __init__(self, enabled: bool = True, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(sorted(buckets))
+        self._operations: Dict[str, OperationStats] = {}
+        self._hooks: List[Callable[[str, float, bool], None]] = []
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook: Callable[[str, float, bool], None]):
+        self._hooks.append(hook)
+        return hook
+
+    def remove_hook(self, hook: Callable[[str, float, bool], None]):
+        if hook in self._hooks:
+            self._hooks.remove(hook)
+
+    def observe(self, operation: str, seconds: float, error: bool = False):
+        with self._lock:
+            stats = self._operations.get(operation)
+            if stats is None:
+                stats = self._operations[operation] = OperationStats(self.buckets)
+            stats.observe(seconds, error)
+
+        for hook in self._hooks:
+            try:
+                hook(operation, seconds, error)
+            except Exception as e:
+                logging.error(f"Metrics Hook Error: {e}")
+
+    def reset(self):
+        with self._lock:
+            self._operations.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {operation: stats.summary() for operation, stats in sorted(self._operations.items())}
+
+    def to_prometheus(self) -> str:
+        with self._lock:
+            operations = [
+                (operation, list(stats.bucket_counts), stats.calls, stats.errors, stats.total_seconds)
+                for operation, stats in sorted(self._operations.items())
+            ]
+
+        lines = [
+            f"# HELP {METRIC_PREFIX}_duration_seconds Duration of data protection engine operations.",
+            f"# TYPE {METRIC_PREFIX}_duration_seconds histogram"
+        ]
+        for operation, bucket_counts, calls, errors, total_seconds in operations:
+            cumulative = 0
+            for bound, count in zip(self.buckets, bucket_counts):
+                cumulative += count
+                lines.append(f'{METRIC_PREFIX}_duration_seconds_bucket{{operation="{operation}",le="{bound}"}} {cumulative}')
+            lines.append(f'{METRIC_PREFIX}_duration_seconds_bucket{{operation="{operation}",le="+Inf"}} {calls}')
+            lines.append(f'{METRIC_PREFIX}_duration_seconds_sum{{operation="{operation}"}} {total_seconds}')
+            lines.append(f'{METRIC_PREFIX}_duration_seconds_count{{operation="{operation}"}} {calls}')
+
+        for name, help_text, index in (
+            ('calls_total', 'Data protection engine operation calls.', 2),
+            ('errors_total', 'Data protection engine operations that failed.', 3)
+        ):
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} counter")
+            for row in operations:
+                lines.append(f'{METRIC_PREFIX}_{name}{{operation="{row[0]}"}} {row[index]}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> str:
+        # Written beside the target and renamed, so scrapers never read a
+        # half-written file
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        partial_path = path + ".part"
+        with open(partial_path, 'w', encoding='utf-8') as metrics_file:
+            metrics_file.write(self.to_prometheus())
+        os.replace(partial_path, path)
+        return path
+
+# Process-wide registry used by @instrument
+REGISTRY = MetricsRegistry()
+
+def configure(config: Optional[Dict[str, Any]] = None, registry: Optional[MetricsRegistry] = None) -> MetricsRegistry:
+    registry = registry if registry is not None else REGISTRY
+    settings = (config or {}).get('metrics', {})
+    registry.enabled = bool(settings.get('enabled', True))
+    return registry
+
+def error_status(result) -> bool:
+    # Engine methods report failures as {'status': 'error', ...}
+    return isinstance(result, dict) and result.get('status') == 'error'
+
+def instrument(operation: str, failed: Callable[[Any], bool] = error_status, registry: Optional[MetricsRegistry] = None):
+    # Times each call and counts raised exceptions and failed results. When
+    # the registry is disabled the only cost is one attribute check.
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            metrics = registry if registry is not None else REGISTRY
+            if not metrics.enabled:
+                return func(*args, **kwargs)
+
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                metrics.observe(operation, time.perf_counter() - start, error=True)
+                raise
+            metrics.observe(operation, time.perf_counter() - start, error=failed(result))
+            return result
+        return wrapper
+    return decorate
+
+class PrometheusFileExporter:
+    # Rewrites the Prometheus text file every interval seconds, for a
+    # node_exporter textfile collector or any other file-based scraper
+    def __init__(self, path: str, interval: float = 15.0, registry: Optional[MetricsRegistry] = None):
+        self.path = path
+        self.interval = interval
+        self.registry = registry if registry is not None else REGISTRY
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> 'PrometheusFileExporter':
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="gdpr-metrics-exporter", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.export()
+
+    def export(self) -> Optional[str]:
+        try:
+            return self.registry.write_prometheus(self.path)
+        except Exception as e:
+            logging.error(f"Metrics Export Error: {e}")
+            return None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.export()
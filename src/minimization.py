@@ -0,0 +1,46 @@
+from types import MappingProxyType
+from typing import Dict, List, Any, FrozenSet, Iterable, Iterator, Mapping, Optional
+
+import pandas as pd
+
+DEFAULT_MINIMIZATION_RULES = {
+    'authentication': ['username', 'email'],
+    'transaction_processing': ['user_id', 'transaction_details'],
+    'fraud_prevention': ['user_id', 'transaction_history'],
+    'customer_support': ['user_id', 'contact_information']
+}
+
+NO_FIELDS: FrozenSet[str] = frozenset()
+
+def compile_policies(rules: Mapping[str, Iterable[str]]) -> Mapping[str, FrozenSet[str]]:
+    # Read-only purpose -> allowed field set mapping, built once per process
+    return MappingProxyType({purpose: frozenset(fields) for purpose, fields in rules.items()})
+
+def load_policies(config: Optional[Dict[str, Any]] = None) -> Mapping[str, FrozenSet[str]]:
+    rules = None
+    if config is not None:
+        rules = config.get('gdpr', {}).get('minimization_rules')
+    return compile_policies(rules or DEFAULT_MINIMIZATION_RULES)
+
+def minimize_record(allowed_fields: FrozenSet[str], data: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in data.items() if k in allowed_fields}
+
+def minimize_records(allowed_fields: FrozenSet[str], records: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    # Records in a batch usually share one shape, so the kept keys are
+    # worked out once per shape instead of testing every field of every record
+    last_keys = None
+    kept = ()
+    for record in records:
+        keys = record.keys()
+        if keys != last_keys:
+            last_keys = keys
+            kept = tuple(k for k in record if k in allowed_fields)
+        yield {k: record[k] for k in kept}
+
+def minimize_dataframe(allowed_fields: FrozenSet[str], df: pd.DataFrame) -> pd.DataFrame:
+    return df[[column for column in df.columns if column in allowed_fields]]
+
+def minimize_batch(allowed_fields: FrozenSet[str], records):
+    if isinstance(records, pd.DataFrame):
+        return minimize_dataframe(allowed_fields, records)
+    return list(minimize_records(allowed_fields, records))
@@ -0,0 +1,254 @@
+import re
+from functools import partial
+from typing import Dict, List, Any, Iterable, Iterator, Mapping, Optional, Tuple
+
+import pandas as pd
+
+from src.anonymization import DEFAULT_CHUNK_SIZE, anonymize_dataframe, anonymize_record, chunked, _map_chunks, _resolve_workers
+
+REDACTED = '[REDACTED]'
+
+# Detected in any string value, wherever it is nested. Order matters: the
+# first alternative that matches at a position wins.
+DEFAULT_PATTERNS = {
+    'email': r"[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}",
+    'card': r"(?<![\w.])\d(?:[ -]?\d){12,18}(?!\w|\.\d)",
+    'iban': r"(?<!\w)[A-Z]{2}\d{2}(?: ?[A-Z0-9]{4}){2,7}(?: ?[A-Z0-9]{1,3})?(?!\w)",
+    'ipv4': r"(?<![\w.])(?:(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)\.){3}(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)(?!\w|\.\d)",
+    'ipv6': r"(?<![\w:])(?:(?:[0-9A-Fa-f]{1,4}:){7}[0-9A-Fa-f]{1,4}|(?:[0-9A-Fa-f]{1,4}:){1,7}:(?:[0-9A-Fa-f]{1,4}(?::[0-9A-Fa-f]{1,4}){0,6})?)(?!\w|\.\d)",
+    'phone': r"(?<![\w+])(?:\+\d{1,3}[ .-]?)?(?:\(\d{3}\)|\d{3})[ .-]?\d{3}[ .-]?\d{4}(?!\w)"
+}
+
+# Values under these keys are redacted whole, whatever they contain
+DEFAULT_SENSITIVE_KEYS = (
+    'username', 'user_name', 'login', 'name', 'first_name', 'last_name', 'full_name', 'surname',
+    'email', 'email_address', 'phone', 'phone_number', 'mobile', 'address', 'street', 'postal_address',
+    'ip', 'ip_address', 'password', 'passwd', 'secret', 'token', 'ssn', 'national_id', 'passport',
+    'passport_number', 'date_of_birth', 'dob', 'birth_date', 'card_number', 'credit_card', 'iban'
+)
+
+# Character each pattern needs somewhere in the string. Strings are only
+# searched with the patterns whose trigger they contain, which spares the
+# backtracking-heavy email pattern on text without an '@'.
+PATTERN_TRIGGERS = {
+    'email': '@',
+    'card': 'digit',
+    'iban': 'digit',
+    'ipv4': 'digit',
+    'ipv6': ':',
+    'phone': 'digit'
+}
+# Characters each pattern can start with; a lookahead on their union lets
+# the search skip positions no pattern could match from
+PATTERN_STARTS = {
+    'email': r"A-Za-z0-9._%+\-",
+    'card': r"\d",
+    'iban': r"A-Z",
+    'ipv4': r"\d",
+    'ipv6': r"0-9A-Fa-f",
+    'phone': r"\d+("
+}
+_TRIGGER = re.compile(r"[@\d:]")
+_DIGIT = re.compile(r"\d")
+
+# Top-level fields anonymize_record already pseudonymizes
+ANONYMIZED_FIELDS = frozenset(['email', 'phone', 'address'])
+
+MAX_KEY_CACHE = 10000
+SMALLEST_CARD = 10 ** 12
+
+def luhn_valid(digits: str) -> bool:
+    total = 0
+    for position, digit in enumerate(reversed(digits)):
+        value = ord(digit) - 48
+        if position % 2:
+            value *= 2
+            if value > 9:
+                value -= 9
+        total += value
+    return total % 10 == 0
+
+class PIIScanner:
+    # Detects and redacts PII in nested payloads. All value patterns are
+    # compiled into one alternation, so each string is searched once;
+    # card-number candidates must also pass the Luhn check.
+    def __init__(
+        self,
+        patterns: Optional[Mapping[str, str]] = None,
+        sensitive_keys: Optional[Iterable[str]] = None
+    ):
+        self.patterns = dict(patterns if patterns is not None else DEFAULT_PATTERNS)
+        self.sensitive_keys = frozenset(key.lower() for key in (sensitive_keys if sensitive_keys is not None else DEFAULT_SENSITIVE_KEYS))
+        # One alternation per combination of triggers present in a string
+        self._regexes = {}
+        for has_at in (False, True):
+            for has_digit in (False, True):
+                for has_colon in (False, True):
+                    present = {'@': has_at, 'digit': has_digit, ':': has_colon}
+                    self._regexes[has_at, has_digit, has_colon] = self._compile({
+                        kind: pattern for kind, pattern in self.patterns.items()
+                        if present.get(PATTERN_TRIGGERS.get(kind), True)
+                    })
+        self._tokens = {kind: f"[{kind.upper()}]" for kind in self.patterns}
+        self._key_cache: Dict[Any, bool] = {}
+
+    def __reduce__(self):
+        # Rebuilt from its settings in worker processes
+        return (PIIScanner, (self.patterns, self.sensitive_keys))
+
+    def is_sensitive_key(self, key) -> bool:
+        sensitive = self._key_cache.get(key)
+        if sensitive is None:
+            sensitive = isinstance(key, str) and key.lower() in self.sensitive_keys
+            if len(self._key_cache) < MAX_KEY_CACHE:
+                self._key_cache[key] = sensitive
+        return sensitive
+
+    def redact_text(self, text: str) -> str:
+        regex = self._regex_for(text)
+        if regex is None:
+            return text
+        return regex.sub(self._replace, text)
+
+    def redact(self, value: Any) -> Any:
+        # Returns a redacted copy; the input is not modified
+        if isinstance(value, str):
+            return self.redact_text(value)
+        if isinstance(value, dict):
+            return {key: self.redact_item(key, item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self.redact(item) for item in value]
+        if isinstance(value, int) and not isinstance(value, bool) and abs(value) >= SMALLEST_CARD:
+            # Card numbers sometimes arrive as integers
+            return self._tokens['card'] if 'card' in self._tokens and luhn_valid(str(abs(value))) else value
+        return value
+
+    def redact_item(self, key, value: Any) -> Any:
+        # A value as redacted under the given mapping key
+        if self.is_sensitive_key(key):
+            return REDACTED if value is not None else None
+        return self.redact(value)
+
+    def find(self, value: Any, path: str = "") -> List[Tuple[str, str]]:
+        # (path, kind) for every PII hit, e.g. ("payload.contact[0]", "email")
+        findings = []
+        self._find(value, path, findings)
+        return findings
+
+    def _find(self, value, path, findings):
+        if isinstance(value, str):
+            regex = self._regex_for(value)
+            if regex is not None:
+                for match in regex.finditer(value):
+                    if self._replace(match) != match.group(0):
+                        findings.append((path, match.lastgroup))
+        elif isinstance(value, dict):
+            for key, item in value.items():
+                item_path = f"{path}.{key}" if path else str(key)
+                if self.is_sensitive_key(key) and item is not None:
+                    findings.append((item_path, 'sensitive_key'))
+                else:
+                    self._find(item, item_path, findings)
+        elif isinstance(value, (list, tuple)):
+            for index, item in enumerate(value):
+                self._find(item, f"{path}[{index}]", findings)
+        elif self.redact(value) is not value:
+            findings.append((path, 'card'))
+
+    def _regex_for(self, text: str):
+        if not _TRIGGER.search(text):
+            return None
+        return self._regexes['@' in text, _DIGIT.search(text) is not None, ':' in text]
+
+    @staticmethod
+    def _compile(patterns: Mapping[str, str]):
+        if not patterns:
+            # Matches nothing
+            return re.compile(r"(?!)")
+        alternation = "|".join(f"(?P<{kind}>{pattern})" for kind, pattern in patterns.items())
+        if any(kind not in PATTERN_STARTS for kind in patterns):
+            return re.compile(alternation)
+        starts = "".join(PATTERN_STARTS[kind] for kind in patterns)
+        return re.compile(f"(?=[{starts}])(?:{alternation})")
+
+    def _replace(self, match) -> str:
+        kind = match.lastgroup
+        if kind == 'card' and not luhn_valid(re.sub(r"[ -]", "", match.group(0))):
+            return match.group(0)
+        return self._tokens[kind]
+
+DEFAULT_SCANNER = PIIScanner()
+
+def load_scanner(config: Optional[Dict[str, Any]] = None) -> PIIScanner:
+    settings = (config or {}).get('pii', {})
+    if not settings.get('sensitive_keys'):
+        return DEFAULT_SCANNER
+    return PIIScanner(sensitive_keys=settings['sensitive_keys'])
+
+def redact_pii(value: Any, scanner: PIIScanner = DEFAULT_SCANNER) -> Any:
+    return scanner.redact(value)
+
+def redact_fields(
+    record: Dict[str, Any],
+    scanner: PIIScanner = DEFAULT_SCANNER,
+    skip: Iterable[str] = ANONYMIZED_FIELDS
+) -> Dict[str, Any]:
+    # Redacted copy of a record, leaving the skip fields to the caller
+    return {
+        key: value if key in skip else scanner.redact_item(key, value)
+        for key, value in record.items()
+    }
+
+def anonymize_and_redact(data: Dict[str, Any], scanner: PIIScanner = DEFAULT_SCANNER) -> Dict[str, Any]:
+    # anonymize_record for the known top-level fields, the scanner for
+    # everything else (including anything nested)
+    return redact_fields(anonymize_record(data), scanner)
+
+def redact_dataframe(
+    df: pd.DataFrame,
+    scanner: PIIScanner = DEFAULT_SCANNER,
+    skip: Iterable[str] = ANONYMIZED_FIELDS
+) -> pd.DataFrame:
+    # Column-wise redact_fields; missing values stay missing and columns
+    # the scanner leaves untouched keep their dtype
+    redacted = df.copy()
+    for column in redacted.columns:
+        if column in skip:
+            continue
+        values = redacted[column].tolist()
+        present = redacted[column].notna().tolist()
+        scanned = [scanner.redact_item(column, value) if keep else value for value, keep in zip(values, present)]
+        if any(new is not old for new, old in zip(scanned, values)):
+            redacted[column] = pd.Series(scanned, index=redacted.index, dtype=object)
+    return redacted
+
+def _anonymize_and_redact_chunk(scanner: PIIScanner, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [anonymize_and_redact(record, scanner) for record in records]
+
+def anonymize_and_redact_batch(
+    records,
+    scanner: PIIScanner = DEFAULT_SCANNER,
+    max_workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+):
+    # anonymize_batch with the scanner applied as in anonymize_and_redact
+    if isinstance(records, pd.DataFrame):
+        return redact_dataframe(anonymize_dataframe(records, max_workers, chunk_size), scanner)
+    workers = _resolve_workers(max_workers)
+    chunks = _map_chunks(partial(_anonymize_and_redact_chunk, scanner), chunked(records, chunk_size), workers)
+    return [record for chunk in chunks for record in chunk]
+
+def _redact_chunk(scanner: PIIScanner, records: List[Any]) -> List[Any]:
+    return [scanner.redact(record) for record in records]
+
+def redact_records(
+    records: Iterable[Any],
+    scanner: PIIScanner = DEFAULT_SCANNER,
+    max_workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[Any]:
+    # Streams redacted records back in input order, spreading chunks over
+    # a process pool with only a few chunks in flight
+    workers = _resolve_workers(max_workers)
+    for chunk in _map_chunks(partial(_redact_chunk, scanner), chunked(records, chunk_size), workers):
+        yield from chunk
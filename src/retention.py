@@ -0,0 +1,126 @@
+import heapq
+import logging
+import threading
+import weakref
+from datetime import datetime, date
+from typing import Dict, List, Any, Optional
+
+class ExpiryIndex:
+    # Keys bucketed by the day they expire. A sweep pops whole buckets for
+    # past days and only checks individual expiry times in today's bucket,
+    # so it never touches entries that are not due yet.
+    def __init__(self):
+        self._buckets: Dict[int, Dict[Any, datetime]] = {}
+        self._days: List[int] = []
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, key, expires_at: datetime):
+        day = expires_at.toordinal()
+        bucket = self._buckets.get(day)
+        if bucket is None:
+            bucket = self._buckets[day] = {}
+            heapq.heappush(self._days, day)
+        if key not in bucket:
+            self._size += 1
+        bucket[key] = expires_at
+
+    def discard(self, key, expires_at: datetime):
+        day = expires_at.toordinal()
+        bucket = self._buckets.get(day)
+        if bucket is None or key not in bucket:
+            return
+        del bucket[key]
+        self._size -= 1
+        if not bucket:
+            # The day stays in the heap and is skipped when it comes up
+            del self._buckets[day]
+
+    def pop_expired(self, now: datetime) -> List[Any]:
+        expired = []
+        today = now.toordinal()
+
+        while self._days and self._days[0] <= today:
+            day = self._days[0]
+            bucket = self._buckets.get(day)
+
+            if bucket is None:
+                heapq.heappop(self._days)
+                continue
+
+            if day < today:
+                heapq.heappop(self._days)
+                del self._buckets[day]
+                expired.extend(bucket)
+                continue
+
+            due = [key for key, expires_at in bucket.items() if expires_at <= now]
+            for key in due:
+                del bucket[key]
+            expired.extend(due)
+            if not bucket:
+                heapq.heappop(self._days)
+                del self._buckets[day]
+            break
+
+        self._size -= len(expired)
+        return expired
+
+    def pending_by_day(self) -> Dict[date, int]:
+        return {date.fromordinal(day): len(bucket) for day, bucket in sorted(self._buckets.items())}
+
+class RetentionSweeper:
+    # Periodically purges expired entries off the request path. The target
+    # only needs a purge_expired(now) method; it is held weakly so the
+    # thread ends once the store it sweeps is gone.
+    def __init__(self, target, interval: float = 3600.0, lock=None):
+        self._target = weakref.ref(target)
+        self.interval = interval
+        self.lock = lock
+        self.last_sweep: Optional[datetime] = None
+        self.last_purged = 0
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> 'RetentionSweeper':
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="gdpr-retention-sweeper", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def sweep(self, now: Optional[datetime] = None) -> int:
+        target = self._target()
+        if target is None:
+            self._stop.set()
+            return 0
+
+        now = now or datetime.utcnow()
+        try:
+            if self.lock is not None:
+                with self.lock:
+                    purged = target.purge_expired(now)
+            else:
+                purged = target.purge_expired(now)
+        except Exception as e:
+            logging.error(f"Retention Sweep Error: {e}")
+            return 0
+
+        self.last_sweep = now
+        self.last_purged = purged if isinstance(purged, int) else len(purged)
+        if self.last_purged:
+            logging.info(f"Retention sweep purged {self.last_purged} expired records")
+        return self.last_purged
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sweep()
+            self._stop.wait(self.interval)
@@ -0,0 +1,566 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import uuid
+import weakref
+import zlib
+from array import array
+from datetime import datetime
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from src.compact_log import CompactLogStore, CONSENT_GIVEN, ID_SIZE, LIVE, to_epoch_us
+
+# Every record is framed as (type, body length, CRC32 of the body)
+RECORD_HEADER = struct.Struct('<BII')
+PUT = 1
+DELETE = 2
+# A PUT whose body was zeroed after its entry was deleted; the checksum no
+# longer applies
+SCRUBBED = 3
+# PUT body: id, timestamp, retention period, consent flag and the lengths of
+# the user id and activity type, followed by those two strings and the
+# payload JSON. DELETE body: the 16-byte ids of the deleted entries.
+PUT_FIELDS = struct.Struct('<16sqqBHH')
+
+MANIFEST = 'MANIFEST'
+LOCK_FILE = 'LOCK'
+SEGMENT_SUFFIX = '.seg'
+DEFAULT_SEGMENT_SIZE = 64 * 1024 * 1024
+DEFAULT_COMPACT_MIN_DEAD = 1024
+
+class SegmentLogStore(CompactLogStore):
+    # Durable processing log. Entries are appended to segment files in a
+    # directory and read back through mmap; the in-memory index is the
+    # compact store's columns with payloads replaced by file locations.
+    #
+    # Deletes and retention purges append tombstones, then scrub the deleted
+    # records in place: the record is marked SCRUBBED and its body zeroed,
+    # so erased personal data leaves the disk at once instead of waiting
+    # for a compaction. The MANIFEST lists the live segments in replay
+    # order and is replaced atomically, so a crash mid-rollover or
+    # mid-compaction leaves the previous set intact. On open the segments
+    # are replayed and a torn record at the tail is truncated.
+    #
+    # Compaction copies the live records of every sealed segment into one
+    # new segment and drops the old ones. It runs in three steps so the copy
+    # can happen outside the caller's lock (see SegmentCompactor):
+    # begin_compaction, write_compacted, finish_compaction.
+    def __init__(
+        self,
+        directory: str,
+        segment_size: int = DEFAULT_SEGMENT_SIZE,
+        fsync: bool = False,
+        compact_min_dead: int = DEFAULT_COMPACT_MIN_DEAD
+    ):
+        super().__init__()
+        self._reset_locations()
+        self.directory = directory
+        self.segment_size = segment_size
+        # Tombstones are always synced; fsync=True syncs every append too
+        self.fsync = fsync
+        self.compact_min_dead = compact_min_dead
+
+        self._segments: List[int] = []
+        self._maps: Dict[int, mmap.mmap] = {}
+        self._next_segment = 1
+        self._writer = None
+        self._active: Optional[int] = None
+        self._active_size = 0
+        # Dead records and tombstones on disk that compaction would drop
+        self._reclaimable = 0
+        # (segment, record offset) of records deleted but not yet scrubbed
+        self._unscrubbed: List[Tuple[int, int]] = []
+        self._compacting = False
+
+        os.makedirs(directory, exist_ok=True)
+        # One writer per directory; a second process would interleave appends
+        self._lock_file = open(os.path.join(directory, LOCK_FILE), 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self._lock_file.close()
+                raise RuntimeError(f"Processing log directory {directory} is already in use")
+        self._recover()
+
+    def close(self):
+        if self._writer is not None:
+            os.fsync(self._writer.fileno())
+            self._writer.close()
+            self._writer = None
+        for view in self._maps.values():
+            view.close()
+        self._maps.clear()
+        if not self._lock_file.closed:
+            self._lock_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def delete(self, log_id: str) -> Optional[Dict[str, Any]]:
+        row = self._find_row(log_id)
+        if row is None:
+            return None
+        self._write_tombstone([self._id_bytes(row)])
+        entry = super().delete(log_id)
+        self._scrub()
+        return entry
+
+    def delete_user(self, user_id: str) -> List[Dict[str, Any]]:
+        # The tombstone is on disk before anything is removed from memory
+        user_code = self._user_lookup.get(user_id)
+        if user_code is not None:
+            self._write_tombstone([self._id_bytes(row) for row in self._rows_by_user[user_code]])
+        removed = super().delete_user(user_id)
+        self._scrub()
+        return removed
+
+    def purge_expired(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        # Entries that come back after a crash here are expired and get
+        # purged again by the next sweep
+        removed = super().purge_expired(now)
+        if removed:
+            self._write_tombstone([uuid.UUID(entry['id']).bytes for entry in removed])
+        self._scrub()
+        return removed
+
+    def disk_usage(self) -> int:
+        return sum(os.path.getsize(self._segment_path(segment_id)) for segment_id in self._segments)
+
+    def memory_usage(self) -> int:
+        columns = (self._segment_ids, self._record_offsets, self._payload_starts, self._payload_lengths)
+        return super().memory_usage() + sum(sys.getsizeof(column) for column in columns)
+
+    def needs_compaction(self) -> bool:
+        # Compact once at least half of what is on disk is garbage
+        return not self._compacting and self._reclaimable >= max(self.compact_min_dead, self._live)
+
+    def compact(self):
+        # While a background compaction is running it rebuilds the index
+        # itself when it finishes
+        if self._compacting:
+            return
+        plan = self.begin_compaction()
+        try:
+            offsets = self.write_compacted(plan)
+        except Exception:
+            self.abort_compaction(plan)
+            raise
+        self.finish_compaction(plan, offsets)
+
+    def begin_compaction(self) -> Dict[str, Any]:
+        # Under the caller's lock: seal the active segment and snapshot the
+        # location of every live record in the sealed ones
+        self._compacting = True
+        if self._active_size:
+            self._roll()
+        sealed = [segment_id for segment_id in self._segments if segment_id != self._active]
+        sealed_set = set(sealed)
+
+        rows = array('Q')
+        for row in range(len(self._flags)):
+            if self._flags[row] & LIVE and self._segment_ids[row] in sealed_set:
+                rows.append(row)
+
+        target = self._next_segment
+        self._next_segment += 1
+        plan = {
+            'sealed': sealed,
+            'target': target,
+            'rows': rows,
+            'segments': array('I', (self._segment_ids[row] for row in rows)),
+            'starts': array('Q', (self._record_offsets[row] for row in rows)),
+            'ends': array('Q', (self._payload_starts[row] + self._payload_lengths[row] for row in rows)),
+            'reclaimable': self._reclaimable
+        }
+        # Records deleted from here on are copied dead and count again
+        self._reclaimable = 0
+        return plan
+
+    def write_compacted(self, plan: Dict[str, Any]) -> array:
+        # No lock needed: sealed segments only change by scrubbing, and
+        # finish_compaction scrubs again whatever was copied mid-scrub
+        offsets = array('Q')
+        position = 0
+        with open(self._segment_path(plan['target']), 'wb') as segment_file:
+            for segment_id, start, end in zip(plan['segments'], plan['starts'], plan['ends']):
+                segment_file.write(self._view(segment_id, end)[start:end])
+                offsets.append(position)
+                position += end - start
+            segment_file.flush()
+            os.fsync(segment_file.fileno())
+        return offsets
+
+    def finish_compaction(self, plan: Dict[str, Any], offsets: array):
+        # Under the caller's lock: install the new segment in place of the
+        # sealed ones, repoint the copied rows and drop dead rows from memory
+        try:
+            # Records deleted while they were being copied may have been
+            # copied before (or while) they were scrubbed at the old location
+            self._scrub_records(plan['target'], [
+                offset for row, offset in zip(plan['rows'], offsets) if not self._flags[row] & LIVE
+            ])
+
+            sealed = set(plan['sealed'])
+            self._segments = [plan['target']] + [segment_id for segment_id in self._segments if segment_id not in sealed]
+            self._write_manifest()
+
+            for segment_id in plan['sealed']:
+                view = self._maps.pop(segment_id, None)
+                if view is not None:
+                    view.close()
+                os.remove(self._segment_path(segment_id))
+
+            for row, start, offset in zip(plan['rows'], plan['starts'], offsets):
+                self._segment_ids[row] = plan['target']
+                self._record_offsets[row] = offset
+                self._payload_starts[row] += offset - start
+            self._rebuild()
+        finally:
+            self._compacting = False
+
+    def abort_compaction(self, plan: Dict[str, Any]):
+        path = self._segment_path(plan['target'])
+        if os.path.exists(path):
+            os.remove(path)
+        self._reclaimable += plan['reclaimable']
+        self._compacting = False
+
+    def _reset_locations(self):
+        # Per row: segment, record start, and where the payload JSON sits
+        self._segment_ids = array('I')
+        self._record_offsets = array('Q')
+        self._payload_starts = array('Q')
+        self._payload_lengths = array('I')
+
+    def append(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        self.extend([entry])
+        return entry
+
+    def extend(self, entries: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Records of a batch go to the segment in one write (and at most
+        # one fsync) instead of one per entry
+        entries = list(entries)
+        batch = bytearray()
+        rows = []
+        for entry in entries:
+            if self._writer is None or self._active_size + len(batch) >= self.segment_size:
+                self._write_batch(batch, rows)
+                batch, rows = bytearray(), []
+                self._roll()
+
+            raw_id = uuid.UUID(entry['id']).bytes
+            timestamp = to_epoch_us(entry['timestamp'])
+            retention = to_epoch_us(entry['retention_period'])
+            flags = CONSENT_GIVEN if entry['is_consent_given'] else 0
+            user_id = entry['user_id'].encode('utf-8')
+            activity_type = entry['activity_type'].encode('utf-8')
+            payload = json.dumps(entry['data_processed'], separators=(',', ':'), default=str).encode('utf-8')
+
+            body = PUT_FIELDS.pack(raw_id, timestamp, retention, flags, len(user_id), len(activity_type)) + user_id + activity_type + payload
+            offset = self._active_size + len(batch)
+            batch += RECORD_HEADER.pack(PUT, len(body), zlib.crc32(body))
+            batch += body
+            payload_start = offset + RECORD_HEADER.size + PUT_FIELDS.size + len(user_id) + len(activity_type)
+            rows.append((raw_id, entry['user_id'], entry['activity_type'], timestamp, retention, flags, offset, payload_start, len(payload)))
+
+        self._write_batch(batch, rows)
+        return entries
+
+    def _add_payload(self, location: Tuple[int, int, int, int]):
+        segment_id, offset, payload_start, payload_length = location
+        self._segment_ids.append(segment_id)
+        self._record_offsets.append(offset)
+        self._payload_starts.append(payload_start)
+        self._payload_lengths.append(payload_length)
+
+    def _payload(self, row: int) -> bytes:
+        start = self._payload_starts[row]
+        end = start + self._payload_lengths[row]
+        return self._view(self._segment_ids[row], end)[start:end]
+
+    def _kill(self, row: int):
+        super()._kill(row)
+        self._reclaimable += 1
+        self._unscrubbed.append((self._segment_ids[row], self._record_offsets[row]))
+
+    def _scrub(self):
+        # Segments dropped by a compaction in the meantime are gone already
+        pending, self._unscrubbed = self._unscrubbed, []
+        offsets = {}
+        for segment_id, offset in pending:
+            offsets.setdefault(segment_id, []).append(offset)
+        for segment_id in self._segments:
+            if segment_id in offsets:
+                self._scrub_records(segment_id, offsets[segment_id])
+
+    def _scrub_records(self, segment_id: int, offsets: List[int]):
+        # The kind byte is flipped and synced before the body is zeroed, so
+        # a crash in between leaves a SCRUBBED record, never a PUT that
+        # fails its checksum
+        if not offsets:
+            return
+        with open(self._segment_path(segment_id), 'r+b') as segment_file:
+            lengths = []
+            for offset in offsets:
+                segment_file.seek(offset)
+                kind, length, checksum = RECORD_HEADER.unpack(segment_file.read(RECORD_HEADER.size))
+                if kind != PUT:
+                    continue
+                segment_file.seek(offset)
+                segment_file.write(RECORD_HEADER.pack(SCRUBBED, length, checksum))
+                lengths.append((offset, length))
+            segment_file.flush()
+            os.fsync(segment_file.fileno())
+
+            for offset, length in lengths:
+                segment_file.seek(offset + RECORD_HEADER.size)
+                segment_file.write(bytes(length))
+            segment_file.flush()
+            os.fsync(segment_file.fileno())
+
+    def _id_bytes(self, row: int) -> bytes:
+        return bytes(self._ids[row * ID_SIZE:(row + 1) * ID_SIZE])
+
+    def _rebuild(self):
+        # Same as CompactLogStore.compact, keeping each row's file location
+        fresh = CompactLogStore.__new__(type(self))
+        CompactLogStore.__init__(fresh)
+        fresh._reset_locations()
+        for row in range(len(self._flags)):
+            flags = self._flags[row]
+            if flags & LIVE:
+                fresh._add_row(
+                    self._id_bytes(row),
+                    self._users[self._user_codes[row]],
+                    self._activities[self._activity_codes[row]],
+                    self._timestamps[row],
+                    self._retention[row],
+                    flags & CONSENT_GIVEN,
+                    (self._segment_ids[row], self._record_offsets[row], self._payload_starts[row], self._payload_lengths[row])
+                )
+                fresh._seqs[-1] = self._seqs[row]
+        fresh._next_seq = self._next_seq
+        self.__dict__.update(fresh.__dict__)
+
+    def _write_batch(self, batch: bytearray, rows: List[tuple]):
+        # Rows only become visible once their records are written
+        if batch:
+            self._writer.write(batch)
+            self._active_size += len(batch)
+            if self.fsync:
+                os.fsync(self._writer.fileno())
+        for raw_id, user_id, activity_type, timestamp, retention, flags, offset, payload_start, payload_length in rows:
+            self._add_row(raw_id, user_id, activity_type, timestamp, retention, flags, (self._active, offset, payload_start, payload_length))
+
+    def _write_tombstone(self, ids: Iterable[bytes]):
+        body = b''.join(ids)
+        if body:
+            self._write(DELETE, body, sync=True)
+            self._reclaimable += 1
+
+    def _write(self, kind: int, body: bytes, sync: bool = False) -> int:
+        if self._writer is None or self._active_size >= self.segment_size:
+            self._roll()
+        offset = self._active_size
+        self._writer.write(RECORD_HEADER.pack(kind, len(body), zlib.crc32(body)) + body)
+        self._active_size += RECORD_HEADER.size + len(body)
+        if sync:
+            os.fsync(self._writer.fileno())
+        return offset
+
+    def _roll(self):
+        # Seal the active segment and start a new one
+        if self._writer is not None:
+            os.fsync(self._writer.fileno())
+            self._writer.close()
+        segment_id = self._next_segment
+        self._next_segment += 1
+        # Unbuffered, so every append reaches the OS (and mmap readers) at once
+        self._writer = open(self._segment_path(segment_id), 'ab', buffering=0)
+        self._segments.append(segment_id)
+        self._write_manifest()
+        self._active = segment_id
+        self._active_size = 0
+
+    def _view(self, segment_id: int, end: int) -> mmap.mmap:
+        # Maps are recreated when a read goes past the mapped size, which
+        # only happens for the segment being appended to
+        view = self._maps.get(segment_id)
+        if view is None or len(view) < end:
+            with open(self._segment_path(segment_id), 'rb') as segment_file:
+                view = self._maps[segment_id] = mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return view
+
+    def _segment_path(self, segment_id: int) -> str:
+        return os.path.join(self.directory, f"{segment_id:08d}{SEGMENT_SUFFIX}")
+
+    def _write_manifest(self):
+        path = os.path.join(self.directory, MANIFEST)
+        with open(path + '.tmp', 'w') as manifest_file:
+            json.dump({'segments': self._segments}, manifest_file)
+            manifest_file.flush()
+            os.fsync(manifest_file.fileno())
+        os.replace(path + '.tmp', path)
+        try:
+            directory = os.open(self.directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(directory)
+        except OSError:
+            pass
+        finally:
+            os.close(directory)
+
+    def _recover(self):
+        path = os.path.join(self.directory, MANIFEST)
+        if os.path.exists(path):
+            with open(path) as manifest_file:
+                self._segments = json.load(manifest_file)['segments']
+
+        # Anything not in the manifest is an unfinished compaction or rollover
+        listed = set(self._segments)
+        for name in os.listdir(self.directory):
+            if name.endswith(SEGMENT_SUFFIX) and int(name[:-len(SEGMENT_SUFFIX)]) not in listed:
+                os.remove(os.path.join(self.directory, name))
+        self._next_segment = max(self._segments, default=0) + 1
+
+        # Pass one validates every record and collects deleted ids; a PUT
+        # never follows its own tombstone, so order does not matter
+        deleted = set()
+        valid_ends = {}
+        for index, segment_id in enumerate(self._segments):
+            size = os.path.getsize(self._segment_path(segment_id))
+            end = self._validate(segment_id, size, deleted) if size else 0
+            valid_ends[segment_id] = end
+            if end == size:
+                continue
+            if index == len(self._segments) - 1:
+                logging.warning(f"Truncating torn record at {end} in log segment {segment_id}")
+                self._maps.pop(segment_id).close()
+                os.truncate(self._segment_path(segment_id), end)
+            else:
+                logging.error(f"Segment Log Recovery Error: corrupt record at {end} in sealed segment {segment_id}")
+
+        # Pass two indexes the surviving entries in write order
+        for segment_id in self._segments:
+            offset = 0
+            end = valid_ends[segment_id]
+            view = self._view(segment_id, end) if end else None
+            while offset < end:
+                kind, length, _ = RECORD_HEADER.unpack_from(view, offset)
+                body = offset + RECORD_HEADER.size
+                if kind in (DELETE, SCRUBBED):
+                    self._reclaimable += 1
+                else:
+                    raw_id, timestamp, retention, flags, user_length, activity_length = PUT_FIELDS.unpack_from(view, body)
+                    if raw_id in deleted:
+                        self._reclaimable += 1
+                    else:
+                        user_start = body + PUT_FIELDS.size
+                        activity_start = user_start + user_length
+                        payload_start = activity_start + activity_length
+                        self._add_row(
+                            raw_id,
+                            view[user_start:activity_start].decode('utf-8'),
+                            view[activity_start:payload_start].decode('utf-8'),
+                            timestamp,
+                            retention,
+                            flags & CONSENT_GIVEN,
+                            (segment_id, offset, payload_start, body + length - payload_start)
+                        )
+                offset = body + length
+
+        if self._segments and valid_ends[self._segments[-1]] < self.segment_size:
+            # Keep appending to the last segment
+            self._active = self._segments[-1]
+            self._active_size = valid_ends[self._active]
+            self._writer = open(self._segment_path(self._active), 'ab', buffering=0)
+        else:
+            self._roll()
+
+    def _validate(self, segment_id: int, size: int, deleted: set) -> int:
+        # Offset just past the last intact record
+        view = self._view(segment_id, size)
+        offset = 0
+        while offset + RECORD_HEADER.size <= size:
+            kind, length, checksum = RECORD_HEADER.unpack_from(view, offset)
+            body = offset + RECORD_HEADER.size
+            if kind not in (PUT, DELETE, SCRUBBED) or body + length > size:
+                break
+            if kind != SCRUBBED and zlib.crc32(view[body:body + length]) != checksum:
+                break
+            if kind == DELETE:
+                deleted.update(view[start:start + ID_SIZE] for start in range(body, body + length, ID_SIZE))
+            offset = body + length
+        return offset
+
+class SegmentCompactor:
+    # Background compaction for a SegmentLogStore. Only the planning and
+    # the final swap hold the lock; copying live records does not, so
+    # logging continues while a compaction runs. The store is held weakly,
+    # like RetentionSweeper's target.
+    def __init__(self, store: SegmentLogStore, interval: float = 300.0, lock=None):
+        self._store = weakref.ref(store)
+        self.interval = interval
+        self.lock = lock or threading.RLock()
+        self.last_compaction: Optional[datetime] = None
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> 'SegmentCompactor':
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="gdpr-log-compactor", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def compact(self) -> bool:
+        store = self._store()
+        if store is None:
+            self._stop.set()
+            return False
+
+        try:
+            with self.lock:
+                if not store.needs_compaction():
+                    return False
+                plan = store.begin_compaction()
+            try:
+                offsets = store.write_compacted(plan)
+            except Exception:
+                with self.lock:
+                    store.abort_compaction(plan)
+                raise
+            with self.lock:
+                store.finish_compaction(plan, offsets)
+        except Exception as e:
+            logging.error(f"Log Compaction Error: {e}")
+            return False
+
+        self.last_compaction = datetime.utcnow()
+        logging.info(f"Compacted processing log segments into segment {plan['target']}")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.compact()
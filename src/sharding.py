@@ -0,0 +1,406 @@
+import hashlib
+import heapq
+import logging
+import multiprocessing
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Iterable, Optional
+
+from src.anonymization import chunked
+from src.config import load_config
+from src.data_protection import EncryptoDataProtectionEngine
+from src.erasure import DEFAULT_CHUNK_SIZE as ERASURE_CHUNK_SIZE
+from src.metrics import instrument
+
+# Seconds a shard gets to finish its queue and close its engine
+SHUTDOWN_TIMEOUT = 30
+# Seconds between progress checks on the shards' erasure jobs
+ERASURE_POLL_INTERVAL = 0.05
+FINISHED_ERASURE_STATES = frozenset({'completed', 'failed', 'cancelled'})
+
+def shard_for(user_id: str, shards: int) -> int:
+    # Stable across processes and restarts, unlike hash()
+    digest = hashlib.blake2b(str(user_id).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % shards
+
+def _check_consent(engine, user_id, consent_type='data_processing'):
+    return engine.gdpr_manager.consent_manager.check_consent(user_id, consent_type)
+
+def _check_consents(engine, user_ids, consent_type='data_processing'):
+    return engine.gdpr_manager.consent_manager.check_consents(user_ids, consent_type)
+
+def _logs_page(engine, after, limit, **filters):
+    return next(engine.iter_logs(chunk_size=limit, after=after, **filters), [])
+
+def _start_erasure(engine, user_ids, chunk_size):
+    # The job runs on a thread of its own so the shard keeps answering. An
+    # in-memory database is one connection two threads cannot share, so
+    # there the job finishes before the reply.
+    return engine.erase_users(user_ids, chunk_size, background=not engine.in_memory).job_id
+
+def _access_requests(engine, user_ids, batch_size):
+    return list(engine.process_data_access_requests(user_ids, batch_size=batch_size))
+
+# Calls whose engine results cannot cross the process boundary as they are
+_SHARD_CALLS = {
+    'check_consent': _check_consent,
+    'check_consents': _check_consents,
+    'logs_page': _logs_page,
+    'start_erasure': _start_erasure,
+    'process_data_access_requests': _access_requests
+}
+
+# Engine methods a shard answers directly; anything else is refused
+_ENGINE_METHODS = frozenset({
+    'log_data_processing_activity',
+    'log_data_processing_activities',
+    'flush',
+    'get_logs',
+    'count_user_logs',
+    'export_data_subject_bundle',
+    'purge_expired',
+    'store_personal_data',
+    'retrieve_personal_data_batch',
+    'detokenize',
+    'store_consent',
+    'right_to_be_forgotten',
+    'get_erasure_job',
+    'verify_audit_trail',
+    'prove_log_entry'
+})
+
+def _serve_shard(conn, database_url: str, options: Dict[str, Any]):
+    # Runs in the shard process: one engine, requests answered in order.
+    # The first reply reports whether the engine came up.
+    try:
+        engine = EncryptoDataProtectionEngine(database_url, **options)
+    except Exception as e:
+        conn.send((False, f"{type(e).__name__}: {e}"))
+        conn.close()
+        return
+    conn.send((True, None))
+
+    try:
+        while True:
+            try:
+                request = conn.recv()
+            except EOFError:
+                return
+            if request is None:
+                return
+
+            name, args, kwargs = request
+            try:
+                if name in _SHARD_CALLS:
+                    reply = (True, _SHARD_CALLS[name](engine, *args, **kwargs))
+                elif name in _ENGINE_METHODS:
+                    reply = (True, getattr(engine, name)(*args, **kwargs))
+                else:
+                    reply = (False, f"Unknown shard call {name}")
+            except Exception as e:
+                reply = (False, f"{type(e).__name__}: {e}")
+            conn.send(reply)
+    finally:
+        engine.close()
+        conn.close()
+
+class ShardedDataProtectionEngine:
+    # Partitions users across worker processes by a stable hash of user_id.
+    # Each shard runs its own EncryptoDataProtectionEngine on its own
+    # database and token vault, so logging, erasure and queries for
+    # different users use different cores and writer locks. Per-user calls
+    # go to one shard; everything else is scattered to the shards it
+    # concerns and gathered here. A scatter sends every request before it
+    # waits for any reply, so the shards work in parallel.
+    #
+    # database_url and token_vault_path are templates, {shard} is replaced
+    # with the shard number. Other keyword arguments are passed to each
+    # shard's engine.
+    def __init__(
+        self,
+        database_url: Optional[str] = None,
+        shards: Optional[int] = None,
+        token_vault_path: Optional[str] = None,
+        start_method: Optional[str] = None,
+        **engine_options
+    ):
+        self.config = load_config()
+        settings = self.config['sharding']
+        database_url = database_url or settings['database_url']
+        token_vault_path = token_vault_path or settings['token_vault_path']
+        self.shards = int(shards or settings['shards'])
+        if self.shards < 1:
+            raise ValueError("At least one shard is required")
+        if self.shards > 1 and '{shard}' not in database_url and ':memory:' not in database_url:
+            raise ValueError("database_url must contain {shard} so shards do not share a database")
+
+        # Spawned, not forked: the parent may already be running threads
+        context = multiprocessing.get_context(start_method or settings['start_method'])
+        self._processes = []
+        self._conns = []
+        self._locks = [threading.Lock() for _ in range(self.shards)]
+        for index in range(self.shards):
+            options = dict(engine_options, token_vault_path=token_vault_path.format(shard=index))
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=_serve_shard,
+                args=(child_conn, database_url.format(shard=index), options),
+                name=f"gdpr-shard-{index}",
+                daemon=True
+            )
+            process.start()
+            child_conn.close()
+            self._processes.append(process)
+            self._conns.append(parent_conn)
+
+        # Every shard reports once its engine is up
+        errors = []
+        for index in range(self.shards):
+            try:
+                ok, value = self._conns[index].recv()
+            except EOFError:
+                ok, value = False, "exited during startup"
+            if not ok:
+                errors.append(f"shard {index}: {value}")
+        if errors:
+            self.close()
+            raise RuntimeError(f"Sharded engine failed to start ({'; '.join(errors)})")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def shard_for(self, user_id: str) -> int:
+        return shard_for(user_id, self.shards)
+
+    @instrument('log_data_processing_activity', failed=lambda result: result is None)
+    def log_data_processing_activity(self, user_id: str, activity_type: str, data_processed: Dict[str, Any]):
+        return self._call(self.shard_for(user_id), 'log_data_processing_activity', user_id, activity_type, data_processed)
+
+    @instrument('log_data_processing_activities', failed=lambda result: result is None)
+    def log_data_processing_activities(self, events: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        # One batch per shard, written in parallel. Entries come back in
+        # event order; a shard that fails is logged and left out, since the
+        # others have already committed, and None means nothing was written.
+        groups = {}
+        for position, event in enumerate(events):
+            groups.setdefault(self.shard_for(event['user_id']), []).append(position)
+
+        results = self._scatter('log_data_processing_activities', {
+            index: ([events[position] for position in positions],)
+            for index, positions in groups.items()
+        }, partial=True)
+
+        written = []
+        for index, positions in groups.items():
+            if results.get(index) is None:
+                logging.error(f"Data Processing Log Error: shard {index} did not write {len(positions)} events")
+                continue
+            written.extend(zip(positions, results[index]))
+        if events and not written:
+            return None
+        return [entry for _, entry in sorted(written, key=lambda item: item[0])]
+
+    def flush(self) -> int:
+        return sum(self._broadcast('flush').values())
+
+    def close(self):
+        # Shards drain their queues and close their engines
+        for index, conn in enumerate(self._conns):
+            with self._locks[index]:
+                try:
+                    conn.send(None)
+                except (BrokenPipeError, OSError):
+                    pass
+        for process in self._processes:
+            process.join(SHUTDOWN_TIMEOUT)
+            if process.is_alive():
+                logging.error(f"Sharded Engine Close Error: {process.name} did not stop")
+                process.terminate()
+        for conn in self._conns:
+            conn.close()
+        self._processes = []
+        self._conns = []
+
+    def get_logs(self, user_id: Optional[str] = None):
+        if user_id:
+            return self._call(self.shard_for(user_id), 'get_logs', user_id)
+        return [log for logs in self._broadcast('get_logs').values() for log in logs]
+
+    def iter_logs(
+        self,
+        user_id: Optional[str] = None,
+        activity_type: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        chunk_size: int = 10000
+    ):
+        # Chunks in (timestamp, id) order, merged from one paged stream per shard
+        filters = {'user_id': user_id, 'activity_type': activity_type, 'start': start, 'end': end}
+        indexes = [self.shard_for(user_id)] if user_id else range(self.shards)
+        streams = [self._shard_logs(index, filters, chunk_size) for index in indexes]
+        merged = heapq.merge(*streams, key=lambda log: (log['timestamp'], log['id']))
+        yield from chunked(merged, chunk_size)
+
+    def count_user_logs(self, user_id: str) -> int:
+        return self._call(self.shard_for(user_id), 'count_user_logs', user_id)
+
+    def export_data_subject_bundle(self, user_id: str, path: str, chunk_size: int = 10000) -> Dict[str, Any]:
+        # Written by the user's shard; progress callbacks cannot cross the
+        # process boundary
+        return self._call(self.shard_for(user_id), 'export_data_subject_bundle', user_id, path, chunk_size=chunk_size)
+
+    def purge_expired(self, now: Optional[datetime] = None) -> int:
+        return sum(self._broadcast('purge_expired', now).values())
+
+    def store_personal_data(self, user_id: str, data: Dict[str, Any]) -> bool:
+        return self._call(self.shard_for(user_id), 'store_personal_data', user_id, data)
+
+    def retrieve_personal_data_batch(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        found = {}
+        for data in self._scatter_users('retrieve_personal_data_batch', user_ids).values():
+            found.update(data)
+        return found
+
+    def process_data_access_requests(self, user_ids, batch_size: int = 1000):
+        # Each round hands every shard up to batch_size users; results are
+        # yielded in request order, one round in memory at a time
+        for users in chunked(dict.fromkeys(user_ids), batch_size * self.shards):
+            results = {}
+            for shard_results in self._scatter_users('process_data_access_requests', users, batch_size=batch_size).values():
+                results.update((result['user_id'], result) for result in shard_results)
+            for user_id in users:
+                yield results[user_id]
+
+    def detokenize(self, tokens: List[str]) -> List[Optional[str]]:
+        # Tokens do not name their user, so every shard's vault is asked
+        values = [None] * len(tokens)
+        for shard_values in self._broadcast('detokenize', tokens).values():
+            values = [value if value is not None else shard_value for value, shard_value in zip(values, shard_values)]
+        return values
+
+    def store_consent(self, user_id: str, consent_type: str, status: bool) -> bool:
+        return self._call(self.shard_for(user_id), 'store_consent', user_id, consent_type, status)
+
+    def check_consent(self, user_id: str, consent_type: str = 'data_processing') -> bool:
+        return self._call(self.shard_for(user_id), 'check_consent', user_id, consent_type)
+
+    def check_consents(self, user_ids: List[str], consent_type: str = 'data_processing') -> List[bool]:
+        groups = self._group(user_ids)
+        results = self._scatter('check_consents', {index: (users,) for index, users in groups.items()}, {'consent_type': consent_type})
+        consents = {}
+        for index, users in groups.items():
+            consents.update(zip(users, results[index]))
+        return [consents[user_id] for user_id in user_ids]
+
+    @instrument('right_to_be_forgotten')
+    def right_to_be_forgotten(self, user_id: str):
+        return self._call(self.shard_for(user_id), 'right_to_be_forgotten', user_id)
+
+    def erase_users(self, user_ids, chunk_size: int = ERASURE_CHUNK_SIZE, poll_interval: float = ERASURE_POLL_INTERVAL) -> Dict[str, Any]:
+        # Each shard runs its own checkpointed erasure job over its users in
+        # the background. Progress is polled with short calls, so the shards
+        # keep serving other requests meanwhile; returns once every shard
+        # has finished
+        pending = self._scatter_users('start_erasure', list(dict.fromkeys(user_ids)), chunk_size=chunk_size)
+        jobs = {}
+        while pending:
+            jobs.update(self._scatter('get_erasure_job', {index: (job_id,) for index, job_id in pending.items()}))
+            pending = {index: job_id for index, job_id in pending.items() if jobs[index]['status'] not in FINISHED_ERASURE_STATES}
+            if pending:
+                time.sleep(poll_interval)
+        total = sum(job['total'] for job in jobs.values())
+        erased = sum(job['erased'] for job in jobs.values())
+        return {
+            'status': 'completed' if all(job['status'] == 'completed' for job in jobs.values()) else 'failed',
+            'erased': erased,
+            'total': total,
+            'shards': jobs
+        }
+
+    def verify_audit_trail(self, full: bool = False) -> Dict[str, Any]:
+        # Every shard verifies its own trail
+        results = self._broadcast('verify_audit_trail', full)
+        problems = [
+            dict(problem, shard=index)
+            for index, result in results.items()
+            for problem in result['problems']
+        ]
+        return {
+            'status': 'success' if all(result['status'] == 'success' for result in results.values()) else 'error',
+            'verified': sum(result['verified'] for result in results.values()),
+            'problems': problems,
+            'shards': results
+        }
+
+    def prove_log_entry(self, log_id: str) -> Optional[Dict[str, Any]]:
+        # Proven against the trail of the shard holding the entry
+        for index, proof in self._broadcast('prove_log_entry', log_id).items():
+            if proof is not None:
+                return dict(proof, shard=index)
+        return None
+
+    def _shard_logs(self, index: int, filters: Dict[str, Any], chunk_size: int):
+        after = None
+        while True:
+            page = self._call(index, 'logs_page', after, chunk_size, **filters)
+            yield from page
+            if len(page) < chunk_size:
+                return
+            after = (page[-1]['timestamp'], page[-1]['id'])
+
+    def _group(self, user_ids: Iterable[str]) -> Dict[int, List[str]]:
+        groups = {}
+        for user_id in user_ids:
+            groups.setdefault(self.shard_for(user_id), []).append(user_id)
+        return groups
+
+    def _scatter_users(self, name: str, user_ids: Iterable[str], **kwargs) -> Dict[int, Any]:
+        # name(users, **kwargs) on every shard that holds some of the users
+        return self._scatter(name, {index: (users,) for index, users in self._group(user_ids).items()}, kwargs)
+
+    def _broadcast(self, name: str, *args, **kwargs) -> Dict[int, Any]:
+        return self._scatter(name, {index: args for index in range(self.shards)}, kwargs)
+
+    def _call(self, index: int, name: str, *args, **kwargs):
+        return self._scatter(name, {index: args}, kwargs)[index]
+
+    def _scatter(self, name: str, calls: Dict[int, tuple], kwargs: Optional[Dict[str, Any]] = None, partial: bool = False) -> Dict[int, Any]:
+        # Sends every request, then collects every reply. Shard locks are
+        # taken in shard order so concurrent scatters cannot deadlock. With
+        # partial, failed shards are logged and missing from the results
+        # instead of failing the whole call.
+        indexes = sorted(calls)
+        results = {}
+        errors = []
+        for index in indexes:
+            self._locks[index].acquire()
+        try:
+            sent = []
+            for index in indexes:
+                try:
+                    self._conns[index].send((name, calls[index], kwargs or {}))
+                    sent.append(index)
+                except (BrokenPipeError, OSError) as e:
+                    errors.append(f"shard {index}: {e}")
+            for index in sent:
+                try:
+                    ok, value = self._conns[index].recv()
+                except (EOFError, OSError):
+                    ok, value = False, "shard process is not running"
+                if ok:
+                    results[index] = value
+                else:
+                    errors.append(f"shard {index}: {value}")
+        finally:
+            for index in indexes:
+                self._locks[index].release()
+
+        if errors and partial:
+            logging.error(f"Sharded Engine Error: {name} failed on {'; '.join(errors)}")
+        elif errors:
+            raise RuntimeError(f"Sharded {name} failed ({'; '.join(errors)})")
+        return results
@@ -0,0 +1,101 @@
+import threading
+from collections import Counter
+from datetime import date, datetime
+from typing import Dict, Any, Iterable, Optional
+
+def _decrement(counter: Counter, key, amount: int = 1):
+    # Drops keys that reach zero so the counters only hold live buckets
+    remaining = counter[key] - amount
+    if remaining > 0:
+        counter[key] = remaining
+    else:
+        counter.pop(key, None)
+
+class ComplianceStats:
+    # Aggregates kept up to date as logs, consents and erasures happen, so
+    # reading them never rescans the log. Every update is O(1) per entry;
+    # snapshots cost O(activity types + days).
+    def __init__(self):
+        self.total_logs = 0
+        self.consented_logs = 0
+        self.erased_users = 0
+        self.purged_logs = 0
+        self.activity_counts: Counter = Counter()
+        self.daily_events: Counter = Counter()
+        self.pending_expiries: Counter = Counter()
+        # Per consent type: users with a current decision, and those granting
+        self.consent_decisions: Counter = Counter()
+        self.consent_granted: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record_log(self, entry: Dict[str, Any]):
+        with self._lock:
+            self.total_logs += 1
+            if entry['is_consent_given']:
+                self.consented_logs += 1
+            self.activity_counts[entry['activity_type']] += 1
+            self.daily_events[entry['timestamp'].date()] += 1
+            if entry.get('retention_period') is not None:
+                self.pending_expiries[entry['retention_period'].date()] += 1
+
+    def remove_logs(self, entries: Iterable[Dict[str, Any]], purged: bool = False):
+        with self._lock:
+            for entry in entries:
+                self.total_logs -= 1
+                if entry['is_consent_given']:
+                    self.consented_logs -= 1
+                if purged:
+                    self.purged_logs += 1
+                _decrement(self.activity_counts, entry['activity_type'])
+                _decrement(self.daily_events, entry['timestamp'].date())
+                if entry.get('retention_period') is not None:
+                    _decrement(self.pending_expiries, entry['retention_period'].date())
+
+    def record_consent(self, consent_type: str, previous: Optional[bool], status: bool):
+        # previous is the user's decision before this update, None if none
+        with self._lock:
+            if previous is None:
+                self.consent_decisions[consent_type] += 1
+            if status and not previous:
+                self.consent_granted[consent_type] += 1
+            elif previous and not status:
+                _decrement(self.consent_granted, consent_type)
+
+    def remove_consents(self, current: Dict[str, Dict[str, Any]]):
+        # current is ConsentStore.current(user_id) taken before deletion
+        with self._lock:
+            for consent_type, record in current.items():
+                _decrement(self.consent_decisions, consent_type)
+                if record['status']:
+                    _decrement(self.consent_granted, consent_type)
+
+    def record_erasure(self, users: int = 1):
+        with self._lock:
+            self.erased_users += users
+
+    def consent_rates(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                consent_type: self.consent_granted[consent_type] / decided
+                for consent_type, decided in self.consent_decisions.items()
+            }
+
+    def expiring_before(self, day: date) -> int:
+        with self._lock:
+            return sum(count for expiry_day, count in self.pending_expiries.items() if expiry_day < day)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'total_logs': self.total_logs,
+                'consented_logs': self.consented_logs,
+                'consented_log_rate': self.consented_logs / self.total_logs if self.total_logs else 0.0,
+                'erased_users': self.erased_users,
+                'purged_logs': self.purged_logs,
+                'activity_counts': dict(self.activity_counts),
+                'daily_events': dict(sorted(self.daily_events.items())),
+                'pending_expiries': dict(sorted(self.pending_expiries.items())),
+                'consent_decisions': dict(self.consent_decisions),
+                'consent_granted': {consent_type: self.consent_granted[consent_type] for consent_type in self.consent_decisions},
+                'generated_at': datetime.utcnow()
+            }
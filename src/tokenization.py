@@ -0,0 +1,289 @@
+import base64
+import hmac
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Iterable, Optional, Sequence
+
+import pandas as pd
+
+from src.config import DEFAULT_CONFIG_PATH
+
+TOKEN_PREFIX = 'tok_'
+# Fields pseudonymized by default, as in anonymize_record
+TOKENIZED_FIELDS = ('email', 'phone', 'address')
+DIGEST_BYTES = 16
+KEY_BYTES = 32
+DEFAULT_CACHE_SIZE = 100000
+# SQLite allows at most 999 bound parameters per statement on older builds
+MAX_IN_CLAUSE = 500
+
+PROJECT_DIR = os.path.dirname(DEFAULT_CONFIG_PATH)
+
+def is_token(value) -> bool:
+    return isinstance(value, str) and value.startswith(TOKEN_PREFIX)
+
+class LRUCache:
+    # Bounded mapping, least recently used entries are dropped first
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: OrderedDict = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        if key in self._items:
+            self._items.move_to_end(key)
+            return True
+        return False
+
+    def get(self, key, default=None):
+        value = self._items.get(key, default)
+        if key in self._items:
+            self._items.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def pop(self, key, default=None):
+        return self._items.pop(key, default)
+
+    def clear(self):
+        self._items.clear()
+
+class TokenVault:
+    # Deterministic, keyed pseudonymization. A value's token is an HMAC of
+    # its field and value, so equal values always get equal tokens (joins
+    # keep working) but tokens cannot be reversed or brute-forced without
+    # the key. The vault maps tokens back to values for legitimate
+    # re-identification; rows are kept per user so erasure can forget them.
+    #
+    # Bulk calls cost one SQLite round trip per batch; hot tokens are
+    # answered from in-memory LRU caches.
+    def __init__(self, path: str, key: bytes, cache_size: int = DEFAULT_CACHE_SIZE):
+        if len(key) != KEY_BYTES:
+            raise ValueError("Token key must be 32 bytes")
+        self.path = path
+        self._key = key
+        self._lock = threading.Lock()
+        # token -> value, and (token, user_id) pairs known to be stored
+        self._values = LRUCache(cache_size)
+        self._stored = LRUCache(cache_size)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ':memory:':
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tokens ("
+                "token TEXT NOT NULL, user_id TEXT NOT NULL DEFAULT '', field TEXT NOT NULL, value TEXT NOT NULL, "
+                "PRIMARY KEY (token, user_id)) WITHOUT ROWID"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS tokens_user_id ON tokens (user_id)")
+
+    def __reduce__(self):
+        raise TypeError("TokenVault holds a database connection; tokenize in the parent process")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(DISTINCT token) FROM tokens").fetchone()[0]
+
+    def token_for(self, field: str, value: Any) -> str:
+        # Pure function of the key, field and value; nothing is stored
+        digest = hmac.digest(self._key, f"{field}\x1f{value}".encode('utf-8'), 'sha256')
+        return TOKEN_PREFIX + base64.urlsafe_b64encode(digest[:DIGEST_BYTES]).decode('ascii').rstrip('=')
+
+    def tokenize(self, field: str, value: Any, user_id: Optional[str] = None) -> Optional[str]:
+        return self.tokenize_many(field, [value], [user_id])[0]
+
+    def tokenize_many(
+        self,
+        field: str,
+        values: Sequence[Any],
+        user_ids: Optional[Sequence[Optional[str]]] = None
+    ) -> List[Optional[str]]:
+        # None stays None; other values are stored as text
+        if user_ids is None:
+            user_ids = [None] * len(values)
+        rows = [(field, value, user_id) for value, user_id in zip(values, user_ids)]
+        return self._tokenize_rows(rows)
+
+    def tokenize_records(
+        self,
+        records: Iterable[Dict[str, Any]],
+        user_ids: Optional[Sequence[Optional[str]]] = None,
+        fields: Sequence[str] = TOKENIZED_FIELDS
+    ) -> List[Dict[str, Any]]:
+        # Copies of the records with the given fields tokenized, written to
+        # the vault in a single transaction. Rows belong to the record's
+        # user_id unless user_ids are passed.
+        records = list(records)
+        if user_ids is None:
+            user_ids = [record.get('user_id') for record in records]
+
+        rows, slots = [], []
+        for position, (record, user_id) in enumerate(zip(records, user_ids)):
+            for field in fields:
+                if record.get(field) is not None:
+                    rows.append((field, record[field], user_id))
+                    slots.append((position, field))
+
+        tokenized = [record.copy() for record in records]
+        for (position, field), token in zip(slots, self._tokenize_rows(rows)):
+            tokenized[position][field] = token
+        return tokenized
+
+    def tokenize_dataframe(self, df: pd.DataFrame, fields: Sequence[str] = TOKENIZED_FIELDS) -> pd.DataFrame:
+        # Column-wise tokenize_records; missing values stay missing
+        tokenized = df.copy()
+        user_ids = df['user_id'] if 'user_id' in df else pd.Series([None] * len(df), index=df.index)
+        for field in fields:
+            if field not in tokenized:
+                continue
+            present = tokenized[field].notna()
+            tokens = self.tokenize_many(field, tokenized.loc[present, field].tolist(), user_ids[present].tolist())
+            tokenized[field] = tokenized[field].astype(object)
+            tokenized.loc[present, field] = tokens
+        return tokenized
+
+    def detokenize(self, token: str) -> Optional[str]:
+        return self.detokenize_many([token])[0]
+
+    def detokenize_many(self, tokens: Sequence[Optional[str]]) -> List[Optional[str]]:
+        # Original values, None for unknown (or forgotten) tokens
+        with self._lock:
+            found = {}
+            missing = []
+            for token in dict.fromkeys(tokens):
+                if token is None:
+                    continue
+                value = self._values.get(token)
+                if value is None:
+                    missing.append(token)
+                else:
+                    found[token] = value
+
+            for start in range(0, len(missing), MAX_IN_CLAUSE):
+                chunk = missing[start:start + MAX_IN_CLAUSE]
+                query = f"SELECT token, value FROM tokens WHERE token IN ({','.join('?' * len(chunk))})"
+                for token, value in self._conn.execute(query, chunk):
+                    found[token] = value
+                    self._values.put(token, value)
+        return [found.get(token) for token in tokens]
+
+    def detokenize_records(
+        self,
+        records: Iterable[Dict[str, Any]],
+        fields: Sequence[str] = TOKENIZED_FIELDS
+    ) -> List[Dict[str, Any]]:
+        # Copies with every known token under the given fields restored
+        records = [record.copy() for record in records]
+        slots = [(record, field) for record in records for field in fields if is_token(record.get(field))]
+        values = self.detokenize_many([record[field] for record, field in slots])
+        for (record, field), value in zip(slots, values):
+            if value is not None:
+                record[field] = value
+        return records
+
+    def forget_users(self, user_ids: Iterable[str]) -> int:
+        # Erasure: the users' tokens can no longer be resolved through them
+        user_ids = list(user_ids)
+        with self._lock:
+            forgotten = 0
+            with self._conn:
+                for start in range(0, len(user_ids), MAX_IN_CLAUSE):
+                    chunk = user_ids[start:start + MAX_IN_CLAUSE]
+                    placeholders = ','.join('?' * len(chunk))
+                    tokens = self._conn.execute(f"SELECT token, user_id FROM tokens WHERE user_id IN ({placeholders})", chunk).fetchall()
+                    self._conn.execute(f"DELETE FROM tokens WHERE user_id IN ({placeholders})", chunk)
+                    for token, user_id in tokens:
+                        # Shared values may still resolve through other users
+                        self._values.pop(token)
+                        self._stored.pop((token, user_id))
+                    forgotten += len(tokens)
+        return forgotten
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _tokenize_rows(self, rows) -> List[Optional[str]]:
+        # rows are (field, value, user_id); new ones are written with one
+        # executemany in one transaction
+        tokens = []
+        pending = {}
+        with self._lock:
+            for field, value, user_id in rows:
+                if value is None:
+                    tokens.append(None)
+                    continue
+                value = str(value)
+                token = self.token_for(field, value)
+                tokens.append(token)
+                key = (token, user_id or '')
+                if key not in self._stored:
+                    pending[key] = (token, user_id or '', field, value)
+
+            if pending:
+                with self._conn:
+                    self._conn.executemany("INSERT OR IGNORE INTO tokens (token, user_id, field, value) VALUES (?, ?, ?, ?)", pending.values())
+                for key, (token, _, _, value) in pending.items():
+                    self._stored.put(key, True)
+                    self._values.put(token, value)
+        return tokens
+
+def load_token_key(config: Dict[str, Any]) -> bytes:
+    # Key as urlsafe base64, from the environment or the key file; the
+    # key file is created on first use
+    settings = config.get('tokenization', {})
+    encoded = os.environ.get(settings.get('key_env') or 'GDPR_TOKEN_KEY')
+    if not encoded:
+        path = os.path.join(PROJECT_DIR, settings['key_file'])
+        try:
+            with open(path) as key_file:
+                encoded = key_file.read().strip()
+        except FileNotFoundError:
+            encoded = _create_key_file(path)
+    return base64.urlsafe_b64decode(encoded)
+
+def _create_key_file(path: str) -> str:
+    # Written aside and linked into place, so a concurrent reader never
+    # sees a partial key and the first writer wins
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    encoded = base64.urlsafe_b64encode(os.urandom(KEY_BYTES)).decode('ascii')
+    staging = f"{path}.{os.getpid()}.{threading.get_ident()}"
+    descriptor = os.open(staging, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(descriptor, 'w') as key_file:
+        key_file.write(encoded)
+    try:
+        os.link(staging, path)
+        logging.warning(f"Created a new tokenization key at {path}")
+    except FileExistsError:
+        with open(path) as key_file:
+            encoded = key_file.read().strip()
+    finally:
+        os.remove(staging)
+    return encoded
+
+def load_token_vault(config: Dict[str, Any], path: Optional[str] = None) -> TokenVault:
+    # Relative paths are resolved against the project directory
+    settings = config['tokenization']
+    path = path or settings['vault_path']
+    if path == ':memory:':
+        # Nothing outlives the process, so neither does the key unless one
+        # is configured in the environment
+        key_env = settings.get('key_env') or 'GDPR_TOKEN_KEY'
+        key = load_token_key(config) if os.environ.get(key_env) else os.urandom(KEY_BYTES)
+    else:
+        path = os.path.join(PROJECT_DIR, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        key = load_token_key(config)
+    return TokenVault(path, key, cache_size=int(settings['cache_size']))
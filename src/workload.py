@@ -0,0 +1,159 @@
+import random
+import uuid
+from datetime import datetime, timedelta
+from itertools import accumulate, chain
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Sequence
+
+from src.anonymization import chunked
+
+# The activity types the app logs, with a rough production mix: logins
+# dominate, access requests are rare
+ACTIVITY_TYPES = ('authentication', 'transaction_processing', 'data_access_request', 'consent_update')
+ACTIVITY_WEIGHTS = (0.6, 0.3, 0.02, 0.08)
+DEFAULT_CONSENT_TYPES = ('data_processing', 'marketing', 'analytics')
+DEFAULT_START = datetime(2025, 4, 8)
+
+# Random draws are made per block from a generator seeded with the block
+# number, so the data does not depend on the batch size it is read in
+BLOCK_SIZE = 65536
+# Chance that a user has decided on a consent type, and that the decision
+# was a grant
+CONSENT_DECIDED = 0.7
+CONSENT_GRANTED = 0.6
+
+class ZipfSampler:
+    # Ranks 0..n-1 with P(k) proportional to 1 / (k + 1) ** skew, so rank 0
+    # is the heaviest user
+    def __init__(self, n: int, skew: float = 1.0):
+        if n < 1:
+            raise ValueError("ZipfSampler needs at least one rank")
+        self.n = n
+        self.skew = skew
+        self._ranks = range(n)
+        self._cum_weights = list(accumulate(1.0 / rank ** skew for rank in range(1, n + 1)))
+
+    def sample(self, rng: random.Random, k: int) -> List[int]:
+        return rng.choices(self._ranks, cum_weights=self._cum_weights, k=k)
+
+    def share(self, top: int) -> float:
+        # Fraction of draws that land on the top ranks
+        return self._cum_weights[min(top, self.n) - 1] / self._cum_weights[-1]
+
+class WorkloadGenerator:
+    # Reproducible synthetic users, consent histories and processing events.
+    # The same seed and parameters always give the same data. Events pick
+    # their user with Zipfian skew, so a few heavy users own most of the
+    # log, as in production. Everything is produced in batches, so millions
+    # of rows never have to be held at once.
+    def __init__(
+        self,
+        users: int = 100000,
+        seed: int = 0,
+        skew: float = 1.0,
+        consent_types: Optional[Sequence[str]] = None,
+        activity_types: Sequence[str] = ACTIVITY_TYPES,
+        activity_weights: Sequence[float] = ACTIVITY_WEIGHTS,
+        start: datetime = DEFAULT_START,
+        interval: timedelta = timedelta(milliseconds=10)
+    ):
+        self.user_count = users
+        self.seed = seed
+        self.sampler = ZipfSampler(users, skew)
+        self.consent_types = tuple(consent_types or DEFAULT_CONSENT_TYPES)
+        self.activity_types = tuple(activity_types)
+        self._activity_weights = list(accumulate(activity_weights))
+        self.start = start
+        self.interval = interval
+
+    @staticmethod
+    def user_id(index: int) -> str:
+        return f"user{index}"
+
+    def personal_record(self, index: int) -> Dict[str, Any]:
+        # Derived from the index alone, no random state needed
+        user_id = self.user_id(index)
+        return {
+            'user_id': user_id,
+            'username': user_id,
+            'email': f"{user_id}@example.com",
+            'phone': f"555{index * 7919 % 10000000:07d}",
+            'address': f"{index % 999 + 1} Privacy Street",
+            'age': 18 + index * 31 % 60,
+            'transaction_details': {'amount': f"${index % 500 + 0.99:.2f}"},
+            'created_at': (self.start - timedelta(days=index % 730)).isoformat()
+        }
+
+    def users(self, batch_size: int = 10000) -> Iterator[List[Dict[str, Any]]]:
+        for start in range(0, self.user_count, batch_size):
+            yield [self.personal_record(index) for index in range(start, min(start + batch_size, self.user_count))]
+
+    def consents(self, batch_size: int = 10000) -> Iterator[List[Dict[str, Any]]]:
+        # One record per decision, in the ConsentStore.update shape
+        return self._rebatch(self._consent_blocks(), batch_size)
+
+    def user_sample(self, rng: random.Random, k: int) -> List[str]:
+        # Zipf-skewed user ids, for reads that should hit the same heavy
+        # users as the writes
+        return [self.user_id(rank) for rank in self.sampler.sample(rng, k)]
+
+    def events(self, count: int, batch_size: int = 10000) -> Iterator[List[Dict[str, Any]]]:
+        # Events in the shape log_data_processing_activities takes
+        blocks = (self._event_block(block, min(BLOCK_SIZE, count - block * BLOCK_SIZE)) for block in range((count + BLOCK_SIZE - 1) // BLOCK_SIZE))
+        return self._rebatch(blocks, batch_size)
+
+    def _rng(self, stream: str, block: int) -> random.Random:
+        # String seeds are hashed with SHA-512, so this is stable across runs
+        return random.Random(f"{self.seed}:{stream}:{block}")
+
+    def _consent_blocks(self) -> Iterator[List[Dict[str, Any]]]:
+        for block, first in enumerate(range(0, self.user_count, BLOCK_SIZE)):
+            rng = self._rng('consents', block)
+            records = []
+            for index in range(first, min(first + BLOCK_SIZE, self.user_count)):
+                user_id = self.user_id(index)
+                timestamp = self.start - timedelta(days=index % 365)
+                for consent_type in self.consent_types:
+                    if rng.random() < CONSENT_DECIDED:
+                        records.append({
+                            'user_id': user_id,
+                            'type': consent_type,
+                            'status': rng.random() < CONSENT_GRANTED,
+                            'timestamp': timestamp
+                        })
+            yield records
+
+    def _event_block(self, block: int, size: int) -> List[Dict[str, Any]]:
+        rng = self._rng('events', block)
+        ranks = self.sampler.sample(rng, size)
+        activities = rng.choices(self.activity_types, cum_weights=self._activity_weights, k=size)
+        first = block * BLOCK_SIZE
+
+        events = []
+        for offset, (rank, activity_type) in enumerate(zip(ranks, activities)):
+            user_id = self.user_id(rank)
+            occurred_at = (self.start + self.interval * (first + offset)).isoformat()
+            events.append({
+                'user_id': user_id,
+                'activity_type': activity_type,
+                'data_processed': self._payload(rng, user_id, activity_type, occurred_at)
+            })
+        return events
+
+    def _payload(self, rng: random.Random, user_id: str, activity_type: str, occurred_at: str) -> Dict[str, Any]:
+        # Same fields as the app's demo entries
+        if activity_type == 'authentication':
+            address = rng.getrandbits(24)
+            return {'username': user_id, 'login_time': occurred_at, 'ip': f"10.{address >> 16}.{address >> 8 & 255}.{address & 255}"}
+        if activity_type == 'transaction_processing':
+            return {
+                'amount': f"${rng.randint(100, 50000) / 100:.2f}",
+                'item_count': rng.randint(1, 5),
+                'transaction_id': str(uuid.UUID(int=rng.getrandbits(128), version=4))
+            }
+        if activity_type == 'consent_update':
+            return {'consent_type': rng.choice(self.consent_types), 'status': rng.random() < CONSENT_GRANTED}
+        return {'request_time': occurred_at}
+
+    @staticmethod
+    def _rebatch(blocks: Iterable[List[Dict[str, Any]]], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+        return chunked(chain.from_iterable(blocks), batch_size)
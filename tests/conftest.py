@@ -0,0 +1,24 @@
+import pytest
+import yaml
+
+from src.config import load_config
+
+@pytest.fixture(scope="session", autouse=True)
+def isolated_config(tmp_path_factory):
+    # Engines built by the tests keep their token vaults and key in a
+    # temporary directory instead of the project's data directory. The
+    # config goes through GDPR_CONFIG so spawned shard processes see it too.
+    directory = tmp_path_factory.mktemp("gdpr")
+    config = load_config()
+    config['tokenization'].update({
+        'vault_path': str(directory / "token_vault.db"),
+        'key_file': str(directory / "token_vault.key")
+    })
+    config['sharding']['token_vault_path'] = str(directory / "token_vault-{shard}.db")
+    path = directory / "config.yaml"
+    with open(path, 'w') as config_file:
+        yaml.safe_dump(config, config_file)
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv('GDPR_CONFIG', str(path))
+        yield path
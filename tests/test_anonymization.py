@@ -0,0 +1,47 @@
+import hashlib
+
+import pandas as pd
+
+from src.anonymization import anonymize_record, anonymize_batch, anonymize_records, REDACTED_ADDRESS
+
+RECORDS = [
+    {"user_id": "user1", "email": "a@example.com", "phone": "1234567890", "address": "1 Privacy Street"},
+    {"user_id": "user2", "email": "b@example.com", "phone": "555"},
+    {"user_id": "user3", "address": "3 Privacy Street"},
+]
+
+def test_record_rules():
+    anonymized = anonymize_record(RECORDS[0])
+
+    assert anonymized['email'] == hashlib.sha256(b"a@example.com").hexdigest()
+    assert anonymized['phone'] == '*' * 10
+    assert anonymized['address'] == REDACTED_ADDRESS
+    assert RECORDS[0]['email'] == "a@example.com"
+
+def test_iterable_batch_matches_per_record_path():
+    expected = [anonymize_record(record) for record in RECORDS]
+
+    assert anonymize_batch(RECORDS, max_workers=1) == expected
+    assert list(anonymize_records(iter(RECORDS), max_workers=2, chunk_size=1)) == expected
+
+def test_dataframe_batch_matches_per_record_path():
+    df = pd.DataFrame([RECORDS[0], RECORDS[0], RECORDS[1]])
+
+    anonymized = anonymize_batch(df, max_workers=2)
+
+    expected = [anonymize_record(record) for record in (RECORDS[0], RECORDS[0])]
+    assert anonymized.iloc[:2].to_dict('records') == expected
+    assert anonymized.loc[2, 'email'] == anonymize_record(RECORDS[1])['email']
+    assert anonymized.loc[2, 'phone'] == '***'
+    assert (anonymized.loc[:1, 'address'] == REDACTED_ADDRESS).all()
+    # A missing address stays missing, as in anonymize_record
+    assert pd.isna(anonymized.loc[2, 'address'])
+    assert df.loc[0, 'email'] == "a@example.com"
+
+def test_dataframe_with_only_missing_values():
+    df = pd.DataFrame([{"user_id": "user3", "email": float("nan"), "phone": float("nan"), "address": float("nan")}] * 2)
+
+    anonymized = anonymize_batch(df, max_workers=1)
+
+    assert anonymized['user_id'].tolist() == ["user3", "user3"]
+    assert anonymized[['email', 'phone', 'address']].isna().all().all()
@@ -0,0 +1,159 @@
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from src.audit import (
+    AuditTrail, AuditTrailFile, MerkleTree, EMPTY_ROOT,
+    deletion_record, entry_record, leaf_hash, node_hash, verify_consistency, verify_inclusion
+)
+from src.data_protection import DataProtectionModel, EncryptoDataProtectionEngine
+
+DATABASE_URL = "sqlite:///:memory:"
+
+def make_entry(user_id, data_processed=None, retention_days=730):
+    now = datetime.utcnow()
+    return {
+        'id': str(uuid.uuid4()),
+        'user_id': user_id,
+        'activity_type': 'authentication',
+        'timestamp': now,
+        'data_processed': data_processed or {},
+        'is_consent_given': True,
+        'retention_period': now + timedelta(days=retention_days)
+    }
+
+def reference_root(leaves):
+    # RFC 9162 MTH, straight from the definition
+    if not leaves:
+        return EMPTY_ROOT
+    if len(leaves) == 1:
+        return leaves[0]
+    k = 1 << ((len(leaves) - 1).bit_length() - 1)
+    return node_hash(reference_root(leaves[:k]), reference_root(leaves[k:]))
+
+def test_roots_and_proofs_match_the_reference():
+    leaves = [leaf_hash(str(i).encode()) for i in range(33)]
+    tree = MerkleTree()
+    for leaf in leaves:
+        tree.append(leaf)
+
+    for size in range(1, len(leaves) + 1):
+        root = tree.root(size)
+        assert root == reference_root(leaves[:size])
+        for index in range(size):
+            assert verify_inclusion(leaves[index], index, size, tree.inclusion_proof(index, size), root)
+        for old_size in range(size + 1):
+            proof = tree.consistency_proof(old_size, size)
+            assert verify_consistency(old_size, size, tree.root(old_size), root, proof)
+
+    proof = tree.inclusion_proof(5)
+    assert not verify_inclusion(leaves[6], 5, len(leaves), proof, tree.root())
+    assert not verify_consistency(7, 20, leaves[0], tree.root(20), tree.consistency_proof(7, 20))
+
+def test_truncate_drops_covering_nodes():
+    tree = MerkleTree()
+    leaves = [leaf_hash(bytes([i])) for i in range(20)]
+    for leaf in leaves:
+        tree.append(leaf)
+
+    tree.truncate(13)
+    tree.append(leaves[13])
+    assert tree.root() == reference_root(leaves[:14])
+
+def test_incremental_verification_detects_tampering():
+    stored = {}
+    trail = AuditTrail()
+    for i in range(10):
+        entry = make_entry(f"user{i % 2}", {"n": i})
+        stored[entry['id']] = entry
+        trail.append(entry_record(entry))
+
+    lookup = lambda log_ids: [stored[log_id] for log_id in log_ids if log_id in stored]
+    result = trail.verify(lookup, stored_count=len(stored))
+    assert result['status'] == 'success' and result['verified'] == 10
+    checkpoint = result['checkpoint']
+
+    newer = make_entry("user0", {"n": 10})
+    stored[newer['id']] = newer
+    trail.append(entry_record(newer))
+    erased = [log_id for log_id, entry in stored.items() if entry['user_id'] == "user1"]
+    for log_id in erased:
+        del stored[log_id]
+    trail.append(deletion_record(erased))
+
+    # Only the entry logged after the checkpoint is re-hashed
+    result = trail.verify(lookup, since=checkpoint, stored_count=len(stored))
+    assert result['status'] == 'success' and result['verified'] == 1
+
+    stored[newer['id']] = dict(newer, is_consent_given=False)
+    del stored[next(iter(stored))]
+    result = trail.verify(lookup, stored_count=len(stored))
+    problems = {problem['problem'] for problem in result['problems']}
+    assert result['status'] == 'error'
+    assert {'modified', 'missing'} <= problems
+
+def test_rewritten_history_fails_the_checkpoint():
+    trail = AuditTrail([entry_record(make_entry("alice")) for _ in range(5)])
+    checkpoint = trail.checkpoint()
+
+    forged = AuditTrail([entry_record(make_entry("alice")) for _ in range(6)])
+    result = forged.verify(lambda log_ids: [], since=checkpoint)
+    assert result['problems'][0]['problem'] == 'history_rewritten'
+
+def test_proofs_verify_against_the_root():
+    entries = [make_entry("alice", {"n": i}) for i in range(100)]
+    trail = AuditTrail(entry_record(entry) for entry in entries)
+
+    proof = trail.prove(entries[42]['id'])
+    assert proof['index'] == 42 and len(proof['proof']) == 7
+    assert verify_inclusion(
+        bytes.fromhex(proof['leaf']),
+        proof['index'],
+        proof['size'],
+        [bytes.fromhex(node) for node in proof['proof']],
+        bytes.fromhex(proof['root'])
+    )
+    assert trail.prove(str(uuid.uuid4())) is None
+
+def test_trail_file_survives_reopen_and_torn_tail(tmp_path):
+    path = str(tmp_path / "audit.trail")
+    trail_file = AuditTrailFile(path)
+    trail = trail_file.load()
+    for i in range(5):
+        trail.append(entry_record(make_entry("alice", {"n": i})))
+    checkpoint = trail.checkpoint()
+    trail.append(deletion_record([str(uuid.uuid4())]))
+    trail_file.close()
+
+    with open(path, 'r+b') as raw:
+        raw.truncate(raw.seek(0, 2) - 5)
+
+    reopened_file = AuditTrailFile(path)
+    reopened = reopened_file.load()
+    assert reopened.checkpoint() == checkpoint
+    reopened_file.close()
+
+def test_sql_engine_records_appends_erasures_and_purges():
+    with EncryptoDataProtectionEngine(DATABASE_URL, buffered=True, flush_interval=None, audit=True, crypto_shredding=False) as engine:
+        for i in range(6):
+            engine.log_data_processing_activity(f"user{i % 3}", "authentication", {"n": i})
+        assert engine.verify_audit_trail()['verified'] == 6
+
+        engine.right_to_be_forgotten("user1")
+        engine.log_data_processing_activity("user0", "authentication", {"n": 6})
+        assert engine.purge_expired(datetime.utcnow() - timedelta(days=1)) == 0
+        result = engine.verify_audit_trail()
+        assert result['status'] == 'success' and result['verified'] == 1
+
+        log_id = engine.get_logs("user2")[0].id
+        proof = engine.prove_log_entry(log_id)
+        assert proof['size'] == len(engine.audit)
+
+        session = engine.SessionLocal()
+        session.execute(update(DataProtectionModel).where(DataProtectionModel.id == log_id).values(activity_type='edited'))
+        session.commit()
+        session.close()
+
+        result = engine.verify_audit_trail(full=True)
+        assert result['problems'] == [{'log_id': log_id, 'problem': 'modified'}]
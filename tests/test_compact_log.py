@@ -0,0 +1,54 @@
+import uuid
+from datetime import datetime, timedelta
+
+from src.compact_log import CompactLogStore
+
+def make_entry(user_id, activity_type, data_processed=None):
+    now = datetime.utcnow()
+    return {
+        'id': str(uuid.uuid4()),
+        'user_id': user_id,
+        'activity_type': activity_type,
+        'timestamp': now,
+        'data_processed': data_processed or {},
+        'is_consent_given': True,
+        'retention_period': now + timedelta(days=730)
+    }
+
+def test_entries_round_trip():
+    store = CompactLogStore()
+    entry = make_entry("alice", "authentication", {"username": "jdoe", "item_count": 3})
+    store.append(dict(entry))
+
+    assert store.query(user_id="alice") == [entry]
+    assert store.get(entry['id']) == entry
+    assert store.get(str(uuid.uuid4())) is None
+    assert list(store) == [entry]
+
+def test_delete_user_and_single_entry():
+    store = CompactLogStore()
+    first = store.append(make_entry("alice", "authentication"))
+    store.append(make_entry("alice", "data_access_request"))
+    bob = store.append(make_entry("bob", "authentication"))
+
+    assert len(store.delete_user("alice")) == 2
+    assert len(store) == 1
+    assert store.get(first['id']) is None
+    assert store.activity_types() == ["authentication"]
+    assert store.query(activity_type="authentication") == [bob]
+
+    assert store.delete(bob['id']) == bob
+    assert len(store) == 0
+    assert store.user_ids() == []
+
+def test_compact_drops_dead_rows():
+    store = CompactLogStore()
+    for i in range(10):
+        store.append(make_entry(f"user{i % 2}", "authentication"))
+    store.delete_user("user0")
+
+    store.compact()
+
+    assert len(store) == 5
+    assert len(store._flags) == 5
+    assert [log['user_id'] for log in store.query(activity_type="authentication")] == ["user1"] * 5
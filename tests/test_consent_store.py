@@ -0,0 +1,62 @@
+from src.consent_store import ConsentStore
+from src.data_protection import EncryptoDataProtectionEngine
+
+def test_consent_types_are_tracked_independently():
+    store = ConsentStore(["data_processing", "marketing"])
+    store.update("alice", "data_processing", True)
+    store.update("alice", "marketing", True)
+    store.update("alice", "marketing", False)
+
+    assert store.check("alice", "data_processing")
+    assert not store.check("alice", "marketing")
+    assert not store.check("alice", "analytics")
+    assert store.granted_types("alice") == ["data_processing"]
+    assert [(r['type'], r['status']) for r in store.history("alice")] == [
+        ("data_processing", True), ("marketing", True), ("marketing", False)
+    ]
+    assert store.current("alice")['marketing']['status'] is False
+
+def test_bulk_check_and_erasure():
+    store = ConsentStore()
+    store.update("alice", "analytics", True)
+    store.update("bob", "analytics", False)
+
+    assert store.check_consents(["alice", "bob", "carol"], "analytics") == [True, False, False]
+    assert store.check_consents(["alice"], "unknown") == [False]
+
+    assert len(store.delete_user("alice")) == 1
+    assert "alice" not in store
+    assert store.check_consents(["alice", "bob"], "analytics") == [False, False]
+
+def test_sqlalchemy_consents_are_reloaded(tmp_path):
+    database_url = f"sqlite:///{tmp_path / 'gdpr.db'}"
+    engine = EncryptoDataProtectionEngine(database_url)
+    engine.store_consent("user123", "data_processing", True)
+    engine.store_consent("user123", "marketing", True)
+    engine.store_consent("user123", "marketing", False)
+    engine.close()
+
+    reloaded = EncryptoDataProtectionEngine(database_url)
+    consent_manager = reloaded.gdpr_manager.consent_manager
+
+    assert consent_manager.check_consent("user123")
+    assert not consent_manager.check_consent("user123", "marketing")
+    assert reloaded.log_data_processing_activity("user123", "authentication", {})['is_consent_given']
+
+    reloaded.right_to_be_forgotten("user123")
+    assert not consent_manager.check_consent("user123")
+    reloaded.close()
+
+def test_manager_consents_are_persisted(tmp_path):
+    database_url = f"sqlite:///{tmp_path / 'gdpr.db'}"
+    engine = EncryptoDataProtectionEngine(database_url)
+    assert engine.gdpr_manager.manage_user_consent("user123", "marketing")
+    engine.gdpr_manager.consent_manager.update_consent("user123", "analytics", status=False)
+    engine.close()
+
+    reloaded = EncryptoDataProtectionEngine(database_url)
+    consent_manager = reloaded.gdpr_manager.consent_manager
+
+    assert consent_manager.check_consent("user123", "marketing")
+    assert [(entry['type'], entry['status']) for entry in consent_manager.store.history("user123")] == [("marketing", True), ("analytics", False)]
+    reloaded.close()
@@ -0,0 +1,107 @@
+import os
+
+from src.crypto_shredding import ENCRYPTED_FIELD, Keyring, SQLiteKeyStore, is_encrypted, shredded_payload
+from src.data_protection import DataProtectionModel, EncryptoDataProtectionEngine, UserKeyModel
+
+def test_round_trip_and_shred():
+    keyring = Keyring(cache_size=1)
+    sealed = keyring.encrypt("alice", {"email": "alice@example.com"})
+    other = keyring.encrypt("bob", {"email": "bob@example.com"})
+
+    assert is_encrypted(sealed)
+    assert "alice@example.com" not in sealed[ENCRYPTED_FIELD]
+    # alice's cipher was evicted from the cache and is rebuilt from the key
+    assert keyring.decrypt("alice", sealed) == {"email": "alice@example.com"}
+    assert keyring.decrypt_batch([("alice", sealed), ("bob", other), ("carol", {"plain": 1})]) == [
+        {"email": "alice@example.com"}, {"email": "bob@example.com"}, {"plain": 1}
+    ]
+
+    assert keyring.shred("alice")
+    assert not keyring.has_key("alice")
+    assert keyring.decrypt("alice", sealed) == shredded_payload()
+    assert keyring.decrypt("bob", other) == {"email": "bob@example.com"}
+
+def test_ciphertext_is_bound_to_its_user():
+    keyring = Keyring()
+    sealed = keyring.encrypt("alice", {"n": 1})
+    keyring.encrypt("bob", {"n": 2})
+
+    assert keyring.decrypt("bob", sealed) == shredded_payload()
+
+def test_sql_engine_erasure_destroys_keys_only():
+    engine = EncryptoDataProtectionEngine("sqlite:///:memory:", crypto_shredding=True, master_key=os.urandom(32))
+    engine.log_data_processing_activity("alice", "authentication", {"username": "alice"})
+    engine.log_data_processing_activity("bob", "authentication", {"username": "bob"})
+    engine.store_personal_data("alice", {"email": "alice@example.com"})
+
+    session = engine.SessionLocal()
+    stored = [row.data_processed for row in session.query(DataProtectionModel)]
+    session.close()
+    assert all(is_encrypted(payload) for payload in stored)
+
+    assert [log.data_processed for log in engine.get_logs("alice")] == [{"username": "alice"}]
+    assert engine.retrieve_personal_data_batch(["alice"]) == {"alice": {"email": "alice@example.com"}}
+
+    assert engine.right_to_be_forgotten("alice")['status'] == 'success'
+
+    # The log row stays until retention purges it, but reads as erased
+    assert [log.data_processed for log in engine.get_logs("alice")] == [shredded_payload()]
+    assert [log['data_processed'] for chunk in engine.iter_logs() for log in chunk] == [
+        shredded_payload(), {"username": "bob"}
+    ]
+    assert engine.retrieve_personal_data_batch(["alice"]) == {}
+    engine.close()
+
+def test_sqlite_keys_survive_reopen_and_shred(tmp_path):
+    path = str(tmp_path / "user_keys.db")
+    keys = SQLiteKeyStore(path)
+    sealed = Keyring(keys).encrypt("alice", {"n": 1})
+    other = Keyring(keys).encrypt("bob", {"n": 2})
+    keys.close()
+
+    reopened = SQLiteKeyStore(path)
+    keyring = Keyring(reopened)
+    assert keyring.decrypt("alice", sealed) == {"n": 1}
+
+    assert keyring.shred("alice")
+    assert len(reopened) == 1
+    assert Keyring(reopened).decrypt("alice", sealed) == shredded_payload()
+    assert Keyring(reopened).decrypt("bob", other) == {"n": 2}
+    reopened.close()
+
+def test_sql_user_keys_are_wrapped_and_follow_master_key_rotation(tmp_path):
+    database_url = f"sqlite:///{tmp_path / 'gdpr.db'}"
+    old_master_key, new_master_key = os.urandom(32), os.urandom(32)
+    engine = EncryptoDataProtectionEngine(database_url, crypto_shredding=True, master_key=old_master_key)
+    engine.log_data_processing_activity("alice", "authentication", {"username": "alice"})
+    engine.log_data_processing_activity("bob", "authentication", {"username": "bob"})
+
+    session = engine.SessionLocal()
+    stored = {row.user_id: row.key for row in session.query(UserKeyModel)}
+    session.close()
+    # A copy of the database alone holds no usable key
+    assert all(len(key) == 40 for key in stored.values())
+    assert engine.keyring.keys.get("alice") not in stored.values()
+    assert engine.engine.connect().exec_driver_sql("PRAGMA secure_delete").scalar() == 1
+
+    assert engine.rotate_master_key(new_master_key) == 2
+    engine.right_to_be_forgotten("bob")
+    engine.close()
+
+    reopened = EncryptoDataProtectionEngine(database_url, crypto_shredding=True, master_key=new_master_key)
+    assert [log.data_processed for log in reopened.get_logs("alice")] == [{"username": "alice"}]
+    assert [log.data_processed for log in reopened.get_logs("bob")] == [shredded_payload()]
+    reopened.close()
+
+def test_sqlite_key_store_wraps_with_a_master_key(tmp_path):
+    path = str(tmp_path / "user_keys.db")
+    master_key = os.urandom(32)
+    keys = SQLiteKeyStore(path, master_key=master_key)
+    sealed = Keyring(keys).encrypt("alice", {"n": 1})
+    stored = keys._conn.execute("SELECT key FROM user_keys").fetchone()[0]
+    keys.close()
+
+    assert len(stored) == 40
+    reopened = SQLiteKeyStore(path, master_key=master_key)
+    assert Keyring(reopened).decrypt("alice", sealed) == {"n": 1}
+    reopened.close()
@@ -0,0 +1,75 @@
+from datetime import datetime
+
+from src.data_protection import EncryptoDataProtectionEngine
+
+DATABASE_URL = "sqlite:///:memory:"
+
+def test_unbuffered_logging_writes_immediately():
+    engine = EncryptoDataProtectionEngine(DATABASE_URL)
+
+    entry = engine.log_data_processing_activity("user123", "authentication", {"username": "john_doe"})
+
+    logs = engine.get_logs("user123")
+    assert [log.id for log in logs] == [entry['id']]
+    assert logs[0].data_processed == {"username": "john_doe"}
+    engine.close()
+
+def test_buffered_logging_flushes_on_batch_size():
+    engine = EncryptoDataProtectionEngine(DATABASE_URL, buffered=True, flush_size=10, flush_interval=None)
+
+    for i in range(25):
+        engine.log_data_processing_activity(f"user{i % 2}", "authentication", {"n": i})
+
+    assert len(engine.log_writer) == 5
+    assert engine.flush() == 5
+    assert len(engine.get_logs()) == 25
+    engine.close()
+
+def test_buffered_rows_are_erased_and_close_flushes():
+    with EncryptoDataProtectionEngine(DATABASE_URL, buffered=True, flush_interval=None) as engine:
+        engine.log_data_processing_activity("user123", "authentication", {})
+        engine.log_data_processing_activity("user456", "authentication", {})
+
+        assert engine.right_to_be_forgotten("user123")['status'] == 'success'
+        engine.log_data_processing_activity("user456", "data_access_request", {})
+
+    assert len(engine.log_writer) == 0
+    assert [log.user_id for log in engine.get_logs()] == ["user456", "user456"]
+
+class UnavailableSession:
+    def execute(self, *args, **kwargs):
+        raise ConnectionError("database is unavailable")
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+def test_buffer_is_capped_while_flushes_fail():
+    with EncryptoDataProtectionEngine(DATABASE_URL, buffered=True, flush_size=10, flush_interval=None, max_buffer_size=25) as engine:
+        session_factory = engine.log_writer.SessionLocal
+        engine.log_writer.SessionLocal = UnavailableSession
+
+        results = [engine.log_data_processing_activity("user123", "authentication", {"n": i}) for i in range(40)]
+
+        # Failed flushes keep their rows, new rows are refused past the cap
+        assert len(engine.log_writer) == 25
+        assert all(results[:25]) and not any(results[25:])
+        assert engine.log_data_processing_activities([{'user_id': "user123", 'activity_type': "login"}]) is None
+
+        engine.log_writer.SessionLocal = session_factory
+        assert engine.flush() == 25
+        assert engine.log_data_processing_activity("user123", "authentication", {}) is not None
+
+def test_a_row_the_database_refuses_does_not_block_the_buffer():
+    with EncryptoDataProtectionEngine(DATABASE_URL, buffered=True, flush_size=10, flush_interval=None, max_buffer_size=30) as engine:
+        # A datetime cannot be stored in the JSON column
+        assert engine.log_data_processing_activity("user123", "authentication", {"at": datetime.utcnow()}) is not None
+        results = [engine.log_data_processing_activity("user123", "authentication", {"n": i}) for i in range(100)]
+        engine.flush()
+
+        assert all(results)
+        assert len(engine.log_writer) == 0
+        assert sorted(log.data_processed['n'] for log in engine.get_logs("user123")) == list(range(100))
+        assert engine.verify_audit_trail()['status'] == 'success'
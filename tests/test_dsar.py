@@ -0,0 +1,45 @@
+from src.anonymization import anonymize_record
+from src.data_protection import EncryptoDataProtectionEngine
+from src.dsar import process_access_requests
+
+USERS = {
+    f"user{i}": {"user_id": f"user{i}", "email": f"user{i}@example.com", "phone": "1234567890"}
+    for i in range(10)
+}
+
+def test_batches_are_fetched_once_and_streamed():
+    fetched = []
+
+    def fetch_batch(user_ids):
+        fetched.append(list(user_ids))
+        return {user_id: USERS[user_id] for user_id in user_ids if user_id in USERS}
+
+    results = list(process_access_requests(["user1", "user2", "missing", "user1"], fetch_batch, batch_size=2))
+
+    assert fetched == [["user1", "user2"], ["missing"]]
+    assert [result['status'] for result in results] == ['success', 'success', 'not_found']
+    assert results[0]['data'] == anonymize_record(USERS["user1"])
+
+def test_worker_pool_returns_every_user():
+    results = process_access_requests(list(USERS), lambda ids: {i: USERS[i] for i in ids}, batch_size=3, max_workers=2)
+
+    by_user = {result['user_id']: result for result in results}
+    assert sorted(by_user) == sorted(USERS)
+    assert all(result['data'] == anonymize_record(USERS[user_id]) for user_id, result in by_user.items())
+
+def test_fetch_errors_are_reported_per_user():
+    def fetch_batch(user_ids):
+        raise RuntimeError("database unavailable")
+
+    results = list(process_access_requests(["user1", "user2"], fetch_batch))
+
+    assert [(result['user_id'], result['status']) for result in results] == [("user1", 'error'), ("user2", 'error')]
+
+def test_sqlalchemy_engine_bulk_requests():
+    engine = EncryptoDataProtectionEngine("sqlite:///:memory:")
+    engine.store_personal_data("user1", USERS["user1"])
+
+    results = {result['user_id']: result['status'] for result in engine.process_data_access_requests(["user1", "user2"])}
+
+    assert results == {"user1": 'success', "user2": 'not_found'}
+    engine.close()
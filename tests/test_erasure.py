@@ -0,0 +1,67 @@
+from src.data_protection import EncryptoDataProtectionEngine
+from src.erasure import ErasureJob
+
+def test_job_erases_in_chunks_and_reports_progress():
+    chunks = []
+    job = ErasureJob([f"user{i}" for i in range(5)], chunks.append, chunk_size=2)
+
+    job.start().wait()
+
+    assert chunks == [["user0", "user1"], ["user2", "user3"], ["user4"]]
+    assert job.progress()['status'] == 'completed'
+    assert job.progress()['fraction'] == 1.0
+
+def test_failed_job_resumes_from_checkpoint():
+    user_ids = [f"user{i}" for i in range(5)]
+    erased = []
+    failures = ["user2"]
+
+    def erase_chunk(chunk):
+        if failures and failures[0] in chunk:
+            failures.pop()
+            raise RuntimeError("database is locked")
+        erased.extend(chunk)
+
+    job = ErasureJob(user_ids, erase_chunk, chunk_size=2)
+    job.run()
+
+    assert (job.status, job.next_index, job.error) == ('failed', 2, "database is locked")
+
+    job.run()
+
+    assert job.status == 'completed'
+    assert erased == user_ids
+
+def test_sqlalchemy_bulk_erasure_is_resumable():
+    engine = EncryptoDataProtectionEngine("sqlite:///:memory:")
+    for i in range(6):
+        user_id = f"user{i}"
+        engine.log_data_processing_activity(user_id, "authentication", {})
+        engine.store_consent(user_id, "marketing", True)
+        engine.store_personal_data(user_id, {"user_id": user_id})
+
+    job = engine.erase_users(["user0", "user1", "user2", "user3"], chunk_size=2, background=False)
+
+    assert engine.get_erasure_job(job.job_id)['status'] == 'completed'
+    assert sorted({log.user_id for log in engine.get_logs()}) == ["user4", "user5"]
+    assert sorted(engine.retrieve_personal_data_batch([f"user{i}" for i in range(6)])) == ["user4", "user5"]
+    assert engine.unfinished_erasure_jobs() == []
+    engine.close()
+
+def test_sqlalchemy_interrupted_job_is_resumed_by_id():
+    engine = EncryptoDataProtectionEngine("sqlite:///:memory:")
+    for i in range(4):
+        engine.log_data_processing_activity(f"user{i}", "authentication", {})
+
+    job = ErasureJob(["user0", "user1", "user2"], engine._erase_users, chunk_size=1, on_checkpoint=engine._save_erasure_job)
+    job.cancel()
+    job.run()
+    assert engine.get_erasure_job(job.job_id)['status'] == 'cancelled'
+    assert engine.unfinished_erasure_jobs() == [job.job_id]
+
+    resumed = engine.resume_erasure_job(job.job_id)
+    resumed.wait()
+
+    assert engine.get_erasure_job(job.job_id)['erased'] == 3
+    assert [log.user_id for log in engine.get_logs()] == ["user3"]
+    engine.close()
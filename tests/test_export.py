@@ -0,0 +1,157 @@
+import csv
+import json
+import uuid
+import zipfile
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.compact_log import CompactLogStore
+from src.data_protection import EncryptoDataProtectionEngine
+from src.export import export_dsar_bundle, export_logs
+from src.log_store import IndexedLogStore
+
+START = datetime(2025, 4, 8, 12, 0, 0)
+
+def make_entry(i, user_id, activity_type="authentication"):
+    timestamp = START + timedelta(minutes=i)
+    return {
+        'id': str(uuid.uuid4()),
+        'user_id': user_id,
+        'activity_type': activity_type,
+        'timestamp': timestamp,
+        'data_processed': {"n": i},
+        'is_consent_given': True,
+        'retention_period': timestamp + timedelta(days=730)
+    }
+
+def scan_all(store, chunk_size, **filters):
+    chunks, cursor = [], None
+    while True:
+        chunk, cursor = store.scan(cursor=cursor, limit=chunk_size, **filters)
+        chunks.append(chunk)
+        if cursor is None:
+            return chunks
+
+@pytest.mark.parametrize("store_class", [IndexedLogStore, CompactLogStore])
+def test_scan_pushes_down_filters_in_time_order(store_class):
+    store = store_class()
+    for i in range(10):
+        store.append(make_entry(i, f"user{i % 2}", "authentication" if i < 6 else "data_access_request"))
+
+    chunks = scan_all(store, 3)
+    assert [len(chunk) for chunk in chunks] == [3, 3, 3, 1]
+    assert [log['data_processed']['n'] for chunk in chunks for log in chunk] == list(range(10))
+
+    user_logs = [log for chunk in scan_all(store, 2, user_id="user1") for log in chunk]
+    assert [log['data_processed']['n'] for log in user_logs] == [1, 3, 5, 7, 9]
+
+    ranged = [log for chunk in scan_all(store, 2, activity_type="authentication", start=START + timedelta(minutes=2), end=START + timedelta(minutes=5)) for log in chunk]
+    assert [log['data_processed']['n'] for log in ranged] == [2, 3, 4]
+
+@pytest.mark.parametrize("store_class", [IndexedLogStore, CompactLogStore])
+def test_scan_cursor_survives_deletes(store_class):
+    store = store_class()
+    for i in range(6):
+        store.append(make_entry(i, f"user{i % 3}"))
+
+    first, cursor = store.scan(limit=2)
+    store.delete_user("user2")
+    if hasattr(store, 'compact'):
+        store.compact()
+    rest, cursor = store.scan(cursor=cursor, limit=10)
+
+    assert [log['data_processed']['n'] for log in first + rest] == [0, 1, 3, 4]
+    assert cursor is None
+
+@pytest.mark.parametrize("store_class", [IndexedLogStore, CompactLogStore])
+def test_scan_pages_newest_first(store_class):
+    store = store_class()
+    for i in range(10):
+        store.append(make_entry(i, f"user{i % 2}", "authentication" if i % 3 else "data_access_request"))
+
+    pages = scan_all(store, 4, reverse=True)
+    assert [[log['data_processed']['n'] for log in page] for page in pages] == [[9, 8, 7, 6], [5, 4, 3, 2], [1, 0]]
+
+    activity_pages = scan_all(store, 2, activity_type="data_access_request", reverse=True)
+    assert [log['data_processed']['n'] for page in activity_pages for log in page] == [9, 6, 3, 0]
+
+    user_pages = scan_all(store, 2, user_id="user0", activity_type="authentication", reverse=True)
+    assert [log['data_processed']['n'] for page in user_pages for log in page] == [8, 4, 2]
+
+    ranged = scan_all(store, 10, start=START + timedelta(minutes=3), end=START + timedelta(minutes=6), reverse=True)
+    assert [log['data_processed']['n'] for log in ranged[0]] == [5, 4, 3]
+
+def test_export_formats(tmp_path):
+    chunks = [[make_entry(0, "alice"), make_entry(1, "bob")], [make_entry(2, "alice")]]
+
+    assert export_logs(iter(chunks), str(tmp_path / "logs.csv")) == 3
+    with open(tmp_path / "logs.csv") as export_file:
+        rows = list(csv.DictReader(export_file))
+    assert [row['user_id'] for row in rows] == ["alice", "bob", "alice"]
+    assert rows[0]['timestamp'] == "2025-04-08 12:00:00"
+    assert json.loads(rows[1]['data_processed']) == {"n": 1}
+
+    assert export_logs(iter(chunks), str(tmp_path / "logs.jsonl")) == 3
+    with open(tmp_path / "logs.jsonl") as export_file:
+        assert json.loads(export_file.readline())['timestamp'] == "2025-04-08T12:00:00"
+
+    with pytest.raises(ValueError):
+        export_logs(iter(chunks), str(tmp_path / "logs.xml"))
+
+def test_parquet_export(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    chunks = [[make_entry(i, "alice")] for i in range(3)]
+
+    assert export_logs(iter(chunks), str(tmp_path / "logs.parquet")) == 3
+    table = pq.read_table(tmp_path / "logs.parquet")
+    assert table.num_rows == 3
+    assert not (tmp_path / "logs.parquet.part").exists()
+
+def test_sqlalchemy_iter_logs_keyset_chunks():
+    engine = EncryptoDataProtectionEngine("sqlite:///:memory:")
+    for i in range(7):
+        engine.log_data_processing_activity(f"user{i % 2}", "authentication", {"n": i})
+
+    chunks = list(engine.iter_logs(chunk_size=3))
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+
+    user_chunks = list(engine.iter_logs(user_id="user0", chunk_size=2))
+    assert [log['data_processed']['n'] for chunk in user_chunks for log in chunk] == [0, 2, 4, 6]
+    engine.close()
+
+def test_dsar_bundle_streams_every_section(tmp_path):
+    consents = ({'user_id': "alice", 'type': 'marketing', 'status': i % 2 == 0, 'timestamp': START} for i in range(3))
+    chunks = ([make_entry(i * 2 + j, "alice") for j in range(2)] for i in range(3))
+    progress = []
+
+    path = str(tmp_path / "alice.zip")
+    counts = export_dsar_bundle(path, "alice", {'email': "tok_x"}, consents, chunks, progress.append)
+
+    assert counts == {'consents': 3, 'logs': 6}
+    assert progress == [2, 4, 6]
+    with zipfile.ZipFile(path) as bundle:
+        assert json.loads(bundle.read('profile.json')) == {'email': "tok_x"}
+        logs = [json.loads(line) for line in bundle.read('logs.jsonl').splitlines()]
+        assert [log['data_processed']['n'] for log in logs] == list(range(6))
+        assert len(bundle.read('consents.jsonl').splitlines()) == 3
+        assert json.loads(bundle.read('manifest.json'))['logs'] == 6
+
+def test_sqlalchemy_dsar_bundle(tmp_path):
+    engine = EncryptoDataProtectionEngine("sqlite:///:memory:", tokenization=False)
+    engine.store_personal_data("user0", {'user_id': "user0", 'email': "a@example.com", 'age': 30})
+    engine.store_consent("user0", 'marketing', True)
+    engine.store_consent("user0", 'marketing', False)
+    for i in range(7):
+        engine.log_data_processing_activity(f"user{i % 2}", "authentication", {"n": i})
+
+    progress = []
+    result = engine.export_data_subject_bundle("user0", str(tmp_path / "user0.zip"), progress.append, chunk_size=3)
+
+    assert result['status'] == 'success' and result['logs'] == engine.count_user_logs("user0") == 4
+    assert result['consents'] == 2 and progress == [3, 4]
+    with zipfile.ZipFile(result['path']) as bundle:
+        assert json.loads(bundle.read('profile.json'))['age'] == 30
+        consents = [json.loads(line) for line in bundle.read('consents.jsonl').splitlines()]
+        assert [consent['status'] for consent in consents] == [True, False]
+    engine.close()
@@ -0,0 +1,86 @@
+import os
+import threading
+
+import pytest
+
+from src.data_protection import DataKeyModel, DataProtectionModel, EncryptoDataProtectionEngine
+from src.field_encryption import EnvelopeCipher, envelope_key_id, is_envelope
+
+def test_envelope_round_trip_rotation_and_rewrap():
+    saved = {}
+    cipher = EnvelopeCipher(os.urandom(32), save_keys=saved.update, parallel_threshold=2, max_workers=2)
+    first_key = cipher.active_key_id
+
+    sealed = cipher.encrypt_many([{"n": i} for i in range(5)])
+    assert all(is_envelope(value) and envelope_key_id(value) == first_key for value in sealed)
+
+    second_key = cipher.rotate()
+    assert second_key != first_key and cipher.key_ids == [first_key, second_key]
+    assert envelope_key_id(cipher.encrypt({"n": 5})) == second_key
+    assert cipher.decrypt_many(sealed + [{"plain": True}]) == [{"n": i} for i in range(5)] + [{"plain": True}]
+
+    new_master = os.urandom(32)
+    assert cipher.rewrap(new_master) == 2
+    reopened = EnvelopeCipher(new_master, saved)
+    assert reopened.active_key_id == second_key
+    assert reopened.decrypt(sealed[0]) == {"n": 0}
+    cipher.close()
+
+def test_concurrent_rotate_and_rewrap_keep_every_key_readable():
+    saved = {}
+    cipher = EnvelopeCipher(os.urandom(32), save_keys=saved.update)
+    master_keys = [os.urandom(32) for _ in range(50)]
+
+    def rotate():
+        for _ in range(50):
+            cipher.rotate()
+
+    threads = [threading.Thread(target=rotate) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for master_key in master_keys:
+        cipher.rewrap(master_key)
+    for thread in threads:
+        thread.join()
+
+    # Every saved key opens under the last master key
+    reopened = EnvelopeCipher(master_keys[-1], saved)
+    assert len(reopened.key_ids) == 151
+    cipher.close()
+
+@pytest.mark.parametrize("buffered", [False, True])
+def test_sql_payloads_encrypted_at_rest(buffered):
+    engine = EncryptoDataProtectionEngine("sqlite:///:memory:", buffered=buffered, field_encryption=True, master_key=os.urandom(32))
+    for i in range(3):
+        engine.log_data_processing_activity("alice", "authentication", {"n": i})
+    engine.flush()
+
+    session = engine.SessionLocal()
+    stored = [row.data_processed for row in session.query(DataProtectionModel)]
+    session.close()
+    assert all(is_envelope(payload) for payload in stored)
+
+    assert sorted(log.data_processed['n'] for log in engine.get_logs("alice")) == [0, 1, 2]
+    assert [log['data_processed'] for chunk in engine.iter_logs(chunk_size=2) for log in chunk] == [{"n": 0}, {"n": 1}, {"n": 2}]
+    engine.close()
+
+def test_rotation_reencrypts_old_rows():
+    engine = EncryptoDataProtectionEngine("sqlite:///:memory:", field_encryption=True, master_key=os.urandom(32))
+    engine.log_data_processing_activity("alice", "authentication", {"n": 1})
+    old_key = engine.payload_cipher.active_key_id
+
+    new_key = engine.rotate_data_key()
+    engine.log_data_processing_activity("alice", "authentication", {"n": 2})
+    assert engine.reencrypt_logs(chunk_size=1) == 1
+
+    session = engine.SessionLocal()
+    assert {envelope_key_id(row.data_processed) for row in session.query(DataProtectionModel)} == {new_key}
+    assert {row.key_id for row in session.query(DataKeyModel)} == {old_key, new_key}
+    session.close()
+    assert sorted(log.data_processed['n'] for log in engine.get_logs()) == [1, 2]
+    engine.close()
+
+def test_missing_master_key_is_rejected(monkeypatch):
+    monkeypatch.delenv("GDPR_MASTER_KEY", raising=False)
+    with pytest.raises(ValueError):
+        EncryptoDataProtectionEngine("sqlite:///:memory:", field_encryption=True)
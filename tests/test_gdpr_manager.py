@@ -0,0 +1,48 @@
+import hashlib
+from datetime import datetime
+
+from src.gdpr_manager import GDPRComplianceManager, ConsentManager
+from src.tokenization import TokenVault, is_token
+
+TEST_DATA = {
+    "user_id": "user123",
+    "email": "test@example.com",
+    "phone": "1234567890",
+    "address": "123 Test Street"
+}
+
+def test_consent_management():
+    manager = ConsentManager()
+    user_id = "test_user"
+    consent_type = "data_processing"
+
+    # Test initial consent state
+    assert not manager.check_consent(user_id, consent_type)
+
+    # Update consent
+    result = manager.update_consent(user_id, consent_type, datetime.utcnow())
+    assert result
+
+    # Check updated consent
+    assert manager.check_consent(user_id, consent_type)
+
+def test_data_anonymization():
+    gdpr_manager = GDPRComplianceManager()
+
+    anonymized_data = gdpr_manager.anonymize_personal_data(TEST_DATA)
+
+    # Email is hashed and the phone number fully masked, as in the notebook
+    assert anonymized_data['email'] == hashlib.sha256(b"test@example.com").hexdigest()
+    assert anonymized_data['phone'] == '*' * len(TEST_DATA['phone'])
+    assert anonymized_data['user_id'] == TEST_DATA['user_id']
+
+def test_data_tokenization():
+    vault = TokenVault(':memory:', bytes(range(32)))
+    gdpr_manager = GDPRComplianceManager(token_vault=vault)
+
+    anonymized_data = gdpr_manager.anonymize_personal_data(TEST_DATA)
+
+    # Email, phone and address become tokens the vault can map back
+    assert all(is_token(anonymized_data[field]) for field in ('email', 'phone', 'address'))
+    assert vault.detokenize(anonymized_data['address']) == TEST_DATA['address']
+    vault.close()
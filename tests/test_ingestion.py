@@ -0,0 +1,117 @@
+import asyncio
+import threading
+
+from src.data_protection import EncryptoDataProtectionEngine
+from src.ingestion import IngestionPipeline, ingest_lines
+from src.minimization import load_policies
+
+DATABASE_URL = "sqlite:///:memory:"
+
+class RecordingSink:
+    def __init__(self, block=None):
+        self.batches = []
+        self.block = block
+
+    def log_data_processing_activities(self, events):
+        if self.block is not None:
+            self.block.wait()
+        self.batches.append(events)
+        return events
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def test_events_are_minimized_and_given_consent():
+    sink = RecordingSink()
+    consents = {"alice": True}
+
+    async def produce():
+        pipeline = IngestionPipeline(sink, policies=load_policies(), check_consents=lambda ids: [consents.get(i, False) for i in ids])
+        async with pipeline:
+            await pipeline.submit({"user_id": "alice", "activity_type": "authentication", "data": {"username": "alice", "password": "secret"}})
+            await pipeline.submit({"user_id": "bob", "activity_type": "data_access_request", "data": {"scope": "all", "ssn": "078-05-1120"}})
+            await pipeline.submit({"user_id": "bob", "activity_type": "login", "purpose": "profiling"})
+            await pipeline.submit({"activity_type": "authentication"})
+        return pipeline.stats
+
+    stats = run(produce())
+
+    events = [event for batch in sink.batches for event in batch]
+    assert events == [
+        {"user_id": "alice", "activity_type": "authentication", "data_processed": {"username": "alice"}, "consent_given": True},
+        # No policy for the activity type, so nothing of the payload is kept
+        {"user_id": "bob", "activity_type": "data_access_request", "data_processed": {}, "consent_given": False},
+    ]
+    assert stats['received'] == 4 and stats['written'] == 2 and stats['rejected'] == 2
+
+def test_full_queue_pushes_back_on_the_producer():
+    release = threading.Event()
+    sink = RecordingSink(block=release)
+
+    async def produce():
+        async with IngestionPipeline(sink, check_consents=lambda ids: [True] * len(ids), queue_size=4, batch_size=2) as pipeline:
+            for i in range(4):
+                await pipeline.submit({"user_id": f"user{i}", "activity_type": "login"})
+            await asyncio.sleep(0.1)
+            # One batch is stuck in the sink, the rest fill the queue
+            while pipeline.submit_nowait({"user_id": "extra", "activity_type": "login"}):
+                pass
+            assert pipeline.pending() == 4
+
+            blocked = asyncio.ensure_future(pipeline.submit({"user_id": "late", "activity_type": "login"}))
+            await asyncio.sleep(0.05)
+            assert not blocked.done()
+
+            release.set()
+            await blocked
+            await pipeline.join()
+            return pipeline.stats
+
+    stats = run(produce())
+
+    assert stats['written'] == stats['received'] == 7
+    assert all(len(batch) <= 2 for batch in sink.batches)
+
+def test_lines_are_written_to_the_sql_engine_in_batches():
+    lines = b"".join(
+        b'{"user_id": "user%d", "activity_type": "authentication", "data": {"email": "x@example.com", "ip": "10.0.0.1"}}\n' % (i % 3)
+        for i in range(25)
+    ) + b"not json\n"
+
+    with EncryptoDataProtectionEngine(DATABASE_URL, buffered=False, crypto_shredding=False) as engine:
+        engine.gdpr_manager.consent_manager.update_consent("user1", "data_processing")
+
+        async def produce():
+            reader = asyncio.StreamReader()
+            reader.feed_data(lines)
+            reader.feed_eof()
+            async with IngestionPipeline(engine, batch_size=10) as pipeline:
+                count = await ingest_lines(pipeline, reader)
+            return count, pipeline.stats
+
+        count, stats = run(produce())
+
+        assert count == 25
+        assert stats['written'] == 25 and stats['rejected'] == 1 and stats['batches'] >= 3
+        logs = engine.get_logs("user1")
+        assert len(logs) == 8
+        assert all(log.is_consent_given for log in logs)
+        assert all(log.data_processed == {"email": "x@example.com"} for log in logs)
+        assert not any(log.is_consent_given for log in engine.get_logs("user0"))
+
+def test_malformed_events_do_not_stop_the_consumer():
+    sink = RecordingSink()
+
+    async def produce():
+        async with IngestionPipeline(sink, check_consents=lambda ids: [True] * len(ids), queue_size=2, batch_size=1) as pipeline:
+            await pipeline.submit({"user_id": "u", "activity_type": "authentication", "data": ["x"]})
+            await pipeline.submit({"user_id": "u", "activity_type": "authentication", "data": "text"})
+            for i in range(5):
+                await pipeline.submit({"user_id": f"user{i}", "activity_type": "login"})
+            await asyncio.wait_for(pipeline.join(), 5)
+        return pipeline.stats
+
+    stats = run(asyncio.wait_for(produce(), 10))
+
+    assert stats['rejected'] == 2 and stats['written'] == 5
+    assert [event['user_id'] for batch in sink.batches for event in batch] == [f"user{i}" for i in range(5)]
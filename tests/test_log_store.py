@@ -0,0 +1,49 @@
+from datetime import datetime
+
+from src.log_store import IndexedLogStore
+
+def make_entry(log_id, user_id, activity_type):
+    return {
+        'id': log_id,
+        'user_id': user_id,
+        'activity_type': activity_type,
+        'timestamp': datetime.utcnow(),
+        'data_processed': {},
+        'is_consent_given': False,
+        'retention_period': datetime.utcnow()
+    }
+
+def test_query_uses_user_and_activity_indexes():
+    store = IndexedLogStore()
+    store.append(make_entry("1", "alice", "authentication"))
+    store.append(make_entry("2", "alice", "data_access_request"))
+    store.append(make_entry("3", "bob", "authentication"))
+
+    assert [log['id'] for log in store.query(user_id="alice")] == ["1", "2"]
+    assert [log['id'] for log in store.query(activity_type="authentication")] == ["1", "3"]
+    assert [log['id'] for log in store.query(user_id="bob", activity_type="authentication")] == ["3"]
+    assert store.query(user_id="carol") == []
+    assert store.get("2")['user_id'] == "alice"
+
+def test_delete_user_maintains_activity_types():
+    store = IndexedLogStore()
+    store.append(make_entry("1", "alice", "authentication"))
+    store.append(make_entry("2", "alice", "data_access_request"))
+    store.append(make_entry("3", "bob", "authentication"))
+
+    removed = store.delete_user("alice")
+
+    assert sorted(log['id'] for log in removed) == ["1", "2"]
+    assert len(store) == 1
+    assert store.get("1") is None
+    assert sorted(store.activity_types()) == ["authentication"]
+    assert store.delete_user("alice") == []
+
+def test_delete_single_entry():
+    store = IndexedLogStore()
+    store.append(make_entry("1", "alice", "authentication"))
+
+    assert store.delete("1")['id'] == "1"
+    assert store.delete("1") is None
+    assert store.activity_types() == []
+    assert store.user_ids() == []
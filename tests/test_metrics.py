@@ -0,0 +1,65 @@
+import pytest
+
+from src.gdpr_manager import GDPRComplianceManager
+from src.metrics import REGISTRY, MetricsRegistry, PrometheusFileExporter, instrument
+
+def test_instrument_records_latency_and_errors():
+    registry = MetricsRegistry()
+
+    @instrument('lookup', registry=registry)
+    def lookup(found):
+        return {'status': 'success' if found else 'error'}
+
+    @instrument('explode', registry=registry)
+    def explode():
+        raise RuntimeError("boom")
+
+    lookup(True)
+    lookup(False)
+    with pytest.raises(RuntimeError):
+        explode()
+
+    snapshot = registry.snapshot()
+    assert snapshot['lookup']['calls'] == 2
+    assert snapshot['lookup']['errors'] == 1
+    assert snapshot['lookup']['error_rate'] == 0.5
+    assert snapshot['lookup']['p99_seconds'] is not None
+    assert snapshot['explode']['errors'] == 1
+
+def test_disabled_registry_records_nothing_and_hooks_fire():
+    registry = MetricsRegistry(enabled=False)
+    seen = []
+    registry.add_hook(lambda operation, seconds, error: seen.append((operation, error)))
+
+    @instrument('noop', failed=lambda result: result is False, registry=registry)
+    def noop(result):
+        return result
+
+    assert noop(False) is False
+    assert registry.snapshot() == {} and seen == []
+
+    registry.enabled = True
+    noop(False)
+    noop(True)
+    assert seen == [('noop', True), ('noop', False)]
+
+def test_prometheus_text_format(tmp_path):
+    registry = MetricsRegistry(buckets=(0.001, 0.01))
+    registry.observe('right_to_be_forgotten', 0.0005)
+    registry.observe('right_to_be_forgotten', 0.005, error=True)
+    registry.observe('right_to_be_forgotten', 5.0)
+
+    text = registry.to_prometheus()
+    assert 'gdpr_operation_duration_seconds_bucket{operation="right_to_be_forgotten",le="0.001"} 1' in text
+    assert 'gdpr_operation_duration_seconds_bucket{operation="right_to_be_forgotten",le="0.01"} 2' in text
+    assert 'gdpr_operation_duration_seconds_bucket{operation="right_to_be_forgotten",le="+Inf"} 3' in text
+    assert 'gdpr_operation_errors_total{operation="right_to_be_forgotten"} 1' in text
+
+    path = PrometheusFileExporter(str(tmp_path / "metrics" / "gdpr.prom"), registry=registry).export()
+    with open(path) as metrics_file:
+        assert metrics_file.read() == text
+
+def test_engine_operations_are_instrumented():
+    REGISTRY.reset()
+    GDPRComplianceManager().process_data_access_request("user1")
+    assert REGISTRY.snapshot()['process_data_access_request']['calls'] == 1
@@ -0,0 +1,30 @@
+import pandas as pd
+import pytest
+
+from src.minimization import compile_policies, load_policies, minimize_record, minimize_batch
+
+RECORDS = [
+    {"username": "jdoe", "email": "jdoe@example.com", "phone": "1234567890"},
+    {"username": "asmith", "email": "asmith@example.com", "phone": "5550000000"},
+    {"email": "solo@example.com", "address": "1 Privacy Street"},
+]
+
+def test_policies_are_frozen_field_sets():
+    policies = load_policies()
+
+    assert policies['authentication'] == frozenset({'username', 'email'})
+    with pytest.raises(TypeError):
+        policies['marketing'] = frozenset()
+
+def test_policies_load_from_config():
+    policies = load_policies({'gdpr': {'minimization_rules': {'newsletter': ['email']}}})
+
+    assert list(policies) == ['newsletter']
+
+def test_batch_matches_per_record_path():
+    allowed = compile_policies({'authentication': ['username', 'email']})['authentication']
+    expected = [minimize_record(allowed, record) for record in RECORDS]
+
+    assert expected[2] == {"email": "solo@example.com"}
+    assert minimize_batch(allowed, RECORDS) == expected
+    assert list(minimize_batch(allowed, pd.DataFrame(RECORDS[:2])).columns) == ['username', 'email']
@@ -0,0 +1,97 @@
+import pandas as pd
+
+from src.anonymization import anonymize_record
+from src.data_protection import EncryptoDataProtectionEngine
+from src.dsar import process_access_requests
+from src.pii import REDACTED, PIIScanner, anonymize_and_redact, anonymize_and_redact_batch, redact_dataframe, redact_fields, redact_records
+
+SCANNER = PIIScanner()
+
+def test_patterns_in_free_text():
+    text = "mail a.b@example.com or +1 555-123-4567 from 10.0.0.1 / fe80::1, card 4111 1111 1111 1111"
+
+    assert SCANNER.redact_text(text) == "mail [EMAIL] or [PHONE] from [IPV4] / [IPV6], card [CARD]"
+    assert SCANNER.redact_text("IBAN DE89 3704 0044 0532 0130 00") == "IBAN [IBAN]"
+
+def test_patterns_at_the_end_of_a_sentence():
+    assert SCANNER.redact_text("login from 10.0.0.1.") == "login from [IPV4]."
+    assert SCANNER.redact_text("card 4111 1111 1111 1111. Thanks") == "card [CARD]. Thanks"
+    # A longer dotted number is not an address
+    assert SCANNER.redact_text("version 10.0.0.1.5") == "version 10.0.0.1.5"
+
+def test_lookalikes_are_kept():
+    # Failing Luhn, timestamps and hex digests are not PII
+    for text in ("order 4111111111111112", "at 2025-04-08T12:00:00", "2d711642b726b04401627ca9fbac32f5c8530fb1903cc4db02258717921a4881"):
+        assert SCANNER.redact_text(text) == text
+
+def test_nested_payloads_and_sensitive_keys():
+    payload = {
+        "username": "john_doe",
+        "session": {"ip": "192.168.0.7", "agent": "curl from 192.168.0.7"},
+        "items": [{"card": 4111111111111111, "qty": 2}, "contact x@y.org"],
+        "name": None
+    }
+
+    assert SCANNER.redact(payload) == {
+        "username": REDACTED,
+        "session": {"ip": REDACTED, "agent": "curl from [IPV4]"},
+        "items": [{"card": "[CARD]", "qty": 2}, "contact [EMAIL]"],
+        "name": None
+    }
+    assert payload["username"] == "john_doe"
+    assert sorted(SCANNER.find(payload)) == [
+        ("items[0].card", "card"), ("items[1]", "email"), ("session.agent", "ipv4"),
+        ("session.ip", "sensitive_key"), ("username", "sensitive_key")
+    ]
+
+def test_anonymize_and_redact_keeps_pseudonymized_fields():
+    record = {"user_id": "u1", "email": "u1@example.com", "phone": "5551234567", "profile": {"login": "u1", "note": "call 555-123-4567"}}
+
+    redacted = anonymize_and_redact(record)
+
+    assert {key: redacted[key] for key in ("user_id", "email", "phone")} == {key: anonymize_record(record)[key] for key in ("user_id", "email", "phone")}
+    assert redacted["profile"] == {"login": REDACTED, "note": "call [PHONE]"}
+
+def test_batch_redaction_matches_per_record_path():
+    records = [
+        {"user_id": f"u{i}", "email": f"u{i}@example.com", "phone": "5551234567", "address": "1 Main St", "login": f"u{i}", "note": f"from 10.0.0.{i}", "card": 4111111111111111}
+        for i in range(5)
+    ]
+    expected = [anonymize_and_redact(record, SCANNER) for record in records]
+
+    assert anonymize_and_redact_batch(iter(records), SCANNER, max_workers=2, chunk_size=2) == expected
+    assert anonymize_and_redact_batch(pd.DataFrame(records), SCANNER, max_workers=1).to_dict('records') == expected
+    # The token vault path skips only the tokenized fields
+    assert redact_dataframe(pd.DataFrame(records), SCANNER, skip=("email",)).to_dict('records') == [
+        redact_fields(record, SCANNER, skip=("email",)) for record in records
+    ]
+
+def test_redact_dataframe_keeps_missing_values_and_clean_columns():
+    df = pd.DataFrame([{"n": 1, "note": "call 555-123-4567"}, {"n": 2, "note": None}])
+
+    redacted = redact_dataframe(df, SCANNER)
+
+    assert redacted['n'].dtype == df['n'].dtype
+    assert redacted.loc[0, 'note'] == "call [PHONE]"
+    assert pd.isna(redacted.loc[1, 'note'])
+
+def test_redact_records_streams_in_order():
+    records = [{"n": i, "email": f"user{i}@example.com"} for i in range(25)]
+
+    assert list(redact_records(iter(records), max_workers=2, chunk_size=4)) == [{"n": i, "email": REDACTED} for i in range(25)]
+    assert list(redact_records(records, max_workers=1)) == [SCANNER.redact(record) for record in records]
+
+def test_access_request_worker_pool_redacts():
+    users = {"user1": {"user_id": "user1", "email": "user1@example.com", "extra": {"username": "u"}}}
+
+    results = list(process_access_requests(["user1"], lambda ids: users, max_workers=2, anonymize=anonymize_and_redact))
+
+    assert results[0]['data']['extra'] == {"username": REDACTED}
+
+def test_engine_redacts_logged_payloads():
+    engine = EncryptoDataProtectionEngine("sqlite:///:memory:", redact_logs=True)
+
+    engine.log_data_processing_activity("user1", "authentication", {"username": "john_doe", "ip": "10.0.0.1", "detail": "from 10.0.0.1"})
+
+    assert engine.get_logs("user1")[0].data_processed == {"username": REDACTED, "ip": REDACTED, "detail": "from [IPV4]"}
+    engine.close()
@@ -0,0 +1,78 @@
+import uuid
+from datetime import datetime, timedelta
+
+from src.compact_log import CompactLogStore
+from src.config import load_config, retention_period_days
+from src.data_protection import EncryptoDataProtectionEngine
+from src.log_store import IndexedLogStore
+from src.retention import ExpiryIndex, RetentionSweeper
+
+NOW = datetime(2025, 4, 8, 12, 0, 0)
+
+def make_entry(user_id, expires_at):
+    return {
+        'id': str(uuid.uuid4()),
+        'user_id': user_id,
+        'activity_type': "authentication",
+        'timestamp': expires_at - timedelta(days=730),
+        'data_processed': {},
+        'is_consent_given': False,
+        'retention_period': expires_at
+    }
+
+def test_expiry_index_only_pops_due_keys():
+    index = ExpiryIndex()
+    index.add("old", NOW - timedelta(days=3))
+    index.add("earlier_today", NOW - timedelta(hours=1))
+    index.add("later_today", NOW + timedelta(hours=1))
+    index.add("future", NOW + timedelta(days=30))
+    index.add("erased", NOW - timedelta(days=1))
+    index.discard("erased", NOW - timedelta(days=1))
+
+    assert sorted(index.pop_expired(NOW)) == ["earlier_today", "old"]
+    assert len(index) == 2
+    assert index.pop_expired(NOW) == []
+    assert index.pop_expired(NOW + timedelta(hours=2)) == ["later_today"]
+
+def test_stores_purge_expired_entries():
+    for store in (IndexedLogStore(), CompactLogStore()):
+        expired = store.append(make_entry("alice", NOW - timedelta(days=1)))
+        store.append(make_entry("alice", NOW + timedelta(days=1)))
+        store.append(make_entry("bob", NOW - timedelta(minutes=5)))
+        store.delete_user("bob")
+
+        removed = store.purge_expired(NOW)
+
+        assert [entry['id'] for entry in removed] == [expired['id']]
+        assert len(store) == 1
+        assert store.get(expired['id']) is None
+        assert list(store.pending_expiries().values()) == [1]
+
+def test_sweeper_purges_sqlalchemy_log():
+    engine = EncryptoDataProtectionEngine("sqlite:///:memory:", retention_days=1)
+    engine.log_data_processing_activity("user123", "authentication", {})
+
+    sweeper = RetentionSweeper(engine, interval=3600)
+
+    assert sweeper.sweep(datetime.utcnow()) == 0
+    assert sweeper.sweep(datetime.utcnow() + timedelta(days=2)) == 1
+    assert engine.get_logs() == []
+    engine.close()
+
+def test_zero_retention_days_expires_immediately():
+    engine = EncryptoDataProtectionEngine("sqlite:///:memory:", retention_days=0)
+    engine.log_data_processing_activity("user123", "authentication", {})
+
+    assert engine.retention_days == 0
+    assert RetentionSweeper(engine, interval=3600).sweep(datetime.utcnow() + timedelta(seconds=1)) == 1
+    engine.close()
+
+def test_config_file_sets_retention_period(tmp_path):
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text("gdpr:\n  retention_period_days: 30\n")
+
+    config = load_config(str(config_path))
+
+    assert retention_period_days(config) == 30
+    assert config['gdpr']['retention_sweep_interval_seconds'] == 3600
+    assert retention_period_days(load_config()) == 730
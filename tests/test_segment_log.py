@@ -0,0 +1,158 @@
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.segment_log import SegmentCompactor, SegmentLogStore
+
+def make_entry(user_id, activity_type, data_processed=None, retention_days=730):
+    now = datetime.utcnow()
+    return {
+        'id': str(uuid.uuid4()),
+        'user_id': user_id,
+        'activity_type': activity_type,
+        'timestamp': now,
+        'data_processed': data_processed or {},
+        'is_consent_given': True,
+        'retention_period': now + timedelta(days=retention_days)
+    }
+
+def test_entries_survive_reopen(tmp_path):
+    with SegmentLogStore(str(tmp_path), segment_size=512) as store:
+        entries = [store.append(make_entry(f"user{i % 3}", "authentication", {"n": i})) for i in range(30)]
+
+    with SegmentLogStore(str(tmp_path)) as reopened:
+        assert list(reopened) == entries
+        assert reopened.query(user_id="user1") == entries[1::3]
+        assert reopened.get(entries[4]['id']) == entries[4]
+        page, cursor = reopened.scan(limit=5, reverse=True)
+        assert page == entries[:-6:-1] and cursor is not None
+
+def test_deletes_and_purges_are_durable(tmp_path):
+    with SegmentLogStore(str(tmp_path)) as store:
+        kept = store.append(make_entry("alice", "authentication"))
+        store.append(make_entry("bob", "authentication"))
+        single = store.append(make_entry("alice", "consent_update"))
+        store.append(make_entry("carol", "authentication", retention_days=-1))
+
+        assert len(store.delete_user("bob")) == 1
+        assert store.delete(single['id']) == single
+        assert len(store.purge_expired()) == 1
+
+    with SegmentLogStore(str(tmp_path)) as reopened:
+        assert list(reopened) == [kept]
+
+def test_torn_tail_is_truncated(tmp_path):
+    with SegmentLogStore(str(tmp_path)) as store:
+        entry = store.append(make_entry("alice", "authentication"))
+        store.append(make_entry("alice", "authentication"))
+        segment = store._segment_path(store._active)
+        size = os.path.getsize(segment)
+
+    with open(segment, 'r+b') as segment_file:
+        segment_file.truncate(size - 3)
+
+    with SegmentLogStore(str(tmp_path)) as reopened:
+        assert list(reopened) == [entry]
+        appended = reopened.append(make_entry("bob", "authentication"))
+
+    with SegmentLogStore(str(tmp_path)) as reopened:
+        assert list(reopened) == [entry, appended]
+
+def test_compaction_reclaims_space(tmp_path):
+    store = SegmentLogStore(str(tmp_path), segment_size=1024, compact_min_dead=10)
+    entries = [store.append(make_entry(f"user{i % 10}", "authentication", {"n": i})) for i in range(200)]
+    for user in range(8):
+        store.delete_user(f"user{user}")
+    before = store.disk_usage()
+
+    assert store.needs_compaction()
+    store.compact()
+
+    remaining = [entry for entry in entries if entry['user_id'] in ("user8", "user9")]
+    assert store.disk_usage() < before / 3
+    assert list(store) == remaining
+    assert not store.needs_compaction()
+    store.close()
+
+    with SegmentLogStore(str(tmp_path)) as reopened:
+        assert list(reopened) == remaining
+        assert sorted(name for name in os.listdir(str(tmp_path)) if name.endswith('.seg')) == [
+            os.path.basename(reopened._segment_path(segment_id)) for segment_id in sorted(reopened._segments)
+        ]
+
+def test_background_compaction_keeps_concurrent_changes(tmp_path):
+    lock = threading.RLock()
+    store = SegmentLogStore(str(tmp_path), compact_min_dead=10)
+    for i in range(100):
+        store.append(make_entry(f"user{i % 4}", "authentication", {"n": i}))
+    store.delete_user("user0")
+    store.delete_user("user1")
+
+    # Runs the three compaction steps with writes in between, as the
+    # compactor thread would
+    with lock:
+        plan = store.begin_compaction()
+    store.delete_user("user2")
+    added = store.append(make_entry("user5", "authentication", {"n": 100}))
+    offsets = store.write_compacted(plan)
+    with lock:
+        store.finish_compaction(plan, offsets)
+
+    expected = [entry['data_processed']['n'] for entry in store.query(user_id="user3")]
+    assert expected == list(range(3, 100, 4))
+    assert store.query(user_id="user2") == []
+    assert store.query(user_id="user5") == [added]
+    store.close()
+
+    with SegmentLogStore(str(tmp_path)) as reopened:
+        assert sorted(reopened.user_ids()) == ["user3", "user5"]
+        assert len(reopened) == 26
+
+def test_directory_has_a_single_writer(tmp_path):
+    with SegmentLogStore(str(tmp_path)):
+        with pytest.raises(RuntimeError):
+            SegmentLogStore(str(tmp_path))
+
+def test_compactor_skips_when_nothing_to_reclaim(tmp_path):
+    store = SegmentLogStore(str(tmp_path))
+    store.append(make_entry("alice", "authentication"))
+
+    assert SegmentCompactor(store).compact() is False
+    store.close()
+
+def segment_bytes(directory):
+    return b"".join(
+        open(os.path.join(directory, name), 'rb').read()
+        for name in os.listdir(directory) if name.endswith('.seg')
+    )
+
+def test_erased_payloads_leave_the_disk(tmp_path):
+    directory = str(tmp_path)
+    store = SegmentLogStore(directory, segment_size=16384)
+    for i in range(2000):
+        store.append(make_entry(f"user{i % 50}", "authentication", {"email": f"user{i % 50}@example.com", "n": i}))
+    store.append(make_entry("carol", "authentication", {"email": "carol@example.com"}, retention_days=-1))
+
+    store.delete_user("user7")
+    assert len(store.purge_expired()) == 1
+    assert not store.needs_compaction()
+
+    # Deleted after being copied by a compaction, before the swap
+    plan = store.begin_compaction()
+    offsets = store.write_compacted(plan)
+    store.delete_user("user8")
+    store.finish_compaction(plan, offsets)
+    store.close()
+
+    data = segment_bytes(directory)
+    assert b"user7@example.com" not in data and b"user8@example.com" not in data
+    assert b"carol@example.com" not in data
+    assert b"user9@example.com" in data
+
+    with SegmentLogStore(directory) as reopened:
+        assert len(reopened) == 2000 - 80
+        assert reopened.query(user_id="user7") == [] and reopened.query(user_id="user8") == []
+        assert len(reopened.query(user_id="user9")) == 40
@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+from src.sharding import ShardedDataProtectionEngine, shard_for
+
+USERS = [f"user{i}" for i in range(12)]
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("shards")
+    engine = ShardedDataProtectionEngine(
+        f"sqlite:///{directory}/gdpr-{{shard}}.db",
+        shards=2,
+        token_vault_path=os.path.join(directory, "vault-{shard}.db")
+    )
+    yield engine
+    engine.close()
+
+def test_users_hash_to_a_stable_shard():
+    assert [shard_for(user_id, 4) for user_id in USERS] == [shard_for(user_id, 4) for user_id in USERS]
+    assert {shard_for(user_id, 4) for user_id in USERS} == {0, 1, 2, 3}
+
+def test_per_user_calls_route_and_queries_gather(engine):
+    for user_id in USERS:
+        engine.store_consent(user_id, 'data_processing', user_id != "user3")
+    written = engine.log_data_processing_activities([
+        {'user_id': user_id, 'activity_type': 'login', 'data_processed': {'n': n}}
+        for n, user_id in enumerate(USERS * 2)
+    ])
+
+    assert [entry['data_processed'] for entry in written] == [{'n': n} for n in range(24)]
+    assert engine.check_consent("user1") and not engine.check_consent("user3")
+    assert engine.check_consents(["user3", "user4"]) == [False, True]
+    assert [log.data_processed['n'] for log in engine.get_logs("user5")] in ([5, 17], [17, 5])
+    assert len(engine.get_logs()) == 24
+
+    chunks = list(engine.iter_logs(activity_type='login', chunk_size=5))
+    logs = [log for chunk in chunks for log in chunk]
+    assert [len(chunk) for chunk in chunks] == [5, 5, 5, 5, 4]
+    assert [(log['timestamp'], log['id']) for log in logs] == sorted((log['timestamp'], log['id']) for log in logs)
+
+def test_erasure_and_access_requests_span_shards(engine):
+    for user_id in USERS[:6]:
+        engine.store_personal_data(user_id, {'email': f"{user_id}@example.com", 'age': 30})
+
+    results = list(engine.process_data_access_requests(USERS[:6] + ["missing"], batch_size=2))
+    assert [result['user_id'] for result in results] == USERS[:6] + ["missing"]
+    assert results[-1]['status'] == 'not_found'
+    email_token = results[0]['data']['email']
+    assert engine.detokenize([email_token, "tok_unknown"]) == ["user0@example.com", None]
+
+    assert engine.right_to_be_forgotten("user0")['status'] == 'success'
+    job = engine.erase_users(USERS[1:4], chunk_size=1)
+    assert job['status'] == 'completed' and job['erased'] == 3
+
+    assert engine.get_logs("user0") == [] and engine.get_logs("user2") == []
+    assert engine.detokenize([email_token]) == [None]
+    assert set(engine.retrieve_personal_data_batch(USERS[:6])) == {"user4", "user5"}
+    assert engine.verify_audit_trail()['status'] == 'success'
+
+def test_batch_keeps_the_shards_that_wrote():
+    with ShardedDataProtectionEngine("sqlite:///:memory:", shards=2, tokenization=False) as sharded:
+        users = [user_id for user_id in USERS if shard_for(user_id, 2) == 0][:2] + [user_id for user_id in USERS if shard_for(user_id, 2) == 1][:2]
+        sharded._processes[1].terminate()
+        sharded._processes[1].join()
+
+        written = sharded.log_data_processing_activities([
+            {'user_id': user_id, 'activity_type': 'login', 'data_processed': {'n': n}}
+            for n, user_id in enumerate(users)
+        ])
+
+        assert [entry['data_processed'] for entry in written] == [{'n': 0}, {'n': 1}]
+        assert [log.data_processed for log in sharded.get_logs(users[1])] == [{'n': 1}]
+
+def test_in_memory_shards_erase_too():
+    with ShardedDataProtectionEngine("sqlite:///:memory:", shards=2, tokenization=False) as sharded:
+        for user_id in USERS[:4]:
+            sharded.store_personal_data(user_id, {'age': 30})
+
+        job = sharded.erase_users(USERS[:3], chunk_size=1)
+
+        assert job['status'] == 'completed' and job['erased'] == 3
+        assert set(sharded.retrieve_personal_data_batch(USERS[:4])) == {"user3"}
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+from src.consent_store import ConsentStore
+from src.log_store import IndexedLogStore
+from src.stats import ComplianceStats
+
+NOW = datetime(2025, 4, 8, 12, 0, 0)
+
+def make_entry(log_id, user_id, activity_type, consent_given=True, days_ago=0, retention_days=730):
+    timestamp = NOW - timedelta(days=days_ago)
+    return {
+        'id': log_id,
+        'user_id': user_id,
+        'activity_type': activity_type,
+        'timestamp': timestamp,
+        'data_processed': {},
+        'is_consent_given': consent_given,
+        'retention_period': timestamp + timedelta(days=retention_days)
+    }
+
+def test_log_counters_follow_appends_erasure_and_purge():
+    stats = ComplianceStats()
+    store = IndexedLogStore()
+    for entry in [
+        make_entry("1", "alice", "authentication"),
+        make_entry("2", "alice", "data_access_request", days_ago=1),
+        make_entry("3", "bob", "authentication", consent_given=False, retention_days=1)
+    ]:
+        store.append(entry)
+        stats.record_log(entry)
+
+    snapshot = stats.snapshot()
+    assert snapshot['total_logs'] == 3
+    assert snapshot['activity_counts'] == {"authentication": 2, "data_access_request": 1}
+    assert snapshot['daily_events'] == {NOW.date() - timedelta(days=1): 1, NOW.date(): 2}
+    assert stats.expiring_before(NOW.date() + timedelta(days=2)) == 1
+
+    stats.remove_logs(store.delete_user("alice"))
+    stats.record_erasure()
+    stats.remove_logs(store.purge_expired(NOW + timedelta(days=2)), purged=True)
+
+    snapshot = stats.snapshot()
+    assert snapshot['total_logs'] == 0 and snapshot['consented_logs'] == 0
+    assert snapshot['activity_counts'] == {} and snapshot['pending_expiries'] == {}
+    assert snapshot['erased_users'] == 1 and snapshot['purged_logs'] == 1
+
+def test_consent_rates_track_current_decisions():
+    stats = ComplianceStats()
+    consents = ConsentStore()
+
+    def update(user_id, consent_type, status):
+        stats.record_consent(consent_type, consents.status(user_id, consent_type), status)
+        consents.update(user_id, consent_type, status)
+
+    update("alice", "marketing", True)
+    update("bob", "marketing", False)
+    update("bob", "marketing", True)
+    update("alice", "marketing", False)
+    update("carol", "analytics", True)
+    assert stats.consent_rates() == {"marketing": 0.5, "analytics": 1.0}
+
+    stats.remove_consents(consents.current("bob"))
+    consents.delete_user("bob")
+    assert stats.consent_rates() == {"marketing": 0.0, "analytics": 1.0}
@@ -0,0 +1,85 @@
+import os
+
+import pandas as pd
+import pytest
+
+from src.dsar import process_access_requests
+from src.tokenization import TOKEN_PREFIX, TokenVault, is_token
+
+KEY = bytes(range(32))
+
+RECORDS = [
+    {"user_id": "user1", "email": "a@example.com", "phone": "1234567890", "address": "1 Privacy Street"},
+    {"user_id": "user2", "email": "b@example.com", "phone": "555"},
+    {"user_id": "user3", "address": "1 Privacy Street", "age": 40},
+]
+
+@pytest.fixture
+def vault():
+    vault = TokenVault(':memory:', KEY, cache_size=4)
+    yield vault
+    vault.close()
+
+def test_tokens_are_keyed_and_deterministic(vault):
+    token = vault.tokenize('email', "a@example.com")
+
+    assert token.startswith(TOKEN_PREFIX) and "a@example.com" not in token
+    assert vault.tokenize('email', "a@example.com") == token
+    assert vault.tokenize('phone', "a@example.com") != token
+    assert TokenVault(':memory:', bytes(32)).token_for('email', "a@example.com") != token
+    assert vault.tokenize('email', None) is None
+
+def test_records_round_trip_through_the_vault(vault):
+    tokenized = vault.tokenize_records(RECORDS)
+
+    assert all(is_token(record['email']) for record in tokenized[:2])
+    assert tokenized[0]['address'] == tokenized[2]['address']
+    assert tokenized[2]['age'] == 40 and 'email' not in tokenized[2]
+    assert RECORDS[0]['email'] == "a@example.com"
+    # More tokens than the cache holds, so some come from SQLite
+    assert vault.detokenize_records(tokenized) == RECORDS
+    assert vault.detokenize_many([tokenized[1]['phone'], "tok_unknown", None]) == ["555", None, None]
+
+def test_dataframe_matches_records(vault):
+    df = pd.DataFrame(RECORDS)
+
+    tokenized = vault.tokenize_dataframe(df)
+
+    expected = vault.tokenize_records(RECORDS)
+    assert tokenized.loc[0, 'email'] == expected[0]['email']
+    assert tokenized.loc[1, 'phone'] == expected[1]['phone']
+    assert pd.isna(tokenized.loc[2, 'email'])
+
+def test_forgotten_users_cannot_be_reidentified(vault):
+    tokenized = vault.tokenize_records(RECORDS)
+
+    assert vault.forget_users(["user1"]) == 3
+
+    assert vault.detokenize(tokenized[0]['email']) is None
+    # The shared address still belongs to user3
+    assert vault.detokenize(tokenized[0]['address']) == "1 Privacy Street"
+
+def test_vault_persists_across_reopen(tmp_path):
+    path = os.path.join(tmp_path, "vault.db")
+    vault = TokenVault(path, KEY)
+    token = vault.tokenize('email', "a@example.com", "user1")
+    vault.close()
+
+    reopened = TokenVault(path, KEY)
+    assert reopened.detokenize(token) == "a@example.com"
+    assert len(reopened) == 1
+    reopened.close()
+
+def test_access_requests_tokenize_per_batch(vault):
+    users = {record['user_id']: record for record in RECORDS}
+    calls = []
+
+    def tokenize(records, user_ids):
+        calls.append(list(user_ids))
+        return vault.tokenize_records(records, user_ids)
+
+    results = list(process_access_requests(["user1", "user2", "missing"], lambda ids: {i: users[i] for i in ids if i in users}, anonymize=dict, tokenize=tokenize))
+
+    assert calls == [["user1", "user2"]]
+    assert [result['status'] for result in results] == ['success', 'success', 'not_found']
+    assert vault.detokenize(results[0]['data']['email']) == "a@example.com"
@@ -0,0 +1,41 @@
+from collections import Counter
+
+from src.consent_store import ConsentStore
+from src.data_protection import EncryptoDataProtectionEngine
+from src.workload import ACTIVITY_TYPES, WorkloadGenerator, ZipfSampler
+
+def flatten(batches):
+    return [item for batch in batches for item in batch]
+
+def test_workload_is_reproducible_whatever_the_batch_size():
+    events = flatten(WorkloadGenerator(users=500, seed=7).events(70000, batch_size=999))
+
+    assert len(events) == 70000
+    assert events == flatten(WorkloadGenerator(users=500, seed=7).events(70000, batch_size=70000))
+    assert events != flatten(WorkloadGenerator(users=500, seed=8).events(70000))
+    assert {event['activity_type'] for event in events} == set(ACTIVITY_TYPES)
+
+def test_users_are_zipf_skewed():
+    events = flatten(WorkloadGenerator(users=1000, seed=0, skew=1.0).events(20000))
+    counts = Counter(event['user_id'] for event in events)
+
+    assert counts.most_common(1)[0][0] == "user0"
+    top = sum(count for _, count in counts.most_common(10))
+    # The ten heaviest of 1000 users own about 39% of the events
+    assert abs(top / len(events) - ZipfSampler(1000, 1.0).share(10)) < 0.03
+
+def test_generated_data_loads_into_the_engines():
+    generator = WorkloadGenerator(users=50, seed=1, consent_types=['data_processing', 'marketing'])
+    store = ConsentStore()
+    for record in flatten(generator.consents()):
+        store.update(record['user_id'], record['type'], record['status'], record['timestamp'])
+    assert 0 < len(store) <= 50
+
+    with EncryptoDataProtectionEngine("sqlite:///:memory:", tokenization=False) as engine:
+        for record in flatten(generator.users()):
+            engine.store_personal_data(record['user_id'], record)
+        for events in generator.events(300, batch_size=100):
+            assert len(engine.log_data_processing_activities(events)) == 100
+
+        assert len(engine.get_logs()) == 300
+        assert engine.retrieve_personal_data_batch(["user49"])["user49"]['email'] == "user49@example.com"